@@ -0,0 +1,419 @@
+// 页面外壳是静态的，全部数据来自 generate_html.py 写出的 data/dashboard.json
+(function () {
+    'use strict';
+
+    const DATA_URL = 'data/dashboard.json';
+
+    function fmt(value, decimals) {
+        return value === null || value === undefined ? 'N/A' : value.toFixed(decimals);
+    }
+
+    function setText(id, text) {
+        document.getElementById(id).textContent = text;
+    }
+
+    function setValueClass(id, cls) {
+        const el = document.getElementById(id);
+        el.className = 'stat-value' + (cls ? ' ' + cls : '');
+    }
+
+    function renderCards(data) {
+        const latest = data.latest || {};
+        const [low, high] = data.ratio_range;
+
+        setText('goldPrice', fmt(latest.gold_price, 2));
+        setText('goldSource', '来源: ' + (latest.gold_price_source || 'sge_api'));
+
+        setText('eggPrice', fmt(latest.egg_price, 2));
+        setText('eggSub', latest.egg_price_futures != null
+            ? '期货 JD0: ' + latest.egg_price_futures.toFixed(3) + ' 元/斤'
+            : '现货报价 (100ppi)');
+
+        setText('ratio', fmt(latest.gold_egg_ratio, 1));
+        setValueClass('ratio', latest.gold_egg_ratio > high ? 'warning' : '');
+        setText('ratioSub', '参考区间 ' + low + '–' + high);
+
+        const n = latest.ratio_ma20_count || data.ma_window;
+        const ma = latest.ratio_ma20;
+        const dev = latest.ratio_ma20_deviation_pct;
+        setText('maLabel', '近 ' + n + ' 日均比 MA' + n);
+        if (ma != null && dev != null) {
+            const arrow = dev >= 0 ? '↑' : '↓';
+            setText('maValue', ma.toFixed(1));
+            setValueClass('maValue', dev > 0 ? 'danger' : 'success');
+            setText('maSub', 'MA' + n + ' · 今日' + arrow + ' ' + Math.abs(dev).toFixed(2) + '%');
+        }
+
+        setText('etf', fmt(latest.gold_etf_518880, 3));
+        const premium = latest.gold_etf_premium_pct;
+        if (premium != null) {
+            setText('etfSub', '折溢价 ' + (premium >= 0 ? '+' : '') + premium.toFixed(2) + '%');
+        }
+
+        setText('updated', data.updated || 'N/A');
+    }
+
+    const PAGES_URL = 'data/pages/';
+    const ROW_HEIGHT = 45;              // 与 CSS 中 tbody td 的高度一致，首次渲染后按实际行高校正
+    const OVERSCAN = 10;                // 可见区上下多渲染的行数
+
+    function tableCells(row) {
+        const [date, gold, egg, ratio, etf, eggFutures, ok] = row;
+        const tr = document.createElement('tr');
+        for (const text of [date, fmt(gold, 2), fmt(egg, 2), fmt(ratio, 1), fmt(etf, 3), fmt(eggFutures, 3)]) {
+            const td = document.createElement('td');
+            td.textContent = text;
+            tr.appendChild(td);
+        }
+        const td = document.createElement('td');
+        const badge = document.createElement('span');
+        badge.className = ok ? 'success-badge' : 'error-badge';
+        badge.textContent = ok ? '正常' : '有错误';
+        td.appendChild(badge);
+        tr.appendChild(td);
+        return tr;
+    }
+
+    function placeholderRow(columns) {
+        const tr = document.createElement('tr');
+        tr.className = 'pending';
+        for (let i = 0; i < columns; i++) {
+            const td = document.createElement('td');
+            td.textContent = '…';
+            tr.appendChild(td);
+        }
+        return tr;
+    }
+
+    function spacerRow(height, columns) {
+        const tr = document.createElement('tr');
+        tr.className = 'spacer';
+        const td = document.createElement('td');
+        td.colSpan = columns;
+        td.style.height = height + 'px';
+        tr.appendChild(td);
+        return tr;
+    }
+
+    // 虚拟滚动表格：DOM 中只有可见行（加上 OVERSCAN），分页在滚动到时才下载
+    function createTable(manifest) {
+        const viewport = document.getElementById('tableViewport');
+        const thead = viewport.querySelector('thead');
+        const tbody = document.getElementById('tableBody');
+        const columns = manifest.columns.length;
+        const pages = manifest.pages;
+        const offsets = [];             // 每页首行的全局行号（第 0 行为最新记录）
+        let total = 0;
+        for (const page of pages) {
+            offsets.push(total);
+            total += page.rows;
+        }
+        const loaded = new Map();
+        const loading = new Set();
+        let rowHeight = ROW_HEIGHT;
+        let scheduled = false;
+
+        setText('tableCount', '共 ' + total + ' 条');
+
+        function pageOf(index) {
+            let lo = 0;
+            let hi = offsets.length - 1;
+            while (lo < hi) {
+                const mid = (lo + hi + 1) >> 1;
+                if (offsets[mid] <= index) {
+                    lo = mid;
+                } else {
+                    hi = mid - 1;
+                }
+            }
+            return lo;
+        }
+
+        function load(k) {
+            if (loaded.has(k) || loading.has(k)) {
+                return;
+            }
+            loading.add(k);
+            // ?v= 为分页文件的内容哈希，数据或分页格式变化时 URL 随之变化，不会读到旧缓存
+            fetch(PAGES_URL + pages[k].file + '?v=' + pages[k].hash)
+                .then((resp) => {
+                    if (!resp.ok) {
+                        throw new Error('HTTP ' + resp.status);
+                    }
+                    return resp.json();
+                })
+                .then((page) => {
+                    loaded.set(k, page.rows);
+                    schedule();
+                })
+                .catch(showError)
+                .finally(() => loading.delete(k));
+        }
+
+        function render() {
+            scheduled = false;
+            const top = Math.max(0, viewport.scrollTop - thead.offsetHeight);
+            const first = Math.max(0, Math.floor(top / rowHeight) - OVERSCAN);
+            const last = Math.min(total, Math.ceil((top + viewport.clientHeight) / rowHeight) + OVERSCAN);
+
+            const fragment = document.createDocumentFragment();
+            fragment.appendChild(spacerRow(first * rowHeight, columns));
+            let sample = null;
+            for (let i = first; i < last; i++) {
+                const k = pageOf(i);
+                const rows = loaded.get(k);
+                if (rows) {
+                    const tr = tableCells(rows[i - offsets[k]]);
+                    sample = sample || tr;
+                    fragment.appendChild(tr);
+                } else {
+                    load(k);
+                    fragment.appendChild(placeholderRow(columns));
+                }
+            }
+            fragment.appendChild(spacerRow((total - last) * rowHeight, columns));
+            tbody.replaceChildren(fragment);
+
+            // 实际行高与预设不同（字体、缩放）时校正一次，避免滚动条位置漂移
+            const measured = sample && sample.getBoundingClientRect().height;
+            if (measured && Math.abs(measured - rowHeight) > 0.5) {
+                rowHeight = measured;
+                schedule();
+            }
+        }
+
+        function schedule() {
+            if (!scheduled) {
+                scheduled = true;
+                requestAnimationFrame(render);
+            }
+        }
+
+        viewport.addEventListener('scroll', schedule, { passive: true });
+        window.addEventListener('resize', schedule);
+        render();
+    }
+
+    const DAY_MS = 86400000;
+
+    // x 轴为 1970-01-01 起的天数（各序列降采样后的点位不同，不能共用分类标签）
+    function formatDay(day) {
+        return new Date(day * DAY_MS).toISOString().slice(0, 10);
+    }
+
+    function points(xy) {
+        const [xs, ys] = xy;
+        return xs.map((x, i) => ({ x: x, y: ys[i] }));
+    }
+
+    function commonOptions(yScales) {
+        return {
+            responsive: true,
+            maintainAspectRatio: true,
+            parsing: false,
+            normalized: true,
+            interaction: {
+                mode: 'nearest',
+                axis: 'x',
+                intersect: false,
+            },
+            plugins: {
+                legend: {
+                    display: true,
+                    position: 'top',
+                },
+                tooltip: {
+                    callbacks: {
+                        title: (items) => items.length ? formatDay(items[0].parsed.x) : '',
+                    }
+                }
+            },
+            scales: {
+                x: {
+                    type: 'linear',
+                    ticks: {
+                        maxTicksLimit: 8,
+                        callback: (value) => formatDay(value),
+                    }
+                },
+                ...yScales
+            }
+        };
+    }
+
+    function createCharts(data) {
+        const [low, high] = data.ratio_range;
+
+        const priceChart = new Chart(document.getElementById('priceChart').getContext('2d'), {
+            type: 'line',
+            data: {
+                datasets: [
+                    {
+                        label: '黄金价格 (元/克)',
+                        data: [],
+                        borderColor: '#f39c12',
+                        backgroundColor: 'rgba(243, 156, 18, 0.1)',
+                        yAxisID: 'y',
+                        tension: 0.4,
+                        fill: true
+                    },
+                    {
+                        label: '鸡蛋价格 (元/斤)',
+                        data: [],
+                        borderColor: '#3498db',
+                        backgroundColor: 'rgba(52, 152, 219, 0.1)',
+                        yAxisID: 'y1',
+                        tension: 0.4,
+                        fill: true
+                    }
+                ]
+            },
+            options: commonOptions({
+                y: {
+                    type: 'linear',
+                    display: true,
+                    position: 'left',
+                    title: {
+                        display: true,
+                        text: '黄金价格 (元/克)'
+                    }
+                },
+                y1: {
+                    type: 'linear',
+                    display: true,
+                    position: 'right',
+                    title: {
+                        display: true,
+                        text: '鸡蛋价格 (元/斤)'
+                    },
+                    grid: {
+                        drawOnChartArea: false,
+                    }
+                }
+            })
+        });
+
+        const ratioChart = new Chart(document.getElementById('ratioChart').getContext('2d'), {
+            type: 'line',
+            data: {
+                datasets: [
+                    {
+                        label: '黄金/鸡蛋比例',
+                        data: [],
+                        borderColor: '#9b59b6',
+                        backgroundColor: 'rgba(155, 89, 182, 0.1)',
+                        tension: 0.4,
+                        fill: true
+                    },
+                    {
+                        label: 'MA' + data.ma_window + ' 滚动均值',
+                        data: [],
+                        borderColor: '#2c3e50',
+                        borderDash: [3, 3],
+                        borderWidth: 2,
+                        pointRadius: 0,
+                        tension: 0.3,
+                        fill: false
+                    },
+                    {
+                        label: '参考上限 (' + high + ')',
+                        data: [],
+                        borderColor: '#e74c3c',
+                        borderDash: [5, 5],
+                        borderWidth: 2,
+                        pointRadius: 0,
+                        fill: false
+                    },
+                    {
+                        label: '参考下限 (' + low + ')',
+                        data: [],
+                        borderColor: '#27ae60',
+                        borderDash: [5, 5],
+                        borderWidth: 2,
+                        pointRadius: 0,
+                        fill: false
+                    }
+                ]
+            },
+            options: commonOptions({
+                y: {
+                    title: {
+                        display: true,
+                        text: '比例值'
+                    }
+                }
+            })
+        });
+
+        return { price: priceChart, ratio: ratioChart };
+    }
+
+    // 切换区间只替换数据集的点，不重建图表
+    function showRange(charts, data, name) {
+        const series = data.series[name];
+        const [low, high] = data.ratio_range;
+        // 点多时不画圆点，长区间保持线条清晰
+        const radius = (xy) => xy[0].length > 60 ? 0 : 3;
+
+        const price = charts.price.data.datasets;
+        price[0].data = points(series.gold);
+        price[0].pointRadius = radius(series.gold);
+        price[1].data = points(series.egg);
+        price[1].pointRadius = radius(series.egg);
+
+        const ratio = charts.ratio.data.datasets;
+        ratio[0].data = points(series.ratio);
+        ratio[0].pointRadius = radius(series.ratio);
+        ratio[1].data = points(series.ma);
+        const xs = series.ratio[0];
+        const span = xs.length ? [xs[0], xs[xs.length - 1]] : [];
+        ratio[2].data = span.map((x) => ({ x: x, y: high }));
+        ratio[3].data = span.map((x) => ({ x: x, y: low }));
+
+        charts.price.update('none');
+        charts.ratio.update('none');
+
+        for (const button of document.querySelectorAll('#rangeSwitch button')) {
+            button.classList.toggle('active', button.dataset.range === name);
+        }
+    }
+
+    function renderCharts(data) {
+        const charts = createCharts(data);
+        showRange(charts, data, data.ranges[0]);
+        document.getElementById('rangeSwitch').addEventListener('click', (event) => {
+            const range = event.target.dataset && event.target.dataset.range;
+            if (range && data.series[range]) {
+                showRange(charts, data, range);
+            }
+        });
+    }
+
+    function showError(err) {
+        const el = document.getElementById('loadError');
+        el.textContent = '数据加载失败: ' + err.message
+            + (location.protocol === 'file:' ? '（请通过 HTTP 服务打开，如 python3 -m http.server）' : '');
+        el.hidden = false;
+    }
+
+    // no-cache：每次向服务器验证（ETag），数据未变时只返回 304
+    function fetchJson(url) {
+        return fetch(url, { cache: 'no-cache' }).then((resp) => {
+            if (!resp.ok) {
+                throw new Error('HTTP ' + resp.status);
+            }
+            return resp.json();
+        });
+    }
+
+    fetchJson(DATA_URL)
+        .then((data) => {
+            renderCards(data);
+            renderCharts(data);
+        })
+        .catch(showError);
+
+    fetchJson(PAGES_URL + 'manifest.json')
+        .then(createTable)
+        .catch(showError);
+})();
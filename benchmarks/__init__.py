@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks
+==========
+性能基准脚本。以 `python -m benchmarks.<模块>` 方式在项目根目录运行。
+"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+bench_html_parsers.py
+=====================
+对比兜底网页的两种解析路径：
+  - bs4      : 旧实现，BeautifulSoup(html.parser) 构建整棵 DOM 树（egg 页还要 get_text 全文）
+  - extract  : html_extract 定向提取，只扫描表格 / 标记词附近的片段
+
+用法：
+  python -m benchmarks.bench_html_parsers [--sge-page PATH] [--egg-page PATH] [-n 次数]
+"""
+
+import argparse
+import re
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import sample_pages
+
+import html_extract
+
+
+def bs4_sge_rows(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", class_="daily_new_table")
+    tbody = table.find("tbody")
+    return [[td.get_text(strip=True) for td in tr.find_all("td")] for tr in tbody.find_all("tr")]
+
+
+def bs4_egg_price(html):
+    from bs4 import BeautifulSoup
+
+    text = BeautifulSoup(html, "html.parser").get_text()
+    m = re.search(r"鸡蛋参考价为\s*([\d]+\.\d+)", text) or re.search(r"鸡蛋为\s*([\d]+\.\d+)", text)
+    return float(m.group(1)) if m else None
+
+
+CASES = {
+    "sge": (bs4_sge_rows, html_extract.daily_new_table_rows),
+    "egg": (bs4_egg_price, html_extract.egg_reference_price),
+}
+
+
+def _measure(fn, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(html)
+        timings.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="兜底网页解析基准：BeautifulSoup vs 定向提取")
+    parser.add_argument("--sge-page", help="保存的 SGE daily_new 页面")
+    parser.add_argument("--egg-page", help="保存的 100ppi 快讯页面")
+    parser.add_argument("-n", "--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    pages = sample_pages.load_pages(args.sge_page, args.egg_page)
+    print(f"{'页面':<6} {'大小':>9} {'实现':<8} {'中位耗时':>10} {'峰值内存':>10}  来源")
+    for name, (bs4_fn, extract_fn) in CASES.items():
+        html, origin = pages[name]
+        if bs4_fn(html) != extract_fn(html):
+            raise SystemExit(f"[错误] {name} 两种解析结果不一致")
+        results = {}
+        for label, fn in (("bs4", bs4_fn), ("extract", extract_fn)):
+            median, peak = _measure(fn, html, args.repeat)
+            results[label] = median
+            print(f"{name:<6} {len(html):>8}B {label:<8} {median * 1000:>8.3f}ms {peak / 1024:>8.1f}KB  {origin}")
+        print(f"{name:<6} 加速比 {results['bs4'] / results['extract']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
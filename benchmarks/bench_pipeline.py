@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+bench_pipeline.py
+=================
+每日任务各阶段的基准：抓取后的解析 → 存储 → 统计 → 渲染 → 通知消息。
+
+  - 历史规模：默认 365 / 10000 / 100000 条合成记录，各自写入临时数据目录（不碰 data/）；
+    渲染阶段的 index.html / static/ 也改写到同一临时目录
+  - 每个阶段报告 吞吐（次/秒）、p50 / p95 耗时、峰值内存（tracemalloc）
+  - 结果保存为 JSON；--baseline 指定旧结果时逐项对比 p50，超过 --threshold 倍记为变慢
+
+用法：
+  python -m benchmarks.bench_pipeline [--sizes 365,10000,100000] [-n 20]
+                                      [--output benchmarks/results/latest.json]
+                                      [--baseline benchmarks/baseline.json] [--threshold 1.2]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import sample_history, sample_pages
+
+import generate_html
+import gold_egg_price
+import history_store
+import html_extract
+import send_feishu
+import static_assets
+
+DEFAULT_SIZES = (365, 10_000, 100_000)
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "latest.json")
+SLOW_STAGE_SECONDS = 0.5            # 单次超过该耗时的阶段自动减少重复次数
+
+
+def _quiet(fn):
+    """屏蔽被测函数打到 stderr 的 [信息] / [调试] 日志与 stdout 的结果提示"""
+    def run():
+        with contextlib.redirect_stderr(io.StringIO()), contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def _percentile(sorted_values, pct):
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def measure(fn, repeat):
+    """返回 {runs, p50_ms, p95_ms, mean_ms, ops_per_sec, peak_kb}"""
+    fn()  # 预热：导入、首次建索引等一次性开销不计入
+    first = time.perf_counter()
+    fn()
+    if time.perf_counter() - first > SLOW_STAGE_SECONDS:
+        repeat = max(3, repeat // 5)
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    mean = statistics.fmean(timings)
+    return {
+        "runs": len(timings),
+        "p50_ms": round(_percentile(timings, 50) * 1000, 4),
+        "p95_ms": round(_percentile(timings, 95) * 1000, 4),
+        "mean_ms": round(mean * 1000, 4),
+        "ops_per_sec": round(1 / mean, 2) if mean > 0 else None,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _seed_store(data_dir, history):
+    history_store.configure(data_dir)
+    history_store.write_records(list(reversed(history)))
+
+
+@contextlib.contextmanager
+def _temp_outputs(data_dir):
+    """把页面外壳与 static/ 的输出改到 data_dir（dashboard.json 与分页已随 history_store.configure 在其中）"""
+    saved = generate_html.OUTPUT_HTML, static_assets.STATIC_DIR
+    generate_html.OUTPUT_HTML = os.path.join(data_dir, "index.html")
+    static_assets.STATIC_DIR = os.path.join(data_dir, "static")
+    try:
+        yield
+    finally:
+        generate_html.OUTPUT_HTML, static_assets.STATIC_DIR = saved
+
+
+def _remove_render_outputs():
+    """删掉外壳、dashboard.json 与分页清单，下一次渲染走完整的生成与写出路径"""
+    for path in (generate_html.OUTPUT_HTML, generate_html.data_file(),
+                 os.path.join(generate_html.pages_dir(), "manifest.json")):
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def history_stages(history):
+    """与历史规模相关的阶段：(名称, 函数)"""
+    view = history[:history_store.VIEW_LIMIT]
+    offset = iter(range(1, 10 ** 9))
+
+    def save():
+        # 每次写入新的一天，走真实的追加 + 索引更新路径
+        gold_egg_price.save_price_data(sample_history.next_record(history, next(offset)), view)
+
+    def render_cold():
+        # 渲染阶段全量执行：读历史 → 外壳 + 全部分页 + dashboard.json 生成并写出（含预压缩副本）
+        _remove_render_outputs()
+        generate_html.write_page(generate_html.load_price_history())
+
+    return [
+        ("save_price_data", save),
+        ("load_price_history(all)", lambda: gold_egg_price.load_price_history()),
+        ("load_price_history(365)", lambda: gold_egg_price.load_price_history(history_store.VIEW_LIMIT)),
+        ("calc_ratio_ma", lambda: gold_egg_price.calc_ratio_ma(history)),
+        ("generate_history_statistics", lambda: gold_egg_price.generate_history_statistics(history)),
+        ("build_dashboard", lambda: generate_html.build_dashboard(generate_html.load_price_history(),
+                                                                  history_store.read_range())),
+        ("generate_html(cold)", render_cold),
+        ("write_page(unchanged)", lambda: generate_html.write_page(generate_html.load_price_history())),
+        ("build_feishu_message", lambda: send_feishu.build_feishu_message(send_feishu.load_history())),
+    ]
+
+
+def parser_stages(pages):
+    sge_html, _ = pages["sge"]
+    egg_html, _ = pages["egg"]
+    return [
+        ("parse_sge_daily_table", lambda: html_extract.daily_new_table_rows(sge_html)),
+        ("parse_egg_reference_price", lambda: html_extract.egg_reference_price(egg_html)),
+    ]
+
+
+def run(sizes, repeat, pages):
+    results = {"parsers": {}, "history": {}}
+    for name, fn in parser_stages(pages):
+        results["parsers"][name] = measure(_quiet(fn), repeat)
+        _print_row("-", name, results["parsers"][name])
+
+    for size in sizes:
+        history = sample_history.synthetic_history(size)
+        per_size = results["history"][str(size)] = {}
+        with tempfile.TemporaryDirectory(prefix="gold-rice-bench-") as data_dir, _temp_outputs(data_dir):
+            _seed_store(data_dir, history)
+            for name, fn in history_stages(history):
+                stage = measure(_quiet(fn), repeat)
+                stage["records_per_sec"] = round(stage["ops_per_sec"] * size, 1) if stage["ops_per_sec"] else None
+                per_size[name] = stage
+                _print_row(size, name, stage)
+    return results
+
+
+def _print_row(size, name, stage):
+    print(f"{str(size):>7} {name:<30} {stage['p50_ms']:>10.3f} {stage['p95_ms']:>10.3f} "
+          f"{stage['ops_per_sec'] or 0:>10.1f} {stage['peak_kb']:>10.1f}")
+
+
+def _flatten(results):
+    for name, stage in results.get("parsers", {}).items():
+        yield ("-", name), stage
+    for size, stages in results.get("history", {}).items():
+        for name, stage in stages.items():
+            yield (size, name), stage
+
+
+def compare(current, baseline, threshold):
+    """逐项对比 p50，返回变慢的阶段列表"""
+    base = dict(_flatten(baseline))
+    slower = []
+    print(f"\n{'规模':>7} {'阶段':<30} {'基线p50':>10} {'本次p50':>10} {'倍数':>7}")
+    for key, stage in _flatten(current):
+        old = base.get(key)
+        if not old or not old.get("p50_ms"):
+            continue
+        ratio = stage["p50_ms"] / old["p50_ms"]
+        flag = "  ← 变慢" if ratio > threshold else ""
+        print(f"{key[0]:>7} {key[1]:<30} {old['p50_ms']:>10.3f} {stage['p50_ms']:>10.3f} {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            slower.append((key, ratio))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="每日任务各阶段在不同历史规模下的基准")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="逗号分隔的历史条数")
+    parser.add_argument("-n", "--repeat", type=int, default=20)
+    parser.add_argument("--sge-page", help="保存的 SGE daily_new 页面")
+    parser.add_argument("--egg-page", help="保存的 100ppi 快讯页面")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果 JSON 路径")
+    parser.add_argument("--baseline", help="用于对比的基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="p50 超过基线多少倍记为变慢")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    pages = sample_pages.load_pages(args.sge_page, args.egg_page)
+    print(f"页面: sge={pages['sge'][1]} egg={pages['egg'][1]}")
+    print(f"{'规模':>7} {'阶段':<30} {'p50(ms)':>10} {'p95(ms)':>10} {'次/秒':>10} {'峰值KB':>10}")
+    results = run(sizes, args.repeat, pages)
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "repeat": args.repeat,
+        "pages": {name: origin for name, (_, origin) in pages.items()},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline.get("results", {}), args.threshold)
+        if slower:
+            print(f"[警告] {len(slower)} 个阶段比基线慢 {args.threshold} 倍以上", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
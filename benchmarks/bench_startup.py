@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+bench_startup.py
+================
+各脚本的启动开销：每次在全新的解释器里 `python -X importtime -c "import 模块"`，
+取模块自身的累计导入耗时（中位数），并列出最重的几个依赖与意外加载的重模块。
+
+  - 空解释器（python -c pass）的墙钟时间作为基线，一并给出
+  - HEAVY_MODULES 中的模块只应在抓取 / 发送路径上按需导入，导入期出现即标出
+
+用法：
+  python -m benchmarks.bench_startup [-n 次数] [--top 5] [模块 ...]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import SCRIPTS_DIR
+
+DEFAULT_MODULES = ("generate_html", "send_feishu", "send_email", "notify", "gold_egg_price", "run_pipeline", "history_store")
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "akshare", "pandas", "numpy", "smtplib", "ssl")
+
+
+def _run(code, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    env = {**os.environ, "PYTHONPATH": SCRIPTS_DIR, "PYTHONDONTWRITEBYTECODE": "1"}
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=SCRIPTS_DIR)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(f"[错误] 执行失败: {' '.join(cmd)}\n{proc.stderr[-2000:]}")
+    return elapsed, proc
+
+
+def _parse_importtime(stderr):
+    """返回 [(名称, 缩进深度, 累计微秒)]，顺序与 -X importtime 输出一致（子模块在前）"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), len(name) - len(name.lstrip()), int(cumulative_us)))
+    return rows
+
+
+def _subtree(rows, module):
+    """module 导入期间加载的依赖（紧挨在它前面、缩进更深的行）"""
+    idx = next(i for i, (name, _, _) in enumerate(rows) if name == module)
+    depth = rows[idx][1]
+    deps = []
+    for name, d, cumulative in reversed(rows[:idx]):
+        if d <= depth:
+            break
+        deps.append((name, cumulative))
+    return rows[idx][2], deps
+
+
+def measure(module, repeat, top):
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    import_us, walls, heavy, deps = [], [], "", []
+    for _ in range(repeat):
+        _, proc = _run(f"import {module}", importtime=True)
+        total, deps = _subtree(_parse_importtime(proc.stderr), module)
+        import_us.append(total)
+        elapsed, proc = _run(probe)
+        walls.append(elapsed)
+        heavy = proc.stdout.strip()
+    # 最重的直接 / 间接依赖（按累计耗时，不含模块自身）
+    deps = sorted(deps, key=lambda r: -r[1])[:top]
+    return {
+        "import_ms": statistics.median(import_us) / 1000,
+        "wall_ms": statistics.median(walls) * 1000,
+        "heavy": heavy,
+        "top": [(name, c / 1000) for name, c in deps],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="各脚本在全新解释器中的导入耗时")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="列出最重的前 N 个依赖")
+    args = parser.parse_args(argv)
+
+    baseline = statistics.median(_run("pass")[0] for _ in range(args.repeat)) * 1000
+    print(f"空解释器启动: {baseline:.1f}ms（python {sys.version.split()[0]}）")
+    print(f"{'模块':<16} {'导入(ms)':>9} {'进程(ms)':>9}  导入期加载的重模块 / 最重依赖")
+    for module in args.modules:
+        r = measure(module, args.repeat, args.top)
+        heavy = r["heavy"] or "-"
+        deps = ", ".join(f"{name} {ms:.1f}" for name, ms in r["top"])
+        print(f"{module:<16} {r['import_ms']:>9.1f} {r['wall_ms']:>9.1f}  {heavy}")
+        print(f"{'':<16} {'':>9} {'':>9}  {deps}")
+
+
+if __name__ == "__main__":
+    main()
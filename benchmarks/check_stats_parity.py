@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+check_stats_parity.py
+=====================
+核对 stats 模块与它替换掉的三处旧实现输出一致：
+
+  - generate_html._rolling_ma     ↔ stats.rolling_mean(values, w, min_periods=min(w, 5))
+  - gold_egg_price.calc_ratio_ma  ↔ stats.recent_mean（最新在前取前 w 个有效值）
+  - send_feishu.calc_ma / 偏离    ↔ stats.recent_mean + stats.pct_deviation
+
+旧实现原样保留在本文件中作为参照。rolling_std / rolling_deviation_pct 没有旧实现，
+与逐窗口的朴素计算（statistics.pstdev）比对。
+
+数据：已提交的历史（data/）中的 gold_egg_ratio / gold_price，以及在其上人为挖出 None 空洞、
+截成不足一个窗口的短序列。NumPy 路径与纯 Python 路径各跑一遍（没有 NumPy 时只跑后者）。
+
+用法：
+  python -m benchmarks.check_stats_parity          # 有不一致时退出码为 1
+"""
+
+import math
+import statistics
+import sys
+
+from benchmarks import sample_history
+
+import history_store
+import stats
+
+WINDOWS = (1, 2, 3, 5, 10, 19, 20, 21, 30)
+REL_TOL = 1e-9                      # 滚动均值 / 标准差允许的相对误差（前缀和与逐项求和的舍入差）
+ABS_TOL = 1e-9
+
+
+# ── 旧实现（替换前的代码，仅作对照）──
+
+def old_rolling_ma(values, window):
+    """generate_html._rolling_ma"""
+    out = []
+    for i in range(len(values)):
+        window_vals = [v for v in values[max(0, i - window + 1): i + 1] if v is not None]
+        if len(window_vals) < min(window, 5):
+            out.append(None)
+        else:
+            out.append(sum(window_vals) / len(window_vals))
+    return out
+
+
+def old_calc_ratio_ma(history, window):
+    """gold_egg_price.calc_ratio_ma"""
+    values = []
+    for rec in history:
+        v = rec.get("gold_egg_ratio")
+        if v is not None:
+            values.append(v)
+        if len(values) >= window:
+            break
+    if not values:
+        return None, 0
+    return sum(values) / len(values), len(values)
+
+
+def old_calc_ma(history, field, period):
+    """send_feishu.calc_ma"""
+    values = []
+    for rec in history:
+        v = rec.get(field)
+        if v is not None:
+            values.append(v)
+        if len(values) == period:
+            break
+    if not values:
+        return None, 0
+    return sum(values) / len(values), len(values)
+
+
+def old_deviation(price, ma_val):
+    """send_feishu / gold_egg_price 的偏离百分比"""
+    if price is None or ma_val is None:
+        return None
+    return (price - ma_val) / ma_val * 100
+
+
+def naive_rolling_std(values, window, min_periods):
+    out = []
+    for i in range(len(values)):
+        window_vals = [v for v in values[max(0, i - window + 1): i + 1] if v is not None]
+        out.append(statistics.pstdev(window_vals) if len(window_vals) >= min_periods else None)
+    return out
+
+
+# ── 比对 ──
+
+def _close(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(a, b, rel_tol=REL_TOL, abs_tol=ABS_TOL)
+
+
+def _compare_lists(name, got, want, failures):
+    if len(got) != len(want):
+        failures.append(f"{name}: 长度 {len(got)} != {len(want)}")
+        return
+    for i, (g, w) in enumerate(zip(got, want)):
+        if not _close(g, w):
+            failures.append(f"{name}[{i}]: {g!r} != {w!r}")
+            return
+
+
+def _with_holes(records, field, every):
+    """复制记录并把每 every 条中的一条字段置为 None"""
+    out = [dict(r) for r in records]
+    for i in range(0, len(out), every):
+        out[i][field] = None
+    return out
+
+
+def datasets():
+    """[(名称, 按日期正序的记录)]"""
+    committed = history_store.read_range()
+    synthetic = list(reversed(sample_history.synthetic_history(500)))
+    sets = [("committed", committed), ("synthetic", synthetic)]
+    for base_name, base in (("committed", committed), ("synthetic", synthetic)):
+        sets.append((f"{base_name}+holes/3", _with_holes(base, "gold_egg_ratio", 3)))
+        sets.append((f"{base_name}+holes/7", _with_holes(base, "gold_egg_ratio", 7)))
+        sets.append((f"{base_name}[:4]", base[:4]))
+        sets.append((f"{base_name}[:12]", base[:12]))
+    sets.append(("empty", []))
+    sets.append(("all-none", [{"date": "2026-01-01", "gold_egg_ratio": None}] * 25))
+    return sets
+
+
+def check(records, label):
+    """比对一组记录（按日期正序），返回不一致描述列表"""
+    failures = []
+    for field in ("gold_egg_ratio", "gold_price"):
+        values = [r.get(field) for r in records]
+        newest_first = list(reversed(records))
+        for w in WINDOWS:
+            tag = f"{label}/{field}/w={w}"
+            min_periods = min(w, 5)
+            ma = stats.rolling_mean(values, w, min_periods=min_periods)
+            _compare_lists(f"{tag} rolling_mean", ma, old_rolling_ma(values, w), failures)
+            _compare_lists(f"{tag} rolling_std", stats.rolling_std(values, w, min_periods=min_periods),
+                           naive_rolling_std(values, w, min_periods), failures)
+            _compare_lists(f"{tag} rolling_deviation_pct",
+                           stats.rolling_deviation_pct(values, w, min_periods=min_periods),
+                           [old_deviation(v, m) for v, m in zip(values, old_rolling_ma(values, w))], failures)
+
+            # 最新在前取前 w 个有效值：对每个"截至某天"的历史视图都比一次（要求完全相等）
+            for end in range(len(newest_first) + 1):
+                view = newest_first[end:]
+                got = stats.recent_mean(stats.iter_series(view, field), w)
+                want = old_calc_ma(view, field, w)
+                if field == "gold_egg_ratio" and old_calc_ratio_ma(view, w) != want:
+                    failures.append(f"{tag} 旧实现 calc_ratio_ma 与 calc_ma 不一致 @ {end}")
+                if got != want:
+                    failures.append(f"{tag} recent_mean @ {end}: {got!r} != {want!r}")
+                    break
+                price = view[0].get(field) if view else None
+                if stats.pct_deviation(price, got[0]) != old_deviation(price, want[0]):
+                    failures.append(f"{tag} pct_deviation @ {end}")
+                    break
+    return failures
+
+
+def run(label):
+    failures = []
+    for name, records in datasets():
+        failures += check(records, f"{label}:{name}")
+    print(f"[信息] {label} 路径: {'一致' if not failures else f'{len(failures)} 处不一致'}", file=sys.stderr)
+    for line in failures[:20]:
+        print(f"  {line}", file=sys.stderr)
+    return failures
+
+
+def main():
+    failures = []
+    if stats._numpy() is not None:
+        failures += run("numpy")
+    saved = stats._np
+    stats._np = False               # 强制走纯 Python 实现
+    try:
+        failures += run("python")
+    finally:
+        stats._np = saved
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
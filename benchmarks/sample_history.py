@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+sample_history.py
+=================
+基准用的合成历史：字段与每日任务写入的记录一致，价格按随机游走生成（固定种子，可复现）。
+"""
+
+import datetime
+import random
+
+END_DATE = datetime.date(2026, 10, 16)
+
+
+def synthetic_history(n, end=END_DATE, seed=20251024):
+    """返回 n 条连续日期的记录（最新在前），与 history_store.load_history() 的顺序一致"""
+    rng = random.Random(seed)
+    gold, egg, futures = 600.0, 4.5, 3.8
+    records = []
+    for i in range(n):
+        date = end - datetime.timedelta(days=n - 1 - i)
+        gold = max(200.0, gold * (1 + rng.gauss(0, 0.008)))
+        egg = min(8.0, max(2.5, egg * (1 + rng.gauss(0, 0.01))))
+        futures = min(7.0, max(2.0, futures * (1 + rng.gauss(0, 0.012))))
+        etf = gold / 100 * (1 + rng.gauss(0, 0.003))
+        records.append({
+            "date": date.isoformat(),
+            "timestamp": f"{date.isoformat()}T02:30:00",
+            "gold_price": round(gold, 2),
+            "gold_price_source": "sge_api",
+            "egg_price": round(egg, 2),
+            "egg_price_source": "100ppi",
+            "egg_price_futures": round(futures, 3),
+            "egg_futures_contract": "JD0",
+            "gold_etf_518880": round(etf, 3),
+            "gold_etf_premium_pct": round((etf - gold / 100) / (gold / 100) * 100, 4),
+            "rice_price": None,
+            "gold_egg_ratio": gold / egg,
+            "gold_rice_ratio": None,
+            "gold_egg_futures_ratio": gold / futures,
+            "errors": [],
+        })
+    records.reverse()
+    return records
+
+
+def next_record(history, offset=1):
+    """history 最新一天之后第 offset 天的新记录（用于基准 save_price_data）"""
+    latest = history[0]
+    date = datetime.date.fromisoformat(latest["date"]) + datetime.timedelta(days=offset)
+    return {**latest, "date": date.isoformat(), "timestamp": f"{date.isoformat()}T02:30:00"}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+sample_pages.py
+===============
+基准用的网页样本：优先读取保存下来的真实页面，缺失时生成结构一致的合成页面。
+
+保存真实页面（任意一种）：
+  - 把浏览器 "另存为" 的页面放到 benchmarks/pages/sge_daily.html、benchmarks/pages/egg_kx.html
+  - 或通过命令行参数 --sge-page / --egg-page 指定路径
+
+SGE 页面未另行保存时，使用仓库自带的 assets/demo.html（真实的 daily_new 页面）。
+"""
+
+import os
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+SGE_PAGE = os.path.join(PAGES_DIR, "sge_daily.html")
+EGG_PAGE = os.path.join(PAGES_DIR, "egg_kx.html")
+SGE_DEMO_PAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "demo.html")
+
+_CONTRACTS = ("Au99.99", "Au99.95", "Au100g", "Pt99.95", "Au(T+D)", "mAu(T+D)", "Ag(T+D)", "Au(T+N1)")
+
+
+def _chrome(body, filler_blocks):
+    """包一层与真实站点相近的页头、导航、脚本与页脚，让解析器处理完整大小的页面"""
+    nav = "".join(f'<li class="nav-item"><a href="/page/{i}">栏目 {i}</a></li>' for i in range(80))
+    filler = "".join(
+        f'<div class="news-item"><a href="/news/{i}">市场资讯标题 {i}</a>'
+        f'<span class="date">2026-10-{i % 28 + 1:02d}</span><p>{"行情评述内容。" * 12}</p></div>'
+        for i in range(filler_blocks)
+    )
+    script = "<script>var cfg = {" + ",".join(f'"k{i}": {i}' for i in range(300)) + "};</script>"
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>sample</title>'
+        f'<style>{".c{color:#333}" * 200}</style>{script}</head><body>'
+        f'<ul class="nav">{nav}</ul><div class="main">{body}</div>'
+        f'<div class="side">{filler}</div><footer>版权所有</footer></body></html>'
+    )
+
+
+def sge_daily_page(days=7, filler_blocks=150):
+    rows = []
+    for d in range(days):
+        date = f"2026-10-{16 - d:02d}"
+        for j, contract in enumerate(_CONTRACTS):
+            close = 900 + d + j * 0.5
+            rows.append(
+                f"<tr><td>{date}</td><td>{contract}</td><td>{close - 3:.2f}</td>"
+                f"<td>{close + 2:.2f}</td><td>{close - 4:.2f}</td><td>{close:,.2f}</td>"
+                f"<td>{close - 1:.2f}</td><td>0.12%</td><td>1,234.5</td><td>1,111,234.00</td></tr>"
+            )
+    table = (
+        '<table class="daily_new_table"><thead><tr><th>日期</th><th>合约</th><th>开盘价</th>'
+        "<th>最高价</th><th>最低价</th><th>收盘价</th><th>涨跌</th><th>涨跌幅</th>"
+        f'<th>加权平均价</th><th>成交量</th></tr></thead><tbody>{"".join(rows)}</tbody></table>'
+    )
+    return _chrome(table, filler_blocks)
+
+
+def egg_kx_page(filler_blocks=250):
+    quote = (
+        '<div class="kx"><p>10月16日全国鸡蛋参考价为<span class="num">&nbsp;10.62</span>元/公斤，'
+        "较昨日持平。</p></div>"
+    )
+    return _chrome(quote, filler_blocks)
+
+
+def load_pages(sge_path=None, egg_path=None):
+    """返回 {名称: (html, 来源说明)}"""
+    pages = {}
+    for name, paths, builder in (
+        ("sge", [sge_path] if sge_path else [SGE_PAGE, SGE_DEMO_PAGE], sge_daily_page),
+        ("egg", [egg_path or EGG_PAGE], egg_kx_page),
+    ):
+        path = next((p for p in paths if os.path.exists(p)), None)
+        if path:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages[name] = (f.read(), path)
+        else:
+            pages[name] = (builder(), "synthetic")
+    return pages
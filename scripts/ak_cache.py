@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ak_cache.py
+===========
+akshare DataFrame 的本地磁盘缓存。
+
+  - 每个 (函数名, 参数) 一个条目，以列式 JSON（gzip）保存：{列名: [值...]}，体积小、无额外依赖
+  - 条目有各自的 TTL；过期后若缓存已包含今天的交易日，直接复用而不联网
+  - 支持日期区间参数的接口（fund_etf_hist_em）过期时只拉取缓存最后日期之后的行再拼接
+  - 缓存目录总大小超过上限时，按最近使用时间淘汰最旧的条目
+
+用法：
+  df = ak_cache.call(ak, "spot_hist_sge", symbol="Au99.99")
+"""
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+
+import cassette
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache", "akshare")
+
+DEFAULT_TTL = 6 * 3600              # 秒
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # 缓存目录总大小上限
+
+# 函数名 → (日期列, 是否支持 start_date/end_date 增量拉取)
+FRAME_SPECS = {
+    "spot_hist_sge": ("date", False),
+    "futures_zh_daily_sina": ("date", False),
+    "fund_etf_hist_em": ("日期", True),
+}
+RANGE_ARGS = ("start_date", "end_date")
+
+
+def _iso(value):
+    """YYYYMMDD / YYYY-MM-DD / date / Timestamp 统一为 YYYY-MM-DD"""
+    text = str(value)[:10]
+    if len(text) >= 8 and text[:8].isdigit():
+        return f"{text[:4]}-{text[4:6]}-{text[6:8]}"
+    return text
+
+
+def _entry_path(func_name, kwargs):
+    # 区间参数不进 key：同一标的的不同窗口共用一个条目
+    key_args = {k: v for k, v in sorted(kwargs.items()) if k not in RANGE_ARGS}
+    raw = json.dumps([func_name, key_args], ensure_ascii=False, default=str)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{func_name}-{digest}.json.gz")
+
+
+# ── 列式序列化 ──
+
+def frame_to_columns(df):
+    """DataFrame → ({列名: [值]}, {列名: 类型})；类型为 date / datetime / num / str"""
+    columns = {}
+    dtypes = {}
+    for name in df.columns:
+        col = df[name]
+        kind = col.dtype.kind
+        if kind in "fiub":
+            dtypes[name] = "num"
+            columns[name] = [None if v != v else v for v in col.tolist()]
+        elif kind == "M":
+            dtypes[name] = "datetime"
+            columns[name] = [None if v != v else str(v) for v in col.tolist()]
+        else:
+            values = col.tolist()
+            sample = next((v for v in values if v is not None), None)
+            if isinstance(sample, datetime.date):
+                dtypes[name] = "date"
+                columns[name] = [None if v is None else v.isoformat() for v in values]
+            else:
+                dtypes[name] = "str"
+                columns[name] = [None if v is None or v != v else str(v) for v in values]
+    return columns, dtypes
+
+
+def columns_to_frame(columns, dtypes):
+    """frame_to_columns 的逆操作"""
+    import pandas as pd
+
+    df = pd.DataFrame(columns)
+    for name, kind in dtypes.items():
+        if kind == "date":
+            df[name] = pd.to_datetime(df[name]).dt.date
+        elif kind == "datetime":
+            df[name] = pd.to_datetime(df[name])
+        elif kind == "num":
+            df[name] = pd.to_numeric(df[name])
+    return df
+
+
+def _load(path):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)  # 记录最近使用时间，供淘汰
+    return entry
+
+
+def _save(path, func_name, kwargs, df, ttl, range_start):
+    """写入缓存条目；写失败只告警，不影响调用方拿到数据"""
+    try:
+        _write_entry(path, func_name, kwargs, df, ttl, range_start)
+        evict()
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[警告] 写入 akshare 缓存失败: {e}", file=sys.stderr)
+
+
+def _write_entry(path, func_name, kwargs, df, ttl, range_start):
+    columns, dtypes = frame_to_columns(df)
+    entry = {
+        "func": func_name,
+        "args": {k: str(v) for k, v in kwargs.items() if k not in RANGE_ARGS},
+        "fetched_at": time.time(),
+        "ttl": ttl,
+        "range_start": range_start,
+        "dtypes": dtypes,
+        "columns": columns,
+    }
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """缓存目录超过 max_bytes 时，按最近使用时间从旧到新删除条目"""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        st = os.stat(path)
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+def _last_date(columns, date_col):
+    dates = [d for d in columns.get(date_col, []) if d]
+    return _iso(max(dates)) if dates else None
+
+
+def _clip(df, date_col, kwargs):
+    """按调用方请求的 start_date / end_date 截取缓存中的行"""
+    start, end = kwargs.get("start_date"), kwargs.get("end_date")
+    if not start and not end:
+        return df
+    dates = df[date_col].map(_iso)
+    mask = dates >= _iso(start) if start else dates == dates
+    if end:
+        mask &= dates <= _iso(end)
+    return df[mask].reset_index(drop=True)
+
+
+def call(ak, func_name, ttl=DEFAULT_TTL, **kwargs):
+    """带缓存地调用 getattr(ak, func_name)(**kwargs)，返回 DataFrame"""
+    fetch = getattr(ak, func_name)
+    if cassette.active():
+        # 录制 / 回放时绕过缓存，保证每次调用都经过磁带
+        return fetch(**kwargs)
+    date_col, incremental = FRAME_SPECS.get(func_name, (None, False))
+    path = _entry_path(func_name, kwargs)
+    today = datetime.date.today().isoformat()
+    start = _iso(kwargs["start_date"]) if kwargs.get("start_date") else None
+
+    entry = _load(path) if os.path.exists(path) else None
+    if entry is not None and start and (entry.get("range_start") or "") > start:
+        entry = None  # 缓存窗口没覆盖到请求的起点，整段重拉
+
+    cached = None
+    if entry is not None:
+        try:
+            cached = columns_to_frame(entry["columns"], entry["dtypes"])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[警告] akshare 缓存条目损坏，重新拉取: {e}", file=sys.stderr)
+
+    if cached is not None:
+        last = _last_date(entry["columns"], date_col) if date_col else None
+        age = time.time() - entry["fetched_at"]
+        if age < entry.get("ttl", ttl) or (last and last >= today):
+            print(f"[调试] akshare 缓存命中: {func_name}（{int(age)}s 前）", file=sys.stderr)
+            return _clip(cached, date_col, kwargs) if date_col else cached
+
+        if incremental and last:
+            # 从缓存最后一天（含）开始拉，覆盖当天可能不完整的行
+            fresh = fetch(**{**kwargs, "start_date": last.replace("-", "")})
+            if fresh is not None and not fresh.empty:
+                import pandas as pd
+
+                merged = pd.concat([cached, fresh], ignore_index=True)
+                merged = merged.assign(_d=merged[date_col].map(_iso))
+                merged = merged.drop_duplicates("_d", keep="last").sort_values("_d").drop(columns="_d")
+                merged = merged.reset_index(drop=True)
+            else:
+                merged = cached
+            print(f"[调试] akshare 增量刷新: {func_name} 自 {last} 起 {0 if fresh is None else len(fresh)} 行",
+                  file=sys.stderr)
+            _save(path, func_name, kwargs, merged, ttl, entry.get("range_start"))
+            return _clip(merged, date_col, kwargs)
+
+    df = fetch(**kwargs)
+    if df is not None and not df.empty:
+        _save(path, func_name, kwargs, df, ttl, start)
+    return df
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+backfill.py
+===========
+用 akshare 的完整日线一次性回填历史记录。
+
+  - 黄金 Au99.99：ak.spot_hist_sge 返回全部日线
+  - 鸡蛋期货 JD0：ak.futures_zh_daily_sina 返回全部日线
+  - 黄金 ETF 518880：ak.fund_etf_hist_em 按 --start 起拉一个宽窗口
+
+三张表按日期外连接后，向量化计算 ETF 折溢价与 金价/期货蛋价 比例，
+再按年份分片批量写入（每个分片只重写一次）。
+
+已有记录默认只补空字段，不覆盖每日任务写入的值（--overwrite 可强制覆盖）。
+100ppi 现货没有历史接口，新回填的日期 egg_price / gold_egg_ratio 为空。
+
+用法：
+  python scripts/backfill.py [--start 2020-01-01] [--end 2026-10-01] [--overwrite]
+"""
+
+import argparse
+import datetime
+import sys
+
+import ak_cache
+import gold_egg_price
+import history_store
+
+BACKFILL_FIELDS = ("gold_price", "egg_price_futures", "gold_etf_518880",
+                   "gold_etf_premium_pct", "gold_egg_futures_ratio")
+ETF_EARLIEST = "2013-07-01"         # 518880 上市前无数据
+
+
+def _date_col(col):
+    """把 date / Timestamp / 字符串统一成 YYYY-MM-DD 字符串"""
+    return col.astype(str).str[:10]
+
+
+def build_frame(gold_df, futures_df, etf_df):
+    """把三张原始日线按日期外连接，并计算派生列；返回按日期升序的 DataFrame"""
+    gold = gold_df.assign(date=_date_col(gold_df["date"]))[["date", "close"]]
+    gold = gold.rename(columns={"close": "gold_price"})
+
+    futures = futures_df.assign(date=_date_col(futures_df["date"]))[["date", "close"]]
+    futures = futures.assign(
+        egg_price_futures=futures["close"].astype(float) / gold_egg_price.EGG_FUTURES_UNIT_PER_JIN
+    )[["date", "egg_price_futures"]]
+
+    frame = gold.merge(futures, on="date", how="outer")
+    if etf_df is not None and not etf_df.empty:
+        etf = etf_df.assign(date=_date_col(etf_df["日期"]))[["date", "收盘"]]
+        etf = etf.rename(columns={"收盘": "gold_etf_518880"})
+        frame = frame.merge(etf, on="date", how="outer")
+    else:
+        frame = frame.assign(gold_etf_518880=float("nan"))
+
+    frame = frame.astype({"gold_price": float, "gold_etf_518880": float})
+    # 与 calc_etf_premium_pct 同口径：理论价 = 克金价 / 100
+    theoretical = frame["gold_price"] / gold_egg_price.GOLD_ETF_SHARE_PER_GRAM
+    frame["gold_etf_premium_pct"] = (frame["gold_etf_518880"] - theoretical) / theoretical * 100
+    frame["gold_egg_futures_ratio"] = frame["gold_price"] / frame["egg_price_futures"]
+    return frame.drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
+
+
+def _new_record(date, timestamp):
+    """与每日任务写入的记录保持同样的字段集合"""
+    return {
+        "date": date,
+        "timestamp": timestamp,
+        "gold_price": None,
+        "gold_price_source": None,
+        "egg_price": None,
+        "egg_price_source": None,
+        "egg_price_futures": None,
+        "egg_futures_contract": None,
+        "gold_etf_518880": None,
+        "gold_etf_premium_pct": None,
+        "rice_price": None,
+        "gold_egg_ratio": None,
+        "gold_rice_ratio": None,
+        "gold_egg_futures_ratio": None,
+        "errors": [],
+        "backfilled": True,
+    }
+
+
+def merge_records(frame, existing, overwrite=False):
+    """把回填表合并进已有记录，返回需要写入的记录列表"""
+    timestamp = datetime.datetime.now().isoformat()
+    # NaN 转 None 后一次性转成 dict，避免逐行访问 DataFrame
+    rows = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    out = []
+    for row in rows:
+        record = existing.get(row["date"])
+        record = dict(record) if record is not None else _new_record(row["date"], timestamp)
+        changed = False
+        for field in BACKFILL_FIELDS:
+            value = row.get(field)
+            if value is None or (record.get(field) is not None and not overwrite):
+                continue
+            record[field] = value
+            changed = True
+        if not changed:
+            continue
+        if record.get("gold_price") is not None and record.get("gold_price_source") is None:
+            record["gold_price_source"] = "sge_api"
+        if record.get("egg_price_futures") is not None and record.get("egg_futures_contract") is None:
+            record["egg_futures_contract"] = gold_egg_price.EGG_FUTURES_SYMBOL
+        out.append(record)
+    return out
+
+
+def backfill(start=None, end=None, overwrite=False):
+    """拉取完整日线并批量写入，返回写入的记录数"""
+    ak = gold_egg_price._akshare()
+    if ak is None:
+        raise RuntimeError("回填需要 akshare，请先 pip install akshare")
+
+    end = end or datetime.date.today().isoformat()
+    etf_start = max(start or ETF_EARLIEST, ETF_EARLIEST)
+    gold_df = ak_cache.call(ak, "spot_hist_sge", symbol="Au99.99")
+    futures_df = ak_cache.call(ak, "futures_zh_daily_sina", symbol=gold_egg_price.EGG_FUTURES_SYMBOL)
+    etf_df = ak_cache.call(
+        ak, "fund_etf_hist_em", symbol=gold_egg_price.GOLD_ETF_SYMBOL, period="daily",
+        start_date=etf_start.replace("-", ""), end_date=end.replace("-", ""), adjust="",
+    )
+    print(
+        f"[信息] 拉取完成：Au99.99 {len(gold_df)} 行，{gold_egg_price.EGG_FUTURES_SYMBOL} {len(futures_df)} 行，"
+        f"ETF {gold_egg_price.GOLD_ETF_SYMBOL} {0 if etf_df is None else len(etf_df)} 行",
+        file=sys.stderr,
+    )
+
+    frame = build_frame(gold_df, futures_df, etf_df)
+    frame = frame[(frame["date"] >= (start or "")) & (frame["date"] <= end)]
+    if frame.empty:
+        return 0
+
+    existing = {r["date"]: r for r in history_store.read_range(frame["date"].iloc[0], frame["date"].iloc[-1])}
+    records = merge_records(frame, existing, overwrite=overwrite)
+    if records:
+        history_store.write_records(records)
+    print(
+        f"[信息] 回填 {frame['date'].iloc[0]} ~ {frame['date'].iloc[-1]}：写入 {len(records)} 条"
+        f"（其中新增 {sum(1 for r in records if r['date'] not in existing)} 条）",
+        file=sys.stderr,
+    )
+    return len(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用 akshare 完整日线批量回填历史记录")
+    parser.add_argument("--start", help="起始日期 YYYY-MM-DD（默认不限）")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD（默认今天）")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已有记录中的同名字段")
+    args = parser.parse_args(argv)
+
+    try:
+        count = backfill(args.start, args.end, args.overwrite)
+    except Exception as e:
+        print(f"[错误] 回填失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"回填完成，写入 {count} 条记录")
+
+
+if __name__ == "__main__":
+    main()
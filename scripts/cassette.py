@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cassette.py
+===========
+数据源的录制 / 回放，用于离线基准测试与回归测试。
+
+  - record：真实请求照常发出，同时把每个 HTTP 响应和每个 akshare DataFrame 存进磁带目录
+  - replay：不联网、不需要 akshare，直接从磁带目录返回；可按固定延迟或录制时的真实耗时模拟网络
+  - 磁带目录记录录制当天的日期，回放时 today() 返回该日期，保证 URL 与日期窗口一致
+
+目录结构：
+  <dir>/meta.json          录制日期
+  <dir>/http/<key>.json    HTTP 响应（方法、URL、状态码、响应头、正文、耗时）
+  <dir>/akshare/<key>.json.gz  DataFrame（与 ak_cache 相同的列式格式）
+"""
+
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+_state = {"mode": None, "dir": None, "latency": 0.0, "today": None}
+
+
+class CassetteMiss(LookupError):
+    """回放模式下磁带中没有对应的录制"""
+
+
+def configure(mode, directory, latency=0.0):
+    """mode 为 "record" / "replay" / None；latency 为每次回放的固定延迟（秒）或 "recorded" """
+    _state.update(mode=mode, dir=directory, latency=latency, today=None)
+    if mode is None:
+        return
+    meta_path = os.path.join(directory, "meta.json")
+    if mode == "record":
+        os.makedirs(directory, exist_ok=True)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"recorded_on": datetime.date.today().isoformat()}, f)
+    else:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            _state["today"] = datetime.date.fromisoformat(json.load(f)["recorded_on"])
+    print(f"[信息] 磁带{'录制' if mode == 'record' else '回放'}模式: {directory}", file=sys.stderr)
+
+
+def active():
+    return _state["mode"] is not None
+
+
+def replaying():
+    return _state["mode"] == "replay"
+
+
+def today():
+    """回放时返回录制当天，否则返回今天"""
+    return _state["today"] or datetime.date.today()
+
+
+def _simulate(elapsed):
+    latency = _state["latency"]
+    delay = elapsed if latency == "recorded" else float(latency or 0)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _key(*parts):
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _write(path, data, compress=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    opener = gzip.open if compress else open
+    with opener(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ── HTTP ──
+
+def _http_path(method, url, kwargs):
+    body = kwargs.get("json") if kwargs.get("json") is not None else kwargs.get("data")
+    return os.path.join(_state["dir"], "http", _key(method.upper(), url, kwargs.get("params"), body) + ".json")
+
+
+def http_request(send, method, url, **kwargs):
+    """录制 / 回放一次 HTTP 请求；send 为真正发请求的函数"""
+    import requests
+
+    path = _http_path(method, url, kwargs)
+    if replaying():
+        if not os.path.exists(path):
+            raise requests.exceptions.ConnectionError(f"磁带中没有该请求: {method} {url}")
+        with open(path, "r", encoding="utf-8") as f:
+            rec = json.load(f)
+        _simulate(rec.get("elapsed", 0))
+        resp = requests.models.Response()
+        resp.status_code = rec["status"]
+        resp.headers = requests.structures.CaseInsensitiveDict(rec["headers"])
+        resp._content = base64.b64decode(rec["body"])
+        resp.encoding = rec.get("encoding")
+        resp.url = url
+        return resp
+
+    started = time.monotonic()
+    resp = send(method, url, **kwargs)
+    _write(path, {
+        "method": method.upper(),
+        "url": url,
+        "status": resp.status_code,
+        "headers": dict(resp.headers),
+        "encoding": resp.encoding,
+        "body": base64.b64encode(resp.content).decode("ascii"),
+        "elapsed": time.monotonic() - started,
+    })
+    return resp
+
+
+# ── akshare ──
+
+class AkshareProxy:
+    """包在 akshare 模块外面：ak.xxx(**kwargs) 的返回值被录制 / 从磁带回放"""
+
+    def __init__(self, ak):
+        self._ak = ak
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            import ak_cache
+
+            # 与 ak_cache 一样忽略日期区间参数，回放日期不同也能命中
+            key_args = {k: v for k, v in kwargs.items() if k not in ak_cache.RANGE_ARGS}
+            path = os.path.join(_state["dir"], "akshare", f"{name}-{_key(name, key_args)}.json.gz")
+            if replaying():
+                if not os.path.exists(path):
+                    raise CassetteMiss(f"磁带中没有 akshare 调用: {name}({key_args})")
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    rec = json.load(f)
+                _simulate(rec.get("elapsed", 0))
+                return ak_cache.columns_to_frame(rec["columns"], rec["dtypes"])
+
+            started = time.monotonic()
+            df = getattr(self._ak, name)(**kwargs)
+            if df is not None:
+                columns, dtypes = ak_cache.frame_to_columns(df)
+                _write(path, {"func": name, "args": {k: str(v) for k, v in key_args.items()},
+                              "elapsed": time.monotonic() - started,
+                              "columns": columns, "dtypes": dtypes}, compress=True)
+            return df
+
+        return call
+
+
+def wrap_akshare(ak):
+    """录制模式包一层代理；回放模式即使 akshare 未安装也返回代理"""
+    if replaying():
+        return AkshareProxy(None)
+    if _state["mode"] == "record" and ak is not None:
+        return AkshareProxy(ak)
+    return ak
@@ -3,570 +3,326 @@
 """
 generate_html.py
 ================
-读取价格历史数据并生成可视化 HTML 页面
+读取价格历史数据，生成可视化页面。页面拆成两部分：
+
+  - index.html：静态外壳（assets/dashboard/ 下的 HTML / CSS / JS 拼成，CSS / JS 压缩后内联），
+    不含任何数据，模板不变时内容不变，不会重写
+  - static/chart-<版本>.<哈希>.js：本地固定版本的 Chart.js（static_assets），文件名带内容哈希，
+    可长期缓存；没有 vendor 文件时外壳回退到 CDN
+  - data/dashboard.json：外壳加载的紧凑数据（最新卡片、图表序列），
+    文件内记录输入历史的哈希，输入没变时跳过构建与写入
+  - data/pages/：按年份分页的完整历史（<年份>.json）与清单 manifest.json，
+    页面表格虚拟滚动、按需加载分页；只重建分片内容变化的年份
+
+图表提供 30 天 / 1 年 / 全部三个区间，序列由完整历史预先算好：30 天为原始点，
+更长区间用 LTTB（stats.lttb）降到 CHART_POINTS 个点以内，多年数据也能即时渲染。
+
+所有输出都只在内容变化时落盘，未变化的运行不产生新的提交；每个输出旁边同时写出
+预压缩的 .gz（装了 brotli 时还有 .br），供静态服务直接返回；这些副本不入库（.gitignore）。
 """
 
+import datetime
+import hashlib
 import json
 import os
 import sys
-from datetime import datetime
 
-# 数据和输出路径
+import history_store
+import metrics
+import static_assets
+import stats
+
+# 输出路径
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-DATA_DIR = os.path.join(PROJECT_DIR, "data")
-HISTORY_FILE = os.path.join(DATA_DIR, "price_history.json")
 OUTPUT_HTML = os.path.join(PROJECT_DIR, "index.html")
+TEMPLATE_DIR = os.path.join(PROJECT_DIR, "assets", "dashboard")
+DATA_FILE_NAME = "dashboard.json"  # 写在 history_store.DATA_DIR 下，外壳按 data/dashboard.json 加载
 
-def load_price_history():
-    """加载历史价格数据"""
-    if not os.path.exists(HISTORY_FILE):
-        print(f"[错误] 历史数据文件不存在: {HISTORY_FILE}", file=sys.stderr)
-        return []
+MA_WINDOW = 20
+HISTORY_DAYS = 1                    # 卡片只用最新一条（图表序列与表格分页另读完整历史）
+RATIO_LOW = 80.0                    # 金蛋比参考区间
+RATIO_HIGH = 150.0
+
+# 图表区间：(键, 距最新日期的天数)，None 为全部历史
+CHART_RANGES = (("30d", 30), ("1y", 365), ("all", None))
+CHART_POINTS = 200                  # 每条序列的点数上限，超过时 LTTB 降采样
+# 图表序列：键 → 记录字段（ma 由 ratio 滚动计算）
+CHART_SERIES = (("gold", "gold_price"), ("egg", "egg_price"), ("ratio", "gold_egg_ratio"))
+
+DATA_VERSION = 4                    # 数据格式或构建逻辑变化时递增，强制重写 dashboard.json
+PAGES_DIR_NAME = "pages"            # 表格分页目录（history_store.DATA_DIR 下）
+PAGES_VERSION = 4                   # 分页格式变化时递增，强制重建全部分页
+VALUE_DECIMALS = 4                  # JSON 中数值保留的小数位（页面最多显示 3 位）
+# 卡片用到的最新记录字段
+LATEST_FIELDS = (
+    "gold_price", "gold_price_source", "egg_price", "egg_price_futures", "gold_egg_ratio",
+    "ratio_ma20", "ratio_ma20_deviation_pct", "ratio_ma20_count",
+    "gold_etf_518880", "gold_etf_premium_pct",
+)
+# 表格分页的列（最后一列为 1 正常 / 0 有错误）
+TABLE_COLUMNS = ("date", "gold_price", "egg_price", "gold_egg_ratio", "gold_etf_518880", "egg_price_futures", "ok")
+
+
+def data_file():
+    return os.path.join(history_store.DATA_DIR, DATA_FILE_NAME)
 
+
+def pages_dir():
+    return os.path.join(history_store.DATA_DIR, PAGES_DIR_NAME)
+
+def load_price_history():
+    """加载页面所需的最近 HISTORY_DAYS 条历史价格数据（最新在前）"""
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            print(f"[信息] 成功加载 {len(data)} 条历史记录", file=sys.stderr)
-            return data
+        data = history_store.read_latest(HISTORY_DAYS)
+        print(f"[信息] 成功加载 {len(data)} 条历史记录", file=sys.stderr)
+        return data
     except Exception as e:
         print(f"[错误] 加载历史数据失败: {e}", file=sys.stderr)
         return []
 
-MA_WINDOW = 20
-
 
-def _rolling_ma(values, window):
-    """对 None 安全的滚动平均：每个位置取过去 window 个有效值的均值（不足则为 None）"""
-    out = []
-    for i in range(len(values)):
-        window_vals = [v for v in values[max(0, i - window + 1): i + 1] if v is not None]
-        if len(window_vals) < min(window, 5):  # 至少 5 个样本才出 MA，否则 None
-            out.append(None)
-        else:
-            out.append(sum(window_vals) / len(window_vals))
+def render_shell(chart_src=static_assets.CHART_JS_URL):
+    """把模板里的 CSS / JS 压缩后内联进外壳 HTML，返回页面文本（不含数据）；
+    chart_src 为页面引用 Chart.js 的地址"""
+    def read(name):
+        with open(os.path.join(TEMPLATE_DIR, name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    return (read("shell.html")
+            .replace("{{chart_js}}", chart_src)
+            .replace("{{style}}", static_assets.minify_css(read("dashboard.css")))
+            .replace("{{script}}", static_assets.minify_js(read("dashboard.js"))))
+
+
+def publish_chart_js():
+    """把本地固定版本的 Chart.js 发布成 static/ 下带内容哈希的文件，返回外壳引用的地址；
+    没有 vendor 文件时返回 CDN 地址"""
+    data = static_assets.read_chart_js()
+    if data is None:
+        print("[警告] 未找到本地 Chart.js（python scripts/static_assets.py --vendor 下载），页面使用 CDN",
+              file=sys.stderr)
+        return static_assets.CHART_JS_URL
+    name = static_assets.hashed_name(f"chart-{static_assets.CHART_JS_VERSION}", data, ".js")
+    write_output(os.path.join(static_assets.STATIC_DIR, name), data)
+    static_assets.remove_stale(static_assets.STATIC_DIR, "chart-", [name])
+    return f"{os.path.basename(static_assets.STATIC_DIR)}/{name}"
+
+
+def input_hash(history):
+    """页面数据输入的哈希：最新记录 + 历史分片指纹 + 数据格式版本 + 影响输出的常量。
+    分片指纹是各分片的内容哈希，历史没变时不必解析完整历史就能判断跳过。"""
+    payload = json.dumps(
+        [DATA_VERSION, MA_WINDOW, RATIO_LOW, RATIO_HIGH, CHART_RANGES, CHART_POINTS,
+         history_store.fingerprint(), history],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _compact(value):
+    return round(value, VALUE_DECIMALS) if isinstance(value, float) else value
+
+
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+def _day_number(date_text):
+    """YYYY-MM-DD → 1970-01-01 起的天数（图表 x 轴用整数，页面再格式化回日期）"""
+    return datetime.date.fromisoformat(date_text[:10]).toordinal() - _EPOCH
+
+
+def build_series(records):
+    """由按日期正序的完整历史构建各区间的图表序列：{区间: {序列: [[x...], [y...]]}}。
+    MA 先在完整历史上滚动计算再截取，区间开头的均线也有完整窗口。"""
+    xs = [_day_number(r["date"]) for r in records]
+    columns = {key: [r.get(field) for r in records] for key, field in CHART_SERIES}
+    # 滚动 20 日均比，至少 5 个样本才出 MA，否则 None
+    columns["ma"] = stats.rolling_mean(columns["ratio"], MA_WINDOW, min_periods=min(MA_WINDOW, 5))
+
+    out = {}
+    for name, days in CHART_RANGES:
+        start = 0
+        if days is not None and xs:
+            cutoff = xs[-1] - days + 1
+            start = next((i for i, x in enumerate(xs) if x >= cutoff), len(xs))
+        out[name] = {}
+        for key, values in columns.items():
+            x, y = stats.lttb(xs[start:], values[start:], CHART_POINTS)
+            out[name][key] = [x, [_compact(v) for v in y]]
     return out
 
 
-def generate_html(history_data):
-    """生成 HTML 页面"""
-
-    # ── 数据准备（图表用正序）──
-    dates = []
-    gold_prices = []
-    egg_prices = []
-    ratios = []
-    for record in reversed(history_data):
-        dates.append(record['date'])
-        gold_prices.append(record.get('gold_price'))
-        egg_prices.append(record.get('egg_price'))
-        ratios.append(record.get('gold_egg_ratio'))
-
-    # 滚动 20 日均比（与正序对齐）
-    ratios_ma20 = _rolling_ma(ratios, MA_WINDOW)
-
-    # 最新数据
-    latest = history_data[0] if history_data else {}
-    latest_ma20 = latest.get('ratio_ma20')
-    latest_ma20_dev = latest.get('ratio_ma20_deviation_pct')
-    latest_ma20_n = latest.get('ratio_ma20_count') or MA_WINDOW
-    latest_etf = latest.get('gold_etf_518880')
-    latest_etf_premium = latest.get('gold_etf_premium_pct')
-    latest_egg_futures = latest.get('egg_price_futures')
-
-    # 20 日均比卡片样式 + 文本
-    if latest_ma20 is not None and latest_ma20_dev is not None:
-        ma_direction_cls = 'danger' if latest_ma20_dev > 0 else 'success'
-        ma_arrow = '↑' if latest_ma20_dev >= 0 else '↓'
-        ma_dev_text = f'{ma_arrow} {abs(latest_ma20_dev):.2f}%'
-        ma_value_text = f'{latest_ma20:.1f}'
-        ma_sub_text = f'MA{latest_ma20_n} · 今日{ma_dev_text}'
-    else:
-        ma_direction_cls = ''
-        ma_value_text = 'N/A'
-        ma_sub_text = '历史数据不足'
-
-    # ── 表格行（增加 ETF、期货列）──
-    table_rows = []
-    for record in history_data[:30]:
-        def fmt(v, decimals=2):
-            return f"{v:.{decimals}f}" if v is not None else 'N/A'
-
-        gold_price_str = fmt(record.get('gold_price'))
-        egg_price_str = fmt(record.get('egg_price'))
-        ratio_str = fmt(record.get('gold_egg_ratio'), 1)
-        etf_str = fmt(record.get('gold_etf_518880'), 3)
-        egg_fut_str = fmt(record.get('egg_price_futures'), 3)
-        status_badge = '<span class="error-badge">有错误</span>' if record.get('errors') else '<span class="success-badge">正常</span>'
-
-        table_rows.append(f'''
-                    <tr>
-                        <td>{record.get('date', 'N/A')}</td>
-                        <td>{gold_price_str}</td>
-                        <td>{egg_price_str}</td>
-                        <td>{ratio_str}</td>
-                        <td>{etf_str}</td>
-                        <td>{egg_fut_str}</td>
-                        <td>{status_badge}</td>
-                    </tr>''')
-
-    html_content = f'''<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>黄金/鸡蛋价格追踪 - Gold & Egg Price Tracker</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-            color: #333;
-        }}
-
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-        }}
-
-        header {{
-            text-align: center;
-            color: white;
-            margin-bottom: 30px;
-        }}
-
-        h1 {{
-            font-size: 2.5em;
-            margin-bottom: 10px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }}
-
-        .subtitle {{
-            font-size: 1.1em;
-            opacity: 0.9;
-        }}
-
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }}
-
-        .stat-card {{
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            transition: transform 0.3s ease;
-        }}
-
-        .stat-card:hover {{
-            transform: translateY(-5px);
-        }}
-
-        .stat-label {{
-            font-size: 0.9em;
-            color: #666;
-            margin-bottom: 8px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
-
-        .stat-value {{
-            font-size: 2em;
-            font-weight: bold;
-            color: #667eea;
-        }}
-
-        .stat-value.warning {{
-            color: #f39c12;
-        }}
-
-        .stat-value.danger {{
-            color: #e74c3c;
-        }}
-
-        .stat-value.success {{
-            color: #27ae60;
-        }}
-
-        .stat-subtitle {{
-            font-size: 0.75em;
-            color: #888;
-            margin-top: 6px;
-            font-weight: normal;
-        }}
-
-        .stat-unit {{
-            font-size: 0.6em;
-            color: #999;
-            margin-left: 5px;
-        }}
-
-        .chart-container {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-        }}
-
-        .chart-title {{
-            font-size: 1.3em;
-            margin-bottom: 20px;
-            color: #333;
-            text-align: center;
-        }}
-
-        canvas {{
-            max-height: 400px;
-        }}
-
-        .data-table {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            overflow-x: auto;
-        }}
-
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-        }}
-
-        th {{
-            background: #667eea;
-            color: white;
-            padding: 15px;
-            text-align: left;
-            font-weight: 600;
-        }}
-
-        td {{
-            padding: 12px 15px;
-            border-bottom: 1px solid #eee;
-        }}
-
-        tr:hover {{
-            background: #f8f9fa;
-        }}
-
-        .error-badge {{
-            background: #e74c3c;
-            color: white;
-            padding: 2px 8px;
-            border-radius: 12px;
-            font-size: 0.8em;
-        }}
-
-        .success-badge {{
-            background: #27ae60;
-            color: white;
-            padding: 2px 8px;
-            border-radius: 12px;
-            font-size: 0.8em;
-        }}
-
-        footer {{
-            text-align: center;
-            color: white;
-            margin-top: 40px;
-            opacity: 0.8;
-        }}
-
-        .update-time {{
-            background: rgba(255,255,255,0.2);
-            padding: 10px 20px;
-            border-radius: 20px;
-            display: inline-block;
-            margin-top: 20px;
-        }}
-
-        @media (max-width: 768px) {{
-            h1 {{
-                font-size: 1.8em;
-            }}
-
-            .stats-grid {{
-                grid-template-columns: 1fr;
-            }}
-
-            .chart-container {{
-                padding: 15px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>🥇 黄金/鸡蛋价格追踪</h1>
-            <p class="subtitle">Gold & Egg Price Tracker</p>
-        </header>
-
-        <div class="stats-grid">
-            <div class="stat-card">
-                <div class="stat-label">黄金价格 Gold Price</div>
-                <div class="stat-value">
-                    {f"{latest.get('gold_price'):.2f}" if latest.get('gold_price') is not None else 'N/A'}
-                    <span class="stat-unit">元/克</span>
-                </div>
-                <div class="stat-subtitle">来源: {latest.get('gold_price_source', 'sge_api')}</div>
-            </div>
-
-            <div class="stat-card">
-                <div class="stat-label">鸡蛋价格 Egg Price</div>
-                <div class="stat-value">
-                    {f"{latest.get('egg_price'):.2f}" if latest.get('egg_price') is not None else 'N/A'}
-                    <span class="stat-unit">元/斤</span>
-                </div>
-                <div class="stat-subtitle">{
-                    f"期货 JD0: {latest_egg_futures:.3f} 元/斤" if latest_egg_futures is not None else '现货报价 (100ppi)'
-                }</div>
-            </div>
-
-            <div class="stat-card">
-                <div class="stat-label">黄金/鸡蛋比例 Gold/Egg Ratio</div>
-                <div class="stat-value {'warning' if latest.get('gold_egg_ratio', 0) and latest.get('gold_egg_ratio') > 150 else ''}">
-                    {f"{latest.get('gold_egg_ratio'):.1f}" if latest.get('gold_egg_ratio') is not None else 'N/A'}
-                </div>
-                <div class="stat-subtitle">参考区间 80–150</div>
-            </div>
-
-            <div class="stat-card">
-                <div class="stat-label">近 {latest_ma20_n} 日均比 MA{latest_ma20_n}</div>
-                <div class="stat-value {ma_direction_cls}">
-                    {ma_value_text}
-                </div>
-                <div class="stat-subtitle">{ma_sub_text}</div>
-            </div>
-
-            <div class="stat-card">
-                <div class="stat-label">黄金 ETF 518880</div>
-                <div class="stat-value">
-                    {f"{latest_etf:.3f}" if latest_etf is not None else 'N/A'}
-                    <span class="stat-unit">元/份</span>
-                </div>
-                <div class="stat-subtitle">{
-                    f"折溢价 {latest_etf_premium:+.2f}%" if latest_etf_premium is not None else '华安黄金 ETF'
-                }</div>
-            </div>
-        </div>
-
-        <div class="chart-container">
-            <h2 class="chart-title">价格趋势图 Price Trends</h2>
-            <canvas id="priceChart"></canvas>
-        </div>
-
-        <div class="chart-container">
-            <h2 class="chart-title">黄金/鸡蛋比例趋势 Gold/Egg Ratio Trend</h2>
-            <canvas id="ratioChart"></canvas>
-        </div>
-
-        <div class="data-table">
-            <h2 class="chart-title">历史数据 Historical Data</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>日期</th>
-                        <th>黄金价格<br>(元/克)</th>
-                        <th>鸡蛋价格<br>(元/斤)</th>
-                        <th>金/蛋比例</th>
-                        <th>黄金 ETF<br>(元/份)</th>
-                        <th>鸡蛋期货<br>(元/斤)</th>
-                        <th>状态</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {''.join(table_rows)}
-                </tbody>
-            </table>
-        </div>
-
-        <footer>
-            <div class="update-time">
-                最后更新: {latest.get('timestamp', 'N/A') if latest else 'N/A'}
-            </div>
-            <p style="margin-top: 20px;">
-                数据来源: 上海黄金交易所 (Au99.99) · 华安黄金 ETF (518880) · 大商所鸡蛋期货 (JD0) · 鸡蛋产业网现货<br>
-                自动更新周期: 每天一次（北京时间上午 10:00）
-            </p>
-        </footer>
-    </div>
-
-    <script>
-        // 价格趋势图
-        const priceCtx = document.getElementById('priceChart').getContext('2d');
-        const priceChart = new Chart(priceCtx, {{
-            type: 'line',
-            data: {{
-                labels: {json.dumps(dates[-30:])},
-                datasets: [
-                    {{
-                        label: '黄金价格 (元/克)',
-                        data: {json.dumps(gold_prices[-30:])},
-                        borderColor: '#f39c12',
-                        backgroundColor: 'rgba(243, 156, 18, 0.1)',
-                        yAxisID: 'y',
-                        tension: 0.4,
-                        fill: true
-                    }},
-                    {{
-                        label: '鸡蛋价格 (元/斤)',
-                        data: {json.dumps(egg_prices[-30:])},
-                        borderColor: '#3498db',
-                        backgroundColor: 'rgba(52, 152, 219, 0.1)',
-                        yAxisID: 'y1',
-                        tension: 0.4,
-                        fill: true
-                    }}
-                ]
-            }},
-            options: {{
-                responsive: true,
-                maintainAspectRatio: true,
-                interaction: {{
-                    mode: 'index',
-                    intersect: false,
-                }},
-                plugins: {{
-                    legend: {{
-                        display: true,
-                        position: 'top',
-                    }}
-                }},
-                scales: {{
-                    y: {{
-                        type: 'linear',
-                        display: true,
-                        position: 'left',
-                        title: {{
-                            display: true,
-                            text: '黄金价格 (元/克)'
-                        }}
-                    }},
-                    y1: {{
-                        type: 'linear',
-                        display: true,
-                        position: 'right',
-                        title: {{
-                            display: true,
-                            text: '鸡蛋价格 (元/斤)'
-                        }},
-                        grid: {{
-                            drawOnChartArea: false,
-                        }}
-                    }}
-                }}
-            }}
-        }});
-
-        // 比例趋势图
-        const ratioCtx = document.getElementById('ratioChart').getContext('2d');
-        const ratioChart = new Chart(ratioCtx, {{
-            type: 'line',
-            data: {{
-                labels: {json.dumps(dates[-30:])},
-                datasets: [
-                    {{
-                        label: '黄金/鸡蛋比例',
-                        data: {json.dumps(ratios[-30:])},
-                        borderColor: '#9b59b6',
-                        backgroundColor: 'rgba(155, 89, 182, 0.1)',
-                        tension: 0.4,
-                        fill: true
-                    }},
-                    {{
-                        label: 'MA{MA_WINDOW} 滚动均值',
-                        data: {json.dumps(ratios_ma20[-30:])},
-                        borderColor: '#2c3e50',
-                        borderDash: [3, 3],
-                        borderWidth: 2,
-                        pointRadius: 0,
-                        tension: 0.3,
-                        fill: false
-                    }},
-                    {{
-                        label: '参考上限 (150)',
-                        data: Array({len(dates[-30:])}).fill(150),
-                        borderColor: '#e74c3c',
-                        borderDash: [5, 5],
-                        borderWidth: 2,
-                        pointRadius: 0,
-                        fill: false
-                    }},
-                    {{
-                        label: '参考下限 (80)',
-                        data: Array({len(dates[-30:])}).fill(80),
-                        borderColor: '#27ae60',
-                        borderDash: [5, 5],
-                        borderWidth: 2,
-                        pointRadius: 0,
-                        fill: false
-                    }}
-                ]
-            }},
-            options: {{
-                responsive: true,
-                maintainAspectRatio: true,
-                interaction: {{
-                    mode: 'index',
-                    intersect: false,
-                }},
-                plugins: {{
-                    legend: {{
-                        display: true,
-                        position: 'top',
-                    }}
-                }},
-                scales: {{
-                    y: {{
-                        title: {{
-                            display: true,
-                            text: '比例值'
-                        }}
-                    }}
-                }}
-            }}
-        }});
-    </script>
-</body>
-</html>'''
-
-    return html_content
+def build_dashboard(history, records=None, digest=None):
+    """构建 dashboard.json 的内容。history 为最新在前的最新记录（卡片、表格），
+    records 为按日期正序的完整历史（图表序列），缺省时用 history 代替。"""
+    if records is None:
+        records = list(reversed(history))
+    latest = history[0] if history else {}
+
+    return {
+        "v": DATA_VERSION,
+        "hash": digest or input_hash(history[:HISTORY_DAYS]),
+        "updated": latest.get("timestamp"),
+        "ma_window": MA_WINDOW,
+        "ratio_range": [RATIO_LOW, RATIO_HIGH],
+        "latest": {k: _compact(latest.get(k)) for k in LATEST_FIELDS if latest.get(k) is not None},
+        "ranges": [name for name, _ in CHART_RANGES],
+        "series": build_series(records),
+    }
+
+
+def _load_json(path):
+    """读取已写出的 JSON 对象，没有或损坏返回空 dict"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _stored_hash(path):
+    """已写出的 dashboard.json 记录的输入哈希，没有或损坏返回 None"""
+    return _load_json(path).get("hash")
+
+
+def table_row(record):
+    row = [_compact(record.get(col)) for col in TABLE_COLUMNS[:-1]]
+    row.append(0 if record.get("errors") else 1)
+    return row
+
+
+def write_pages():
+    """按年份把完整历史写成表格分页（最新在前）并更新清单，返回重建的页数。
+    清单中 source 为对应分片的内容哈希，分片没变的年份直接沿用旧页；
+    hash 为分页文件本身的内容哈希，页面按它拼 ?v=，分页格式变化时 URL 也随之变化。"""
+    directory = pages_dir()
+    manifest_path = os.path.join(directory, "manifest.json")
+    old = _load_json(manifest_path)
+    old_pages = {p["year"]: p for p in old.get("pages", [])} if old.get("v") == PAGES_VERSION else {}
+
+    pages, rebuilt = [], 0
+    for year, digest in reversed(history_store.fingerprint()):
+        path = os.path.join(directory, f"{year}.json")
+        page = old_pages.get(year)
+        if page is None or page.get("source") != digest or not os.path.exists(path):
+            records = history_store.read_shard(year)
+            if not records:
+                continue
+            rows = [table_row(r) for r in reversed(records)]
+            data = json.dumps({"year": year, "rows": rows}, ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+            write_output(path, data)
+            page = {"year": year, "file": f"{year}.json", "source": digest,
+                    "hash": static_assets.content_hash(data), "rows": len(rows),
+                    "first": records[0]["date"], "last": records[-1]["date"]}
+            rebuilt += 1
+        pages.append(page)
+
+    # 分片已不存在的年份，删掉旧页
+    current = {p["year"] for p in pages}
+    for year in set(old_pages) - current:
+        for suffix in ("", *static_assets.COMPRESSED_SUFFIXES):
+            try:
+                os.remove(os.path.join(directory, old_pages[year]["file"] + suffix))
+            except OSError:
+                pass
+
+    manifest = {"v": PAGES_VERSION, "columns": list(TABLE_COLUMNS),
+                "total": sum(p["rows"] for p in pages), "pages": pages}
+    write_output(manifest_path, json.dumps(manifest, ensure_ascii=False,
+                                           separators=(",", ":")).encode("utf-8"))
+    return rebuilt
+
+
+def write_if_changed(path, data):
+    """内容与现有文件相同则不写，返回是否写入；原子替换，中途失败不留半个文件"""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def write_output(path, data):
+    """写出 path 及其预压缩副本（.gz，装了 brotli 时还有 .br），返回 path 本身是否写入。
+    path 未变化时只补写缺失的副本；不再能生成的旧副本随新内容一起删除。"""
+    written = write_if_changed(path, data)
+    available = dict(static_assets.compressors())
+    for suffix in static_assets.COMPRESSED_SUFFIXES:
+        sibling = path + suffix
+        if suffix in available:
+            if written or not os.path.exists(sibling):
+                write_if_changed(sibling, available[suffix](data))
+        elif written and os.path.exists(sibling):
+            os.remove(sibling)
+    return written
 
 def main():
     """主函数"""
+    try:
+        _build_page()
+    finally:
+        metrics.flush("generate_html")
+
+
+def _build_page():
     print("[信息] 开始生成 HTML 页面...", file=sys.stderr)
 
     # 加载历史数据
-    history = load_price_history()
+    with metrics.stage("history.load") as rec:
+        history = load_price_history()
+        rec["records"] = len(history)
+    try:
+        write_page(history)
+    except OSError:
+        sys.exit(1)
 
-    if not history:
-        print("[警告] 没有历史数据，将生成空白页面", file=sys.stderr)
 
-    # 生成 HTML
-    html = generate_html(history)
+def write_page(history):
+    """写出页面外壳与数据；history 为最新在前的历史，只用到前 HISTORY_DAYS 条。
+    两者都只在内容变化时写入。"""
+    history = history[:HISTORY_DAYS]
+    if not history:
+        print("[警告] 没有历史数据，页面将显示空数据", file=sys.stderr)
 
-    # 保存到文件
     try:
-        with open(OUTPUT_HTML, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"[成功] HTML 页面已生成: {OUTPUT_HTML}", file=sys.stderr)
-        print(f"生成的文件: {OUTPUT_HTML}")
-    except Exception as e:
-        print(f"[错误] 保存 HTML 失败: {e}", file=sys.stderr)
-        sys.exit(1)
+        with metrics.stage("render.shell") as rec:
+            shell = render_shell(publish_chart_js()).encode("utf-8")
+            rec["bytes"] = len(shell)
+            rec["written"] = write_output(OUTPUT_HTML, shell)
+        print(f"[信息] 页面外壳{'已更新' if rec['written'] else '未变化'}: {OUTPUT_HTML}", file=sys.stderr)
+
+        with metrics.stage("write.pages") as rec:
+            rec["rebuilt"] = write_pages()
+        print(f"[信息] 表格分页重建 {rec['rebuilt']} 页: {pages_dir()}", file=sys.stderr)
+
+        path = data_file()
+        digest = input_hash(history)
+        if _stored_hash(path) == digest:
+            print(f"[信息] 页面数据未变化，跳过: {path}", file=sys.stderr)
+            return
+        with metrics.stage("history.load_all") as rec:
+            records = history_store.read_range() or list(reversed(history))
+            rec["records"] = len(records)
+        with metrics.stage("render.dashboard") as rec:
+            payload = json.dumps(build_dashboard(history, records, digest), ensure_ascii=False, separators=(",", ":"))
+            rec["bytes"] = len(payload.encode("utf-8"))
+        with metrics.stage("write.dashboard"):
+            write_output(path, payload.encode("utf-8"))
+        print(f"[成功] 页面数据已生成: {path}", file=sys.stderr)
+        print(f"生成的文件: {path}")
+    except OSError as e:
+        print(f"[错误] 写出页面失败: {e}", file=sys.stderr)
+        raise
 
 if __name__ == "__main__":
     main()
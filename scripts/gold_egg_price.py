@@ -5,10 +5,10 @@ gold_egg_price.py
 ===================
 价格数据采集与统计。
 
-主数据源（akshare 官方交易所 API）：
-  - 黄金 Au99.99：ak.spot_hist_sge(symbol="Au99.99")          上海黄金交易所现货
-  - 黄金 ETF 518880：ak.fund_etf_hist_em(symbol="518880")     华安黄金 ETF（≈ 0.01g / 份）
-  - 鸡蛋期货 JD0：ak.futures_zh_daily_sina(symbol="JD0")      大商所主力连续（元/500kg）
+主数据源（交易所 / 行情日线接口；先走 native_sources 原生抓取，失败再用 akshare）：
+  - 黄金 Au99.99：SGE Dailyhq    / ak.spot_hist_sge(symbol="Au99.99")       上海黄金交易所现货
+  - 黄金 ETF 518880：东方财富日 K / ak.fund_etf_hist_em(symbol="518880")  华安黄金 ETF（≈ 0.01g / 份）
+  - 鸡蛋期货 JD0：新浪期货日线   / ak.futures_zh_daily_sina(symbol="JD0")   大商所主力连续（元/500kg）
 
 兜底数据源（网页爬虫）：
   - SGE 网页表格（Au99.99 收盘价）
@@ -20,20 +20,30 @@ gold_egg_price.py
   - egg_price_futures: 元/斤（鸡蛋期货 JD0 收盘 / 1000）
   - gold_etf_518880  : 元/份（518880 ETF 收盘价）
   - gold_etf_premium_pct : ETF 折溢价（>0 溢价，<0 折价）
+  - gold_egg_futures_ratio : 克金价 / 期货蛋价（可由 backfill.py 回填多年历史）
   - ratio_ma20       : 最近 20 日 gold_egg_ratio 均值（用于偏离监控）
+
+录制 / 回放（离线基准与回归测试，见 cassette.py）：
+  python scripts/gold_egg_price.py --record cassettes/2026-10-17
+  python scripts/gold_egg_price.py --replay cassettes/2026-10-17 --latency recorded --data-dir /tmp/gold-rice
 """
 
-import requests
-from bs4 import BeautifulSoup
 import datetime
 import re
 import sys
+import threading
 import time
-import random
-import json
-import os
 
-GOLD_PRICE_URL_TEMPLATE = "https://www.sge.com.cn/sjzx/quotation_daily_new?start_date={date}&end_date={date}"
+import cassette
+import history_store
+import metrics
+import stats
+
+# 网络相关模块（requests / akshare / pandas / 网页解析）只在抓取路径上按需导入，
+# 只读取历史的调用方（send_email、run_pipeline 的渲染与通知）导入本模块不付出这部分启动开销
+
+GOLD_PRICE_URL_TEMPLATE = "https://www.sge.com.cn/sjzx/quotation_daily_new?start_date={start_date}&end_date={end_date}"
+SGE_RANGE_DAYS = 7                  # 网页兜底一次查询的日期窗口（覆盖周末与短假期）
 EGG_PRICE_URL = "https://egg.100ppi.com/kx/"
 
 GOLD_ETF_SYMBOL = "518880"          # 华安黄金 ETF（份额 ≈ 0.01 克金）
@@ -42,90 +52,130 @@ EGG_FUTURES_SYMBOL = "JD0"          # 鸡蛋期货主力连续
 EGG_FUTURES_UNIT_PER_JIN = 1000     # 元/500kg ÷ 1000 = 元/斤
 
 MA_WINDOW = 20                      # 比例移动平均窗口
+RATIO_RANGE_GOLD_EGG = (80.0, 150.0)    # 金蛋比历史参考区间
+RATIO_RANGE_GOLD_RICE = (100.0, 200.0)  # 金米比历史参考区间
+
+# 各数据源并发抓取时的独立超时（秒），覆盖该源内部的全部重试与兜底；超时后进程不再等待该源
+SOURCE_TIMEOUTS = {
+    "gold": 90,
+    "egg": 60,
+    "gold_etf": 45,
+    "egg_futures": 45,
+}
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
-HISTORY_FILE = os.path.join(DATA_DIR, "price_history.json")
 
 def _akshare():
     """惰性导入 akshare，未安装时返回 None 让上游走 fallback"""
     try:
         import akshare as ak
-        return ak
     except Exception as e:
+        if cassette.replaying():
+            return cassette.wrap_akshare(None)
         print(f"[调试] akshare 不可用，将走兜底数据源: {e}", file=sys.stderr)
         return None
+    return cassette.wrap_akshare(ak)
 
 
-def get_gold_price_sge_api():
-    """主源：上海黄金交易所 Au99.99 现货最新收盘价（元/克）。失败返回 None。"""
+def _found(value):
+    return value is not None
+
+
+def _native_latest(stage, fetch):
+    """原生接口（native_sources，不导入 akshare / pandas）取 (日期, 收盘价)；失败返回 None"""
+    import native_sources
+
+    with metrics.stage(f"{stage}.native") as rec:
+        try:
+            latest = fetch(native_sources).latest()
+        except Exception as e:
+            rec["ok"] = False
+            rec["error"] = f"{type(e).__name__}: {e}"[:metrics.ERROR_CHARS]
+            print(f"[调试] {stage} 原生接口失败，回退 akshare: {e}", file=sys.stderr)
+            return None
+    (metrics.current() or {})["winner"] = "native"
+    return latest
+
+
+def _akshare_latest(stage, func_name, date_col, close_col, **kwargs):
+    """akshare（带磁盘缓存）取 (日期, 收盘价)；akshare 不可用或失败返回 None"""
     ak = _akshare()
     if ak is None:
         return None
-    try:
-        df = ak.spot_hist_sge(symbol="Au99.99")
-        if df is None or df.empty:
+    import ak_cache
+
+    with metrics.stage(f"{stage}.akshare") as rec:
+        try:
+            df = ak_cache.call(ak, func_name, **kwargs)
+            if df is None or df.empty:
+                rec["ok"] = False
+                return None
+            latest = df.sort_values(date_col).iloc[-1]
+        except Exception as e:
+            rec["ok"] = False
+            rec["error"] = f"{type(e).__name__}: {e}"[:metrics.ERROR_CHARS]
+            print(f"[调试] {stage} akshare 获取失败: {e}", file=sys.stderr)
             return None
-        # 列：date, open, close, low, high；按日期排序后取最后一行
-        df = df.sort_values("date")
-        latest = df.iloc[-1]
-        price = float(latest["close"])
-        date = latest["date"]
-        print(f"[调试] SGE API Au99.99 收盘价: {price} 元/克（{date}）", file=sys.stderr)
-        return price
-    except Exception as e:
-        print(f"[调试] SGE API 获取失败，将走兜底网页源: {e}", file=sys.stderr)
+    (metrics.current() or {})["winner"] = "akshare"
+    return latest[date_col], float(latest[close_col])
+
+
+@metrics.timed("source.gold.sge_api", ok=_found)
+def get_gold_price_sge_api():
+    """主源：上海黄金交易所 Au99.99 现货最新收盘价（元/克）。
+    先走原生接口，失败再用 akshare（列：date, open, close, low, high）；都失败返回 None。"""
+    latest = (_native_latest("source.gold.sge_api", lambda ns: ns.sge_daily("Au99.99"))
+              or _akshare_latest("source.gold.sge_api", "spot_hist_sge", "date", "close", symbol="Au99.99"))
+    if latest is None:
+        print("[调试] SGE API 获取失败，将走兜底网页源", file=sys.stderr)
         return None
+    date, price = latest
+    print(f"[调试] SGE API Au99.99 收盘价: {price} 元/克（{date}）", file=sys.stderr)
+    return price
 
 
+@metrics.timed("source.gold_etf.daily", ok=_found)
 def get_gold_etf_close():
     """获取华安黄金 ETF 518880 最新收盘价（元/份）。失败返回 None。"""
-    ak = _akshare()
-    if ak is None:
-        return None
-    try:
-        # 拉最近 30 天足够找最新交易日
-        end_date = datetime.date.today().strftime("%Y%m%d")
-        start_date = (datetime.date.today() - datetime.timedelta(days=30)).strftime("%Y%m%d")
-        df = ak.fund_etf_hist_em(
-            symbol=GOLD_ETF_SYMBOL, period="daily",
-            start_date=start_date, end_date=end_date, adjust="",
-        )
-        if df is None or df.empty:
-            return None
-        # 列名是中文："日期, 开盘, 收盘, 最高, 最低, 成交量, 成交额, ..."
-        df = df.sort_values("日期")
-        price = float(df.iloc[-1]["收盘"])
-        print(f"[调试] ETF {GOLD_ETF_SYMBOL} 收盘价: {price} 元/份", file=sys.stderr)
-        return price
-    except Exception as e:
-        print(f"[调试] 黄金 ETF 获取失败: {e}", file=sys.stderr)
+    # 拉最近 30 天足够找最新交易日
+    end_date = cassette.today().strftime("%Y%m%d")
+    start_date = (cassette.today() - datetime.timedelta(days=30)).strftime("%Y%m%d")
+    latest = (
+        _native_latest("source.gold_etf.daily",
+                       lambda ns: ns.eastmoney_kline(GOLD_ETF_SYMBOL, start_date, end_date))
+        # akshare 列名是中文："日期, 开盘, 收盘, 最高, 最低, 成交量, 成交额, ..."
+        or _akshare_latest("source.gold_etf.daily", "fund_etf_hist_em", "日期", "收盘",
+                           symbol=GOLD_ETF_SYMBOL, period="daily",
+                           start_date=start_date, end_date=end_date, adjust="")
+    )
+    if latest is None:
+        print("[调试] 黄金 ETF 获取失败", file=sys.stderr)
         return None
+    date, price = latest
+    print(f"[调试] ETF {GOLD_ETF_SYMBOL} 收盘价: {price} 元/份（{date}）", file=sys.stderr)
+    return price
 
 
+@metrics.timed("source.egg_futures.daily", ok=_found)
 def get_egg_price_futures_per_jin():
     """获取鸡蛋期货 JD0 主力连续合约最新收盘价，换算为元/斤。失败返回 None。"""
-    ak = _akshare()
-    if ak is None:
-        return None
-    try:
-        df = ak.futures_zh_daily_sina(symbol=EGG_FUTURES_SYMBOL)
-        if df is None or df.empty:
-            return None
-        # 列：date, open, high, low, close, volume, hold；单位 元/500kg
-        df = df.sort_values("date")
-        latest = df.iloc[-1]
-        close_per_500kg = float(latest["close"])
-        price_per_jin = close_per_500kg / EGG_FUTURES_UNIT_PER_JIN
-        date = latest["date"]
-        print(
-            f"[调试] 鸡蛋期货 {EGG_FUTURES_SYMBOL} 收盘 {close_per_500kg} 元/500kg "
-            f"→ {price_per_jin:.3f} 元/斤（{date}）",
-            file=sys.stderr,
-        )
-        return price_per_jin
-    except Exception as e:
-        print(f"[调试] 鸡蛋期货获取失败: {e}", file=sys.stderr)
+    latest = (
+        _native_latest("source.egg_futures.daily",
+                       lambda ns: ns.sina_futures_daily(EGG_FUTURES_SYMBOL, today=cassette.today()))
+        # akshare 列：date, open, high, low, close, volume, hold；单位 元/500kg
+        or _akshare_latest("source.egg_futures.daily", "futures_zh_daily_sina", "date", "close",
+                           symbol=EGG_FUTURES_SYMBOL)
+    )
+    if latest is None:
+        print("[调试] 鸡蛋期货获取失败", file=sys.stderr)
         return None
+    date, close_per_500kg = latest
+    price_per_jin = close_per_500kg / EGG_FUTURES_UNIT_PER_JIN
+    print(
+        f"[调试] 鸡蛋期货 {EGG_FUTURES_SYMBOL} 收盘 {close_per_500kg} 元/500kg "
+        f"→ {price_per_jin:.3f} 元/斤（{date}）",
+        file=sys.stderr,
+    )
+    return price_per_jin
 
 
 def get_gold_price_per_g():
@@ -138,87 +188,54 @@ def get_gold_price_per_g():
     return fallback_price, "sge_html"
 
 
+def _sge_au9999_rows(html):
+    """解析 daily_new_table，返回 [(日期, 合约, 收盘价)]，只保留 Au99.99 及其变体的有效行"""
+    import html_extract
+
+    rows = []
+    for cells in html_extract.daily_new_table_rows(html):
+        if len(cells) < 6:
+            continue
+        # 第一列日期，第二列合约代码，第六列收盘价（可能带千分位逗号）
+        contract = cells[1]
+        closing_price_text = cells[5].replace(",", "")
+        # 部分匹配：只要包含 "Au99.99" 就认为是目标合约（支持 iAu99.99 等变体）
+        if "Au99.99" in contract and closing_price_text and closing_price_text != "-":
+            rows.append((cells[0], contract, float(closing_price_text)))
+    return rows
+
+
+@metrics.timed("source.gold.sge_html")
 def _gold_price_sge_html_fallback():
-    """兜底：从上海黄金交易所抓取 Au99.99 每克价格（元/克），保留原实现。"""
-    for days_ago in range(5):
-        query_date = (datetime.date.today() - datetime.timedelta(days=days_ago)).isoformat()
-        url = GOLD_PRICE_URL_TEMPLATE.format(date=query_date)
-
-        # 使用更完整的浏览器请求头，模拟真实浏览器
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
-            "Referer": "https://www.sge.com.cn/",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "same-origin",
-        }
-
-        # 最多重试3次
-        for retry in range(3):
-            try:
-                # 添加随机延迟，避免触发反爬虫（1-3秒）
-                if retry > 0:
-                    time.sleep(random.uniform(1, 3))
-
-                resp = requests.get(url, headers=headers, timeout=20)
-                resp.raise_for_status()
-                html = resp.text
-
-                # 调试：输出部分 HTML 内容以便排查问题
-                if "daily_new_table" not in html:
-                    print(f"[调试] {query_date} 页面中未找到 daily_new_table，HTML 长度: {len(html)}", file=sys.stderr)
-                    if retry == 2:  # 最后一次重试时输出前500字符
-                        print(f"[调试] HTML 预览: {html[:500]}", file=sys.stderr)
-                    continue
-
-                soup = BeautifulSoup(html, "html.parser")
-
-                # 查找表格中的 Au99.99 行（24K 黄金）
-                # 在 HTML 中，数据在 <table class="daily_new_table"> 的 <tbody> 中
-                table = soup.find("table", class_="daily_new_table")
-                if not table:
-                    print(f"[调试] {query_date} 未找到表格 (重试 {retry+1}/3)", file=sys.stderr)
-                    continue
-
-                tbody = table.find("tbody")
-                if not tbody:
-                    print(f"[调试] {query_date} 未找到 tbody (重试 {retry+1}/3)", file=sys.stderr)
-                    continue
-
-                # 查找包含 Au99.99 的行（支持 Au99.99, iAu99.99 等变体）
-                rows = tbody.find_all("tr")
-                for row in rows:
-                    cells = row.find_all("td")
-                    if len(cells) >= 6:
-                        # 第二列是合约代码
-                        contract = cells[1].get_text(strip=True)
-                        # 部分匹配：只要包含 "Au99.99" 就认为是目标合约
-                        if "Au99.99" in contract:
-                            # 第六列是收盘价
-                            closing_price_text = cells[5].get_text(strip=True)
-                            # 移除可能的千分位逗号
-                            closing_price_text = closing_price_text.replace(",", "")
-                            if closing_price_text and closing_price_text != "-":
-                                price = float(closing_price_text)
-                                print(f"[调试] 使用 {query_date} 的黄金价格数据，合约: {contract}", file=sys.stderr)
-                                return price
-
-                # 如果找到表格但没有 Au99.99 数据，尝试下一天
-                print(f"[调试] {query_date} 表格中未找到 Au99.99 数据", file=sys.stderr)
-                break
-
-            except requests.exceptions.RequestException as e:
-                print(f"[调试] {query_date} 请求失败 (重试 {retry+1}/3): {e}", file=sys.stderr)
-                if retry == 2:  # 最后一次重试失败
-                    continue
-            except Exception as e:
-                print(f"[调试] {query_date} 解析失败: {e}", file=sys.stderr)
-                break
+    """兜底：从上海黄金交易所网页抓取 Au99.99 每克价格（元/克）。
+    一次请求整个日期窗口并取最新一行；窗口内无数据（长假）时再放宽一倍窗口重试一次。"""
+    import http_client
+    from requests.exceptions import RequestException
+
+    today = cassette.today()
+    for span in (SGE_RANGE_DAYS, SGE_RANGE_DAYS * 2):
+        start_date = (today - datetime.timedelta(days=span - 1)).isoformat()
+        url = GOLD_PRICE_URL_TEMPLATE.format(start_date=start_date, end_date=today.isoformat())
+
+        try:
+            # 共享 Session 负责连接复用与重试；页面缺表格时按统一退避重新请求，
+            # 页面未变时直接复用上次的解析结果
+            rows = http_client.get_parsed(url, _sge_au9999_rows, expect="daily_new_table", timeout=20)
+        except RequestException as e:
+            print(f"[调试] SGE 网页 {start_date}~{today} 请求失败: {e}", file=sys.stderr)
+            continue
+        except Exception as e:
+            print(f"[调试] SGE 网页 {start_date}~{today} 解析失败: {e}", file=sys.stderr)
+            continue
+
+        if not rows:
+            print(f"[调试] {start_date}~{today} 表格中未找到 Au99.99 数据", file=sys.stderr)
+            continue
+
+        # 日期统一去掉分隔符后比较，取窗口内最新的交易日
+        date_text, contract, price = max(rows, key=lambda r: re.sub(r"\D", "", r[0]))
+        print(f"[调试] 使用 {date_text} 的黄金价格数据，合约: {contract}", file=sys.stderr)
+        return price
 
     raise ValueError("无法在页面中找到 Au99.99 的收盘价")
 
@@ -233,112 +250,72 @@ def get_egg_price_per_jin():
         return None, "100ppi"
 
 
+@metrics.timed("source.egg.100ppi")
 def _egg_price_100ppi_fallback():
     """从"鸡蛋产业网–价格快讯"抓取鸡蛋参考价，转换为元/斤。"""
-    url = EGG_PRICE_URL
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Referer": "https://egg.100ppi.com/",
-    }
+    import html_extract
+    import http_client
+    from requests.exceptions import RequestException
 
-    # 最多重试3次
-    for retry in range(3):
-        try:
-            if retry > 0:
-                time.sleep(random.uniform(1, 2))
-
-            resp = requests.get(url, headers=headers, timeout=15)
-            resp.raise_for_status()
-            html = resp.text
-            soup = BeautifulSoup(html, "html.parser")
-            text = soup.get_text()
-
-            # 查找 "鸡蛋参考价为X.XX" 或 "鸡蛋为X.XX"
-            m = re.search(r"鸡蛋参考价为\s*([\d]+\.\d+)", text)
-            if not m:
-                # 尝试另一种表达
-                m = re.search(r"鸡蛋为\s*([\d]+\.\d+)", text)
-            if not m:
-                print(f"[调试] 鸡蛋价格未找到 (重试 {retry+1}/3)", file=sys.stderr)
-                continue
-
-            price_per_kg = float(m.group(1))
-            price_per_jin = price_per_kg / 2.0
-            return price_per_jin
-
-        except requests.exceptions.RequestException as e:
-            print(f"[调试] 鸡蛋价格请求失败 (重试 {retry+1}/3): {e}", file=sys.stderr)
-            if retry == 2:
-                raise ValueError("无法在页面中找到鸡蛋参考价")
-
-    raise ValueError("无法在页面中找到鸡蛋参考价")
+    try:
+        # 共享 Session 负责连接复用与重试；只扫描 "鸡蛋参考价为X.XX"（或 "鸡蛋为X.XX"）附近的片段，
+        # 页面未变时直接复用上次的解析结果
+        price_per_kg = http_client.get_parsed(EGG_PRICE_URL, html_extract.egg_reference_price)
+    except RequestException as e:
+        print(f"[调试] 鸡蛋价格请求失败: {e}", file=sys.stderr)
+        raise ValueError("无法在页面中找到鸡蛋参考价")
+
+    if price_per_kg is None:
+        raise ValueError("无法在页面中找到鸡蛋参考价")
+
+    price_per_jin = price_per_kg / 2.0
+    return price_per_jin
 
 def get_rice_price_per_jin():
     """暂留函数：大米价格抓取。当前实现返回 None。后续如找到可靠源可实现解析。"""
     return None
 
-def load_price_history():
-    """加载历史价格数据"""
-    if not os.path.exists(HISTORY_FILE):
-        os.makedirs(DATA_DIR, exist_ok=True)
-        return []
-
+def load_price_history(limit=None):
+    """加载历史价格数据（最新在前）；limit 为 None 时加载全部，否则只读最新 limit 条"""
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        if limit is None:
+            return history_store.load_history()
+        return history_store.read_latest(limit)
     except Exception as e:
         print(f"[警告] 加载历史数据失败: {e}", file=sys.stderr)
         return []
 
-def save_price_data(data):
-    """保存价格数据到历史记录"""
-    history = load_price_history()
+def merge_price_data(history, data):
+    """把当天记录按日期合并进 history（已存在则替换），返回按日期倒序的新列表"""
+    merged = [record for record in history if record['date'] != data['date']]
+    merged.append(data)
+    merged.sort(key=lambda x: x['date'], reverse=True)
+    return merged
+
+def save_price_data(data, history=None):
+    """保存价格数据到历史记录：存储层按日期追加一行（不再导出 price_history.json 视图），
+    返回合并了当天记录的最近历史。history 为已加载的最近历史（最新在前）时直接复用，不再重新读取。"""
+    if history is None:
+        history = load_price_history(history_store.VIEW_LIMIT)
 
-    # 检查是否已存在当天的数据，如果存在则更新
     date_str = data['date']
-    existing_index = None
-    for i, record in enumerate(history):
-        if record['date'] == date_str:
-            existing_index = i
-            break
-
-    if existing_index is not None:
-        history[existing_index] = data
+    merged = merge_price_data(history, data)
+    if len(merged) == len(history):
         print(f"[信息] 更新 {date_str} 的数据", file=sys.stderr)
     else:
-        history.append(data)
         print(f"[信息] 添加 {date_str} 的新数据", file=sys.stderr)
 
-    # 按日期排序（最新的在前）
-    history.sort(key=lambda x: x['date'], reverse=True)
-
-    # 只保留最近 365 天的数据
-    history = history[:365]
-
-    # 保存到文件
-    os.makedirs(DATA_DIR, exist_ok=True)
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-        print(f"[信息] 数据已保存到 {HISTORY_FILE}", file=sys.stderr)
+        history_store.upsert(data)
+        print(f"[信息] 数据已保存到 {history_store.shard_path(date_str[:4])}", file=sys.stderr)
     except Exception as e:
         print(f"[错误] 保存数据失败: {e}", file=sys.stderr)
+    return merged
 
 def calc_ratio_ma(history, window=MA_WINDOW):
     """从历史数据取最近 window 天有效的 gold_egg_ratio，返回均值与样本数。
-    history 已按日期倒序（最新在前）；当天数据应已存入再调用本函数。"""
-    values = []
-    for rec in history:
-        v = rec.get("gold_egg_ratio")
-        if v is not None:
-            values.append(v)
-        if len(values) >= window:
-            break
-    if not values:
-        return None, 0
-    return sum(values) / len(values), len(values)
+    history 已按日期倒序（最新在前）；当天数据应已合并进来再调用本函数。"""
+    return stats.recent_mean(stats.iter_series(history, "gold_egg_ratio"), window)
 
 
 def calc_etf_premium_pct(etf_price, gold_price_per_g):
@@ -352,9 +329,10 @@ def calc_etf_premium_pct(etf_price, gold_price_per_g):
     return (etf_price - theoretical) / theoretical * 100
 
 
-def generate_history_statistics():
+def generate_history_statistics(history=None):
     """生成最近30天的历史统计表格"""
-    history = load_price_history()
+    if history is None:
+        history = load_price_history(30)
     if not history:
         return "\n--- 最近30天历史统计 ---\n暂无历史数据\n"
 
@@ -418,92 +396,226 @@ def generate_history_statistics():
 
     return "\n".join(table)
 
-def main():
-    date_str = datetime.date.today().isoformat()
-    error_messages = []
-
-    # ── 黄金现货（主源 + fallback）──
-    gold = None
-    gold_source = None
-    try:
-        gold, gold_source = get_gold_price_per_g()
-        if gold is None:
-            raise ValueError("两种来源（SGE API + 网页）均未取到黄金价格")
-    except Exception as e:
-        print(f"获取黄金价格失败: {e}", file=sys.stderr)
-        error_messages.append(f"获取黄金价格失败: {e}")
-
-    # ── 鸡蛋现货（100ppi）──
-    egg, egg_source = get_egg_price_per_jin()
-    if egg is None:
-        error_messages.append("获取鸡蛋现货价失败")
-
-    # ── 附加数据源（失败不阻塞）──
-    gold_etf = get_gold_etf_close()
-    gold_etf_premium_pct = calc_etf_premium_pct(gold_etf, gold)
-    egg_futures = get_egg_price_futures_per_jin()
+def _range_status(value, low_high):
+    low, high = low_high
+    return ("低于", "处于", "高于")[1 + (value > high) - (value < low)]
 
-    rice = get_rice_price_per_jin()
 
-    ratio_gold_egg = gold / egg if (gold is not None and egg is not None) else None
-    ratio_gold_rice = gold / rice if (gold is not None and rice not in (None, 0)) else None
+def format_daily_report(record):
+    """把一条当天记录格式化为文字报告（命令行输出与邮件正文共用）"""
+    lines = [f"日期: {record['date']}"]
+    gold = record.get("gold_price")
+    egg = record.get("egg_price")
+    egg_futures = record.get("egg_price_futures")
+    gold_etf = record.get("gold_etf_518880")
+    premium = record.get("gold_etf_premium_pct")
+    rice = record.get("rice_price")
 
-    threshold_gold_egg = (80.0, 150.0)
-    threshold_gold_rice = (100.0, 200.0)
-
-    # ── 打印 ──
-    print(f"日期: {date_str}")
     if gold is not None:
-        print(f"黄金价格: {gold:.2f} 元／克  (来源: {gold_source})")
+        lines.append(f"黄金价格: {gold:.2f} 元／克  (来源: {record.get('gold_price_source')})")
     else:
-        print("黄金价格: N/A")
+        lines.append("黄金价格: N/A")
 
     if egg is not None:
-        print(f"鸡蛋价格: {egg:.2f} 元／斤  (来源: {egg_source})")
+        lines.append(f"鸡蛋价格: {egg:.2f} 元／斤  (来源: {record.get('egg_price_source')})")
     else:
-        print("鸡蛋价格: N/A")
+        lines.append("鸡蛋价格: N/A")
 
     if egg_futures is not None:
-        print(f"鸡蛋期货 JD0: {egg_futures:.3f} 元／斤  (大商所主力连续)")
+        lines.append(f"鸡蛋期货 JD0: {egg_futures:.3f} 元／斤  (大商所主力连续)")
     if gold_etf is not None:
         etf_line = f"黄金 ETF 518880: {gold_etf:.3f} 元／份"
-        if gold_etf_premium_pct is not None:
-            etf_line += f"  折溢价 {gold_etf_premium_pct:+.2f}%"
-        print(etf_line)
+        if premium is not None:
+            etf_line += f"  折溢价 {premium:+.2f}%"
+        lines.append(etf_line)
 
     if rice is not None:
-        print(f"大米价格: {rice:.2f} 元／斤")
-    else:
-        print("大米价格: N/A")
-
-    if ratio_gold_egg is not None:
-        status_egg = ("低于", "处于", "高于")[
-            1 + (ratio_gold_egg > threshold_gold_egg[1]) - (ratio_gold_egg < threshold_gold_egg[0])
-        ]
-        print(
-            f"黄金／鸡蛋 比例: {ratio_gold_egg:.1f} – {status_egg} 历史参考区间 "
-            f"{threshold_gold_egg[0]:.1f}-{threshold_gold_egg[1]:.1f}"
-        )
+        lines.append(f"大米价格: {rice:.2f} 元／斤")
     else:
-        print("黄金／鸡蛋 比例: N/A")
-
-    if ratio_gold_rice is not None:
-        status_rice = ("低于", "处于", "高于")[
-            1 + (ratio_gold_rice > threshold_gold_rice[1]) - (ratio_gold_rice < threshold_gold_rice[0])
-        ]
-        print(
-            f"黄金／大米 比例: {ratio_gold_rice:.1f} – {status_rice} 历史参考区间 "
-            f"{threshold_gold_rice[0]:.1f}-{threshold_gold_rice[1]:.1f}"
+        lines.append("大米价格: N/A")
+
+    for label, field, low_high in (
+        ("黄金／鸡蛋", "gold_egg_ratio", RATIO_RANGE_GOLD_EGG),
+        ("黄金／大米", "gold_rice_ratio", RATIO_RANGE_GOLD_RICE),
+    ):
+        ratio = record.get(field)
+        if ratio is not None:
+            lines.append(
+                f"{label} 比例: {ratio:.1f} – {_range_status(ratio, low_high)} 历史参考区间 "
+                f"{low_high[0]:.1f}-{low_high[1]:.1f}"
+            )
+        else:
+            lines.append(f"{label} 比例: N/A")
+
+    if record.get("errors"):
+        lines.append("\n--- 警告信息 ---")
+        lines.extend(record["errors"])
+
+    ma_value = record.get("ratio_ma20")
+    deviation_pct = record.get("ratio_ma20_deviation_pct")
+    ratio = record.get("gold_egg_ratio")
+    if ma_value is not None and deviation_pct is not None and ratio is not None:
+        ma_count = record.get("ratio_ma20_count", MA_WINDOW)
+        direction = "高于" if deviation_pct >= 0 else "低于"
+        lines.append(
+            f"\n--- 比例统计 ---\n"
+            f"最近 {ma_count} 日均比: {ma_value:.1f}\n"
+            f"今日相对均值: {direction} {abs(deviation_pct):.2f}% （今日 {ratio:.1f} vs MA{ma_count} {ma_value:.1f}）"
         )
-    else:
-        print("黄金／大米 比例: N/A")
+    return "\n".join(lines)
+
+
+def build_report(history):
+    """由已存储的历史（最新在前）生成完整文字报告：最新一天的日报 + 最近 30 天统计"""
+    if not history:
+        return "暂无历史数据"
+    return format_daily_report(history[0]) + "\n" + generate_history_statistics(history)
+
+
+def _fetch_gold():
+    gold, source = get_gold_price_per_g()
+    if gold is None:
+        raise ValueError("两种来源（SGE API + 网页）均未取到黄金价格")
+    return gold, source
+
+
+def _run_source(name, fn):
+    """在独立的指标阶段里执行一个数据源，记录耗时、成败与胜出的来源"""
+    with metrics.stage(f"source.{name}") as rec:
+        result = fn()
+        value, source = result if isinstance(result, tuple) else (result, None)
+        rec["ok"] = value is not None
+        if value is not None and source:
+            rec["winner"] = source
+        return result
+
+
+def _start_daemon(name, fn, *args):
+    """在守护线程中执行 fn，返回 Future。
+    不用 ThreadPoolExecutor：它的工作线程在解释器退出时会被 join，卡住的源仍会把进程拖到
+    自身请求超时与重试全部耗尽；守护线程不被等待，超时的源不再影响进程退出。"""
+    from concurrent.futures import Future
+
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"source-{name}", daemon=True).start()
+    return future
+
+
+def fetch_all_sources(timeouts=None):
+    """并发抓取全部数据源，每个源有独立超时。
+    返回 (results, failures)：results 为 {源名: 返回值}，failures 为 {源名: 异常}。
+    墙钟时间约等于最慢的单个源，而不是各源耗时之和；超时的源留在后台守护线程里，
+    结果被丢弃，也不会阻止进程退出。"""
+    from concurrent.futures import TimeoutError as FuturesTimeout
+
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    tasks = {
+        "gold": _fetch_gold,
+        "egg": get_egg_price_per_jin,
+        "gold_etf": get_gold_etf_close,
+        "egg_futures": get_egg_price_futures_per_jin,
+    }
+    results = {}
+    failures = {}
+    started = time.monotonic()
+    futures = {name: _start_daemon(name, _run_source, name, fn) for name, fn in tasks.items()}
+    for name, future in futures.items():
+        # 所有源同时起跑，超时按各自的截止时刻计算
+        remaining = max(0.0, started + timeouts[name] - time.monotonic())
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FuturesTimeout:
+            failures[name] = TimeoutError(f"{timeouts[name]} 秒内未返回")
+            metrics.record(f"source.{name}", False, error="timeout", ms=timeouts[name] * 1000)
+            print(f"[调试] 数据源 {name} 超时（{timeouts[name]}s）", file=sys.stderr)
+        except Exception as e:
+            failures[name] = e
+    print(f"[调试] 数据源并发抓取完成，耗时 {time.monotonic() - started:.2f}s", file=sys.stderr)
+    return results, failures
+
+
+def _latency(value):
+    return value if value == "recorded" else float(value)
+
 
-    if error_messages:
-        print("\n--- 警告信息 ---")
-        for msg in error_messages:
-            print(msg)
+def add_source_args(parser):
+    """录制 / 回放与存储目录参数（run_pipeline.py 共用）"""
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="DIR", help="真实抓取，同时把全部响应录制到磁带目录 DIR")
+    mode.add_argument("--replay", metavar="DIR", help="不联网，从磁带目录 DIR 回放全部响应")
+    parser.add_argument("--latency", type=_latency, default=0.0,
+                        help="回放时每个响应的模拟延迟：秒数，或 recorded（按录制时的真实耗时）")
+    parser.add_argument("--data-dir", help="历史存储目录（默认 data/；回放时建议指向临时目录）")
 
-    # ── 保存到历史 ──
+
+def configure(args):
+    """按 add_source_args 解析出的参数切换存储目录与磁带模式"""
+    if args.data_dir:
+        history_store.configure(args.data_dir)
+    if args.record:
+        cassette.configure("record", args.record)
+    elif args.replay:
+        cassette.configure("replay", args.replay, latency=args.latency)
+    metrics.tag(cassette="record" if args.record else "replay" if args.replay else None)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="采集金价 / 蛋价并写入历史")
+    add_source_args(parser)
+    configure(parser.parse_args(argv))
+    try:
+        collect_and_save()
+    finally:
+        metrics.flush("gold_egg_price")
+
+
+def collect_and_save():
+    """抓取全部数据源、打印当日报告并写入历史；返回合并了当天记录的最近历史（最新在前）"""
+    date_str = cassette.today().isoformat()
+    error_messages = []
+
+    with metrics.stage("fetch_all"):
+        results, failures = fetch_all_sources()
+
+    # ── 黄金现货（主源 + fallback）──
+    gold, gold_source = results.get("gold", (None, None))
+    if "gold" in failures:
+        e = failures["gold"]
+        print(f"获取黄金价格失败: {e}", file=sys.stderr)
+        error_messages.append(f"获取黄金价格失败: {e}")
+
+    # ── 鸡蛋现货（100ppi）──
+    egg, egg_source = results.get("egg", (None, "100ppi"))
+    if egg is None:
+        error_messages.append("获取鸡蛋现货价失败")
+
+    # ── 附加数据源（失败不阻塞）──
+    gold_etf = results.get("gold_etf")
+    gold_etf_premium_pct = calc_etf_premium_pct(gold_etf, gold)
+    egg_futures = results.get("egg_futures")
+    for name in ("gold_etf", "egg_futures"):
+        if name in failures:
+            print(f"[调试] 附加数据源 {name} 获取失败: {failures[name]}", file=sys.stderr)
+
+    rice = get_rice_price_per_jin()
+
+    ratio_gold_egg = gold / egg if (gold is not None and egg is not None) else None
+    ratio_gold_rice = gold / rice if (gold is not None and rice not in (None, 0)) else None
+    # 金价 / 期货蛋价：期货有完整日线，可与回填的历史口径对齐
+    ratio_gold_egg_futures = gold / egg_futures if (gold is not None and egg_futures) else None
+
+    # ── 当天记录 ──
     price_data = {
         "date": date_str,
         "timestamp": datetime.datetime.now().isoformat(),
@@ -518,33 +630,33 @@ def main():
         "rice_price": rice,
         "gold_egg_ratio": ratio_gold_egg,
         "gold_rice_ratio": ratio_gold_rice,
+        "gold_egg_futures_ratio": ratio_gold_egg_futures,
         "errors": error_messages,
     }
-    save_price_data(price_data)
 
-    # ── 20 日均比对照（必须在 save 之后，让今日值纳入计算）──
-    history = load_price_history()
+    # ── 20 日均比对照（今日值先合并进历史参与计算，再随当天记录一次写入）──
+    with metrics.stage("history.load") as rec:
+        previous = load_price_history(history_store.VIEW_LIMIT)
+        rec["records"] = len(previous)
+    history = merge_price_data(previous, price_data)
     ma_value, ma_count = calc_ratio_ma(history, MA_WINDOW)
     if ma_value is not None and ratio_gold_egg is not None:
-        deviation_pct = (ratio_gold_egg - ma_value) / ma_value * 100
-        direction = "高于" if deviation_pct >= 0 else "低于"
-        print(
-            f"\n--- 比例统计 ---\n"
-            f"最近 {ma_count} 日均比: {ma_value:.1f}\n"
-            f"今日相对均值: {direction} {abs(deviation_pct):.2f}% （今日 {ratio_gold_egg:.1f} vs MA{ma_count} {ma_value:.1f}）"
-        )
-        # 回填到历史最新一条，方便前端/通知直接读
-        history[0]["ratio_ma20"] = round(ma_value, 4)
-        history[0]["ratio_ma20_deviation_pct"] = round(deviation_pct, 4)
-        history[0]["ratio_ma20_count"] = ma_count
-        try:
-            with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"[警告] 回填 ratio_ma20 失败: {e}", file=sys.stderr)
+        # 写入当天记录，方便前端/通知直接读
+        price_data["ratio_ma20"] = round(ma_value, 4)
+        price_data["ratio_ma20_deviation_pct"] = round(stats.pct_deviation(ratio_gold_egg, ma_value), 4)
+        price_data["ratio_ma20_count"] = ma_count
+
+    # ── 打印（与邮件正文同一份报告）──
+    with metrics.stage("report.format"):
+        print(format_daily_report(price_data))
+
+    with metrics.stage("history.save"):
+        history = save_price_data(price_data, previous)
 
     # 输出最近30天历史统计
-    print(generate_history_statistics())
+    with metrics.stage("report.statistics"):
+        print(generate_history_statistics(history))
+    return history
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
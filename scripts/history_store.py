@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+history_store.py
+================
+价格历史的存储后端：按年份分片的追加写日志 + 日期索引，不限条数。
+
+  - 分片：data/history/<年份>.jsonl，每行一条紧凑 JSON 记录；
+    同一日期后写的行覆盖先写的行，因此按日期 upsert 只需向当年分片追加一行
+  - 索引：data/history/<年份>.idx.json，记录 日期 → 该日期最新一行在分片中的字节偏移，
+    另存分片行数与字节大小；大小对不上（进程中断）时自动扫描分片重建
+  - 压缩：分片内被覆盖的旧行超过一定比例时，整片重写为每个日期一行
+  - 查询：read_range 只打开日期范围覆盖到的分片，read_latest 从最新分片往前读够 n 条即停，
+    两者都按偏移直接 seek 读取，耗时与历史总长度无关
+  - 导出视图：data/price_history.json（最新在前、indent=2），与旧格式完全一致。
+    仓库内已没有读取它的代码，保存时不再导出；需要旧格式文件时按需导出
+
+用法：
+  python scripts/history_store.py --export-view [--limit 365]   # 导出最近 limit 条到 price_history.json
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SHARD_DIR = os.path.join(DATA_DIR, "history")
+VIEW_FILE = os.path.join(DATA_DIR, "price_history.json")
+LEGACY_LOG_FILE = os.path.join(DATA_DIR, "price_history.jsonl")
+
+VIEW_LIMIT = 365                    # 导出视图保留的最近记录数（存储本身不限条数）
+COMPACT_MIN_LINES = 64              # 分片行数低于此值时不压缩
+COMPACT_RATIO = 2.0                 # 分片行数 / 日期数 超过该比例时压缩
+FINGERPRINT_LENGTH = 12             # 分片内容哈希的长度（十六进制位）
+FINGERPRINT_CHUNK = 1 << 20         # 计算哈希时每次读取的字节数
+
+
+def configure(data_dir):
+    """把存储目录切换到 data_dir（回放 / 基准测试时避免改动 data/ 下的真实历史）"""
+    global DATA_DIR, SHARD_DIR, VIEW_FILE, LEGACY_LOG_FILE
+    DATA_DIR = os.path.abspath(data_dir)
+    SHARD_DIR = os.path.join(DATA_DIR, "history")
+    VIEW_FILE = os.path.join(DATA_DIR, "price_history.json")
+    LEGACY_LOG_FILE = os.path.join(DATA_DIR, "price_history.jsonl")
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def shard_path(year):
+    return os.path.join(SHARD_DIR, f"{year}.jsonl")
+
+
+def _index_path(year):
+    return os.path.join(SHARD_DIR, f"{year}.idx.json")
+
+
+def shard_years():
+    """已有分片的年份（升序）"""
+    if not os.path.isdir(SHARD_DIR):
+        return []
+    return sorted(name[:-len(".jsonl")] for name in os.listdir(SHARD_DIR) if name.endswith(".jsonl"))
+
+
+# ── 索引 ──
+
+def _scan_shard(year):
+    """扫描整片日志，重建索引 {"lines", "size", "offsets": {date: offset}}"""
+    offsets = {}
+    lines = 0
+    offset = 0
+    with open(shard_path(year), "rb") as f:
+        for raw in f:
+            line = raw.strip()
+            if line:
+                try:
+                    date = json.loads(line)["date"]
+                    if not isinstance(date, str):
+                        raise TypeError(f"date 不是字符串: {date!r}")
+                    offsets[date] = offset
+                    lines += 1
+                except (ValueError, KeyError, TypeError):
+                    # 进程中断可能留下半行，手工编辑也可能留下缺 date 的行，跳过即可
+                    print(f"[警告] 跳过 {year} 分片中损坏的行: {line[:80]!r}", file=sys.stderr)
+            offset += len(raw)
+    return {"lines": lines, "size": offset, "offsets": offsets}
+
+
+def _save_index(year, index):
+    _write_atomic(_index_path(year), json.dumps(index, separators=(",", ":")))
+
+
+def load_index(year):
+    """读取某年分片的索引；缺失或与分片大小不一致时重建"""
+    path = shard_path(year)
+    if not os.path.exists(path):
+        return {"lines": 0, "size": 0, "offsets": {}}
+    try:
+        with open(_index_path(year), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("size") == os.path.getsize(path):
+            return index
+    except (OSError, ValueError):
+        pass
+    index = _scan_shard(year)
+    _save_index(year, index)
+    return index
+
+
+# ── 迁移 ──
+
+def _migrate():
+    """首次使用：把旧的单文件日志（或 price_history.json）按年份拆成分片"""
+    if os.path.exists(LEGACY_LOG_FILE):
+        records = {}
+        with open(LEGACY_LOG_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["date"]] = record
+        source = LEGACY_LOG_FILE
+    elif os.path.exists(VIEW_FILE):
+        with open(VIEW_FILE, "r", encoding="utf-8") as f:
+            records = {r["date"]: r for r in json.load(f)}
+        source = VIEW_FILE
+    else:
+        return
+    write_records(records.values())
+    if source == LEGACY_LOG_FILE:
+        os.remove(LEGACY_LOG_FILE)
+    print(f"[信息] 已从 {source} 迁移 {len(records)} 条记录到 {SHARD_DIR}", file=sys.stderr)
+
+
+def _ensure_shards():
+    if not os.path.isdir(SHARD_DIR):
+        _migrate()
+
+
+# ── 写入 ──
+
+def _rewrite_shard(year, records):
+    """整片重写为每个日期一行（按日期正序），并写出新索引"""
+    offsets = {}
+    chunks = []
+    offset = 0
+    for record in sorted(records, key=lambda r: r["date"]):
+        raw = (_dumps(record) + "\n").encode("utf-8")
+        offsets[record["date"]] = offset
+        chunks.append(raw)
+        offset += len(raw)
+    _write_atomic(shard_path(year), b"".join(chunks))
+    _save_index(year, {"lines": len(offsets), "size": offset, "offsets": offsets})
+
+
+def write_records(records):
+    """批量写入：按年份分组，与已有分片合并后每个分片只重写一次"""
+    by_year = {}
+    for record in records:
+        by_year.setdefault(record["date"][:4], []).append(record)
+    for year, new_records in by_year.items():
+        merged = {r["date"]: r for r in read_shard(year)}
+        merged.update((r["date"], r) for r in new_records)
+        _rewrite_shard(year, merged.values())
+
+
+def compact(year):
+    """把某年分片重写为每个日期一行"""
+    before = load_index(year)["lines"]
+    records = read_shard(year)
+    _rewrite_shard(year, records)
+    print(f"[信息] {year} 分片已压缩: {before} 行 → {len(records)} 行", file=sys.stderr)
+
+
+def upsert(record):
+    """按日期写入一条记录：只向当年分片追加一行并更新该分片索引；
+    被覆盖的旧行过多时压缩该分片。"""
+    _ensure_shards()
+    year = record["date"][:4]
+    index = load_index(year)
+    raw = (_dumps(record) + "\n").encode("utf-8")
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    with open(shard_path(year), "ab") as f:
+        offset = f.tell()
+        f.write(raw)
+    index["offsets"][record["date"]] = offset
+    index["lines"] += 1
+    index["size"] = offset + len(raw)
+    _save_index(year, index)
+
+    if index["lines"] >= COMPACT_MIN_LINES and index["lines"] > COMPACT_RATIO * len(index["offsets"]):
+        compact(year)
+
+
+# ── 读取 ──
+
+def _read_at(f, offsets):
+    records = []
+    for offset in offsets:
+        f.seek(offset)
+        records.append(json.loads(f.readline()))
+    return records
+
+
+def read_shard(year):
+    """读取某年分片的全部有效记录（每个日期一条，按日期正序）"""
+    index = load_index(year)
+    if not index["offsets"]:
+        return []
+    with open(shard_path(year), "rb") as f:
+        return _read_at(f, (index["offsets"][d] for d in sorted(index["offsets"])))
+
+
+def read_range(start=None, end=None):
+    """读取 [start, end] 日期闭区间内的记录（按日期正序）；只打开涉及到的年份分片"""
+    _ensure_shards()
+    records = []
+    for year in shard_years():
+        if (start and year < start[:4]) or (end and year > end[:4]):
+            continue
+        offsets = load_index(year)["offsets"]
+        dates = sorted(d for d in offsets if (not start or d >= start) and (not end or d <= end))
+        if dates:
+            with open(shard_path(year), "rb") as f:
+                records.extend(_read_at(f, (offsets[d] for d in dates)))
+    return records
+
+
+def read_latest(n):
+    """读取最新 n 条记录（最新在前）；从最新年份分片往前读，够数即停"""
+    _ensure_shards()
+    records = []
+    for year in reversed(shard_years()):
+        if len(records) >= n:
+            break
+        offsets = load_index(year)["offsets"]
+        dates = sorted(offsets, reverse=True)[:n - len(records)]
+        if dates:
+            with open(shard_path(year), "rb") as f:
+                records.extend(_read_at(f, (offsets[d] for d in dates)))
+    return records
+
+
+def _shard_digest(year):
+    h = hashlib.sha1()
+    with open(shard_path(year), "rb") as f:
+        for chunk in iter(lambda: f.read(FINGERPRINT_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def fingerprint():
+    """各年份分片的 [年份, 内容哈希]，作为"历史是否变化"的判据。
+    按内容而不是大小 / mtime：等长改写旧记录（backfill --overwrite）也能发现，
+    而 git checkout 刷新 mtime 不会误判为变化。哈希全部分片只是顺序读，远比解析 JSON 便宜。"""
+    _ensure_shards()
+    return [[year, _shard_digest(year)] for year in shard_years()]
+
+
+def get(date):
+    """按日期读取单条记录，不存在返回 None"""
+    _ensure_shards()
+    offset = load_index(date[:4])["offsets"].get(date)
+    if offset is None:
+        return None
+    with open(shard_path(date[:4]), "rb") as f:
+        return _read_at(f, [offset])[0]
+
+
+def load_history():
+    """加载全部历史，按日期倒序（最新在前）"""
+    history = read_range()
+    history.reverse()
+    return history
+
+
+def export_view(history=None, limit=VIEW_LIMIT):
+    """把最新在前的 history 导出为旧格式的 price_history.json；history 为 None 时读取最近 limit 条。
+    返回导出的条数"""
+    if history is None:
+        history = read_latest(limit)
+    view = history[:limit]
+    _write_atomic(VIEW_FILE, json.dumps(view, ensure_ascii=False, indent=2))
+    return len(view)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="价格历史存储工具")
+    parser.add_argument("--export-view", action="store_true", help="导出旧格式的 price_history.json 视图")
+    parser.add_argument("--limit", type=int, default=VIEW_LIMIT, help=f"导出的最近记录数（默认 {VIEW_LIMIT}）")
+    args = parser.parse_args(argv)
+    if not args.export_view:
+        parser.print_help()
+        return
+    count = export_view(limit=args.limit)
+    print(f"[信息] 已导出 {count} 条记录到 {VIEW_FILE}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
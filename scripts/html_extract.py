@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+html_extract.py
+===============
+兜底网页源的定向提取器：只扫描需要的那一段 HTML，不构建整棵 DOM 树。
+
+  - SGE 行情页：定位 <table class="daily_new_table"> 的 <tbody>，
+    用标准库 html.parser 流式分词，逐行收集 <td> 文本
+  - 100ppi 快讯页：定位 "鸡蛋参考价为" 附近的一小段文本，去标签后跑正则
+"""
+
+import html as html_lib
+import re
+from html.parser import HTMLParser
+
+_DAILY_TABLE_RE = re.compile(r"<table[^>]*\bdaily_new_table\b[^>]*>", re.I)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+EGG_MARKERS = (
+    ("鸡蛋参考价为", re.compile(r"鸡蛋参考价为\s*([\d]+\.\d+)")),
+    ("鸡蛋为", re.compile(r"鸡蛋为\s*([\d]+\.\d+)")),
+)
+EGG_SNIPPET_CHARS = 300             # 标记词之后最多扫描的字符数（含标签）
+
+
+class _RowCollector(HTMLParser):
+    """流式收集 <tr> 内各 <td>/<th> 的文本，容忍缺失的结束标签"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._row = None
+        self._cell = None
+
+    def _close_cell(self):
+        if self._cell is not None:
+            self._row.append("".join(self._cell).strip())
+            self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row:
+            self.rows.append(self._row)
+        self._row = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag in ("td", "th"):
+            if self._row is None:
+                self._row = []
+            self._close_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def close(self):
+        super().close()
+        if self._row is not None:
+            self._close_row()
+
+
+def daily_new_table_rows(html):
+    """返回 daily_new_table 的 <tbody> 中每一行的单元格文本列表。
+    找不到表格或 tbody 时抛出 ValueError。"""
+    m = _DAILY_TABLE_RE.search(html)
+    if not m:
+        raise ValueError("未找到表格")
+    table_end = html.find("</table>", m.end())
+    if table_end < 0:
+        table_end = len(html)
+    tbody = html.find("<tbody", m.end(), table_end)
+    if tbody < 0:
+        raise ValueError("未找到 tbody")
+    end = html.find("</tbody>", tbody, table_end)
+    if end < 0:
+        end = table_end
+
+    parser = _RowCollector()
+    parser.feed(html[tbody:end])
+    parser.close()
+    return parser.rows
+
+
+def egg_reference_price(html):
+    """返回页面中鸡蛋参考价（元/公斤，原始数值）；未找到返回 None。
+    先按 "鸡蛋参考价为"、再按 "鸡蛋为" 查找，只对标记词后的一小段去标签匹配。"""
+    for marker, pattern in EGG_MARKERS:
+        start = html.find(marker)
+        while start >= 0:
+            snippet = html[start:start + len(marker) + EGG_SNIPPET_CHARS]
+            text = html_lib.unescape(_TAG_RE.sub("", snippet))
+            m = pattern.match(text)
+            if m:
+                return float(m.group(1))
+            start = html.find(marker, start + len(marker))
+    return None
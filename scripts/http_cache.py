@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+http_cache.py
+=============
+爬虫页面的磁盘 HTTP 缓存，供 http_client.get_text / get_parsed 使用。
+
+  - 每个 URL 一个条目（gzip JSON）：正文、ETag、Last-Modified、新鲜期截止时间
+  - 新鲜期内直接返回正文；过期后带 If-None-Match / If-Modified-Since 重新验证，
+    304 时沿用缓存正文
+  - 解析结果按 (解析函数, 正文哈希) 保存在条目里，页面没变时连解析也省掉
+  - 缓存目录总大小超过上限时，按最近使用时间（LRU）淘汰
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache", "http")
+
+DEFAULT_FRESH_SECONDS = 600         # 响应未声明 max-age 时的新鲜期
+MAX_CACHE_BYTES = 32 * 1024 * 1024  # 缓存目录总大小上限
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.I)
+
+
+def _path(url):
+    return os.path.join(CACHE_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json.gz")
+
+
+def body_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _fresh_seconds(headers):
+    cache_control = headers.get("Cache-Control", "")
+    if "no-cache" in cache_control.lower():
+        return 0
+    m = _MAX_AGE_RE.search(cache_control)
+    return int(m.group(1)) if m else DEFAULT_FRESH_SECONDS
+
+
+def load(url):
+    """读取 url 的缓存条目，没有或损坏返回 None"""
+    path = _path(url)
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)  # 记录最近使用时间，供 LRU 淘汰
+    return entry
+
+
+def is_fresh(entry):
+    return entry is not None and time.time() < entry.get("fresh_until", 0)
+
+
+def conditional_headers(entry):
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _save(entry):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _path(entry["url"])
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        evict()
+    except (OSError, TypeError, ValueError) as e:
+        print(f"[警告] 写入 HTTP 缓存失败: {e}", file=sys.stderr)
+
+
+def store(url, resp):
+    """保存 200 响应，返回新条目；Cache-Control: no-store 时不保存，返回 None"""
+    if "no-store" in resp.headers.get("Cache-Control", "").lower():
+        return None
+    entry = {
+        "url": url,
+        "body": resp.text,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "fresh_until": time.time() + _fresh_seconds(resp.headers),
+        "parsed": {},
+    }
+    _save(entry)
+    return entry
+
+
+def revalidated(entry, resp):
+    """304：沿用正文，刷新新鲜期与校验头"""
+    entry["fresh_until"] = time.time() + _fresh_seconds(resp.headers)
+    entry["etag"] = resp.headers.get("ETag") or entry.get("etag")
+    entry["last_modified"] = resp.headers.get("Last-Modified") or entry.get("last_modified")
+    _save(entry)
+    return entry
+
+
+def get_parsed(entry, name, digest):
+    """返回缓存的解析结果 (命中, 值)"""
+    hit = (entry or {}).get("parsed", {}).get(name)
+    if hit and hit.get("hash") == digest:
+        return True, hit["value"]
+    return False, None
+
+
+def put_parsed(entry, name, digest, value):
+    """把解析结果写回条目（值须可 JSON 序列化）"""
+    if entry is None:
+        return
+    entry.setdefault("parsed", {})[name] = {"hash": digest, "value": value}
+    _save(entry)
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """缓存目录超过 max_bytes 时，按最近使用时间从旧到新删除条目"""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
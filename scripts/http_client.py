@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+http_client.py
+==============
+爬虫与通知脚本共用的 HTTP 客户端。
+
+  - 每个 host 一个 requests.Session：连接池 + keep-alive，重复请求不再重新握手
+  - 统一的重试 / 退避策略：连接错误与 429/5xx 由 urllib3 Retry 处理，
+    页面内容不完整（反爬页、空表格）由 get_text(expect=...) 按同一退避重试
+  - 按 host 配置的请求头模板（HEADER_PROFILES）
+  - 页面抓取走磁盘 HTTP 缓存（http_cache）：新鲜期内不联网，过期后发条件请求，
+    页面未变时连解析结果也复用（get_parsed）
+  - 磁带录制 / 回放（cassette）开启时，所有请求经过磁带，HTTP 缓存不参与
+  - 请求数、重试次数、下载字节、解析耗时、缓存命中计入当前线程的 metrics 阶段
+"""
+
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import cassette
+import http_cache
+import metrics
+
+BROWSER_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+# 按 host 的请求头模板；未列出的 host 使用 requests 默认头
+HEADER_PROFILES = {
+    "www.sge.com.cn": {
+        "User-Agent": BROWSER_UA,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Referer": "https://www.sge.com.cn/",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "same-origin",
+    },
+    "egg.100ppi.com": {
+        "User-Agent": BROWSER_UA,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+        "Referer": "https://egg.100ppi.com/",
+    },
+    # 新浪实时行情不带 Referer 会返回 403
+    "hq.sinajs.cn": {
+        "User-Agent": BROWSER_UA,
+        "Accept": "*/*",
+        "Referer": "https://finance.sina.com.cn/",
+    },
+}
+
+DEFAULT_TIMEOUT = 15
+RETRY_TOTAL = 3                     # 每个请求最多重试次数
+BACKOFF_FACTOR = 1.0                # 第 n 次重试前等待 BACKOFF_FACTOR * 2^(n-1) 秒
+BACKOFF_JITTER = 1.0                # 额外随机抖动上限（秒），避免固定节奏触发反爬
+RETRY_STATUS = (429, 500, 502, 503, 504)
+POOL_SIZE = 10
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class ContentMissing(requests.exceptions.RequestException):
+    """响应成功但页面中缺少预期内容（多为反爬页或空数据页）"""
+
+
+def backoff_seconds(attempt):
+    """第 attempt 次重试（从 1 开始）前的等待时间"""
+    return BACKOFF_FACTOR * (2 ** (attempt - 1)) + random.uniform(0, BACKOFF_JITTER)
+
+
+def _new_session(host):
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=POOL_SIZE)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADER_PROFILES.get(host, {}))
+    return session
+
+
+def session_for(url):
+    """返回 url 所在 host 的共享 Session（线程安全，按需创建）"""
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _new_session(host)
+        return session
+
+
+def _send(method, url, **kwargs):
+    return session_for(url).request(method, url, **kwargs)
+
+
+def _count(resp):
+    retries = getattr(getattr(resp.raw, "retries", None), "history", None) or ()
+    metrics.count("requests")
+    metrics.count("retries", len(retries))
+    metrics.count("bytes", len(resp.content))
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    if cassette.active():
+        resp = cassette.http_request(_send, method, url, **kwargs)
+    else:
+        resp = _send(method, url, **kwargs)
+    _count(resp)
+    return resp
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def _fetch_cached(url, use_cache, **kwargs):
+    """GET 一次，返回 (正文, 缓存条目, 新响应)。use_cache 时先查新鲜期，过期则带条件头重新验证；
+    命中缓存时新响应为 None。"""
+    entry = http_cache.load(url) if use_cache else None
+    if http_cache.is_fresh(entry):
+        print(f"[调试] HTTP 缓存命中（新鲜期内）: {url}", file=sys.stderr)
+        metrics.count("cache_hits")
+        return entry["body"], entry, None
+
+    headers = {**kwargs.pop("headers", {}), **http_cache.conditional_headers(entry)}
+    resp = get(url, headers=headers, **kwargs)
+    if resp.status_code == 304 and entry is not None:
+        print(f"[调试] HTTP 缓存命中（304 未修改）: {url}", file=sys.stderr)
+        metrics.count("cache_hits")
+        return entry["body"], http_cache.revalidated(entry, resp), None
+    resp.raise_for_status()
+    return resp.text, None, resp
+
+
+def _get_text(url, expect, attempts, cache, **kwargs):
+    cache = cache and not cassette.active()
+    for attempt in range(attempts):
+        if attempt > 0:
+            metrics.count("retries")
+            time.sleep(backoff_seconds(attempt))
+        # 只有第一次尝试读缓存；内容缺失后的重试一律直连
+        html, entry, resp = _fetch_cached(url, cache and attempt == 0, **kwargs)
+        if expect is None or expect in html:
+            # 只缓存内容完整的页面，反爬页不入缓存
+            if cache and resp is not None:
+                entry = http_cache.store(url, resp)
+            return html, entry
+        print(
+            f"[调试] {url} 页面中未找到 {expect}，HTML 长度: {len(html)} (尝试 {attempt+1}/{attempts})",
+            file=sys.stderr,
+        )
+    print(f"[调试] HTML 预览: {html[:500]}", file=sys.stderr)
+    raise ContentMissing(f"页面中未找到 {expect}: {url}")
+
+
+def get_text(url, expect=None, attempts=RETRY_TOTAL, cache=True, **kwargs):
+    """GET 并返回页面文本。expect 不为空时，页面中须包含该子串，
+    否则按统一退避策略重新请求，最终仍缺失则抛出 ContentMissing。
+    cache 为 True 时使用磁盘 HTTP 缓存（新鲜期 + 条件请求）。"""
+    return _get_text(url, expect, attempts, cache, **kwargs)[0]
+
+
+def get_parsed(url, parse, expect=None, attempts=RETRY_TOTAL, **kwargs):
+    """GET 页面并返回 parse(text)。页面与上次相同（新鲜期内 / 304 / 正文哈希一致）时
+    直接返回缓存的解析结果。parse 的返回值须可 JSON 序列化。"""
+    html, entry = _get_text(url, expect, attempts, True, **kwargs)
+    name = f"{parse.__module__}.{parse.__qualname__}"
+    digest = http_cache.body_hash(html)
+    hit, value = http_cache.get_parsed(entry, name, digest)
+    if hit:
+        metrics.count("parse_cache_hits")
+        return value
+    started = time.perf_counter()
+    value = parse(html)
+    metrics.count("parse_ms", (time.perf_counter() - started) * 1000)
+    http_cache.put_parsed(entry, name, digest, value)
+    return value
+
+
+def close_all():
+    """关闭全部共享 Session（长驻进程退出前调用）"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
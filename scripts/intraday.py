@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+intraday.py
+===========
+盘中采集常驻进程：交易时段内按固定间隔轮询实时行情，写入内存环形缓冲并定期落盘。
+
+  - 行情：SGE Au99.99 现货分时最新价（元/克）、新浪 nf_JD0 鸡蛋期货（元/500kg → 元/斤）、
+    sh518880 黄金 ETF（元/份），两个上游并发请求（native_sources）
+  - 每个 tick 同时计算盘中 金价 / 期货蛋价 比例与 ETF 折溢价（gold_egg_price.calc_etf_premium_pct）
+  - TickRing：定长环形缓冲，每列一个 array("d")，缺失值存 NaN，写满后覆盖最旧的 tick
+  - 每 FLUSH_INTERVAL 秒把未落盘的 tick 追加到 data/ticks/<日期>.ticks（北京时间）：
+    8 字节文件头 + 每条 20 字节（<dfff：时间戳、金价、期货蛋价、ETF 价），比例与折溢价读取时再算
+  - 时段外不请求，睡到下一个时段开始；收到 SIGTERM / Ctrl+C 时落盘后退出
+
+用法：
+  python scripts/intraday.py                                  # 默认每 30 秒，09:00-11:30,13:00-15:30
+  python scripts/intraday.py --interval 10 --sessions 09:00-11:30,13:30-15:30,20:00-02:30
+  python scripts/intraday.py --once                           # 忽略时段，只采一次并落盘
+"""
+
+import datetime
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import gold_egg_price
+import history_store
+import metrics
+
+POLL_INTERVAL = 30                  # 默认轮询间隔（秒）
+FLUSH_INTERVAL = 300                # 环形缓冲落盘间隔（秒）
+RING_CAPACITY = 2048                # 环形缓冲容量（条），30 秒间隔约覆盖 17 小时
+TRADING_SESSIONS = "09:00-11:30,13:00-15:30"  # 北京时间，周一至周五；结束早于开始表示跨夜
+QUOTE_TIMEOUT = 10                  # 单次行情请求超时（秒）
+IDLE_SLEEP_MAX = 300                # 时段外单次睡眠上限（秒），便于及时响应退出信号
+
+TICK_DIR_NAME = "ticks"             # history_store.DATA_DIR 下
+TICK_MAGIC = b"GRTICK1\n"
+TICK_RECORD = struct.Struct("<dfff")  # 时间戳, 金价 元/克, 期货蛋价 元/斤, ETF 元/份
+SGE_SYMBOL = "Au99.99"
+EGG_FUTURES_QUOTE = "nf_" + gold_egg_price.EGG_FUTURES_SYMBOL
+GOLD_ETF_QUOTE = "sh" + gold_egg_price.GOLD_ETF_SYMBOL
+
+BEIJING = datetime.timezone(datetime.timedelta(hours=8))
+NAN = float("nan")
+
+
+def _value(x):
+    """NaN → None"""
+    return None if math.isnan(x) else x
+
+
+class TickRing:
+    """定长环形缓冲：每列一个 array("d")（约 48 字节 / tick），写满后覆盖最旧的 tick。
+    seq 为累计写入条数，第 seq 条存放在 seq % capacity；flushed 为已落盘的累计条数。"""
+
+    COLUMNS = ("ts", "gold", "egg", "etf", "ratio", "premium")
+    __slots__ = ("capacity", "columns", "seq", "flushed")
+
+    def __init__(self, capacity=RING_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity 必须为正数")
+        self.capacity = capacity
+        self.columns = {name: array("d", [NAN]) * capacity for name in self.COLUMNS}
+        self.seq = 0
+        self.flushed = 0
+
+    def __len__(self):
+        return min(self.seq, self.capacity)
+
+    def append(self, ts, gold, egg, etf):
+        """写入一个 tick（价格缺失传 None），同时计算盘中比例与 ETF 折溢价"""
+        ratio = gold / egg if gold is not None and egg else None
+        premium = gold_egg_price.calc_etf_premium_pct(etf, gold)
+        i = self.seq % self.capacity
+        for name, value in zip(self.COLUMNS, (ts, gold, egg, etf, ratio, premium)):
+            self.columns[name][i] = NAN if value is None else value
+        self.seq += 1
+
+    def latest(self):
+        """最新 tick：{列名: 值}，缺失值为 None；空缓冲返回 None"""
+        if not self.seq:
+            return None
+        i = (self.seq - 1) % self.capacity
+        return {name: _value(col[i]) for name, col in self.columns.items()}
+
+    def rows(self, start=0):
+        """按写入顺序返回累计序号 >= start 且仍在缓冲中的 tick（元组，列顺序同 COLUMNS）"""
+        start = max(start, self.seq - self.capacity)
+        cols = [self.columns[name] for name in self.COLUMNS]
+        return [tuple(col[s % self.capacity] for col in cols) for s in range(start, self.seq)]
+
+    def range(self, name):
+        """缓冲内某列的 (最小, 最大)，没有有效值返回 None"""
+        values = [v for v in self.columns[name][:len(self)] if not math.isnan(v)]
+        return (min(values), max(values)) if values else None
+
+    def take_unflushed(self):
+        """取出尚未落盘的 tick 并标记为已落盘，返回 (tick 列表, 落盘前已被覆盖丢失的条数)"""
+        dropped = max(0, self.seq - self.capacity - self.flushed)
+        rows = self.rows(self.flushed)
+        self.flushed = self.seq
+        return rows, dropped
+
+
+# ── tick 文件 ──
+
+def tick_dir():
+    return os.path.join(history_store.DATA_DIR, TICK_DIR_NAME)
+
+
+def tick_path(day):
+    return os.path.join(tick_dir(), f"{day.isoformat()}.ticks")
+
+
+def _day(ts):
+    return datetime.datetime.fromtimestamp(ts, BEIJING).date()
+
+
+def append_ticks(rows):
+    """把 tick 按北京时间日期追加到各自的 tick 文件，返回写入的字节数"""
+    by_day = {}
+    for ts, gold, egg, etf, *_ in rows:
+        by_day.setdefault(_day(ts), bytearray()).extend(TICK_RECORD.pack(ts, gold, egg, etf))
+    written = 0
+    for day, data in by_day.items():
+        path = tick_path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            if f.tell() == 0:
+                f.write(TICK_MAGIC)
+                written += len(TICK_MAGIC)
+            f.write(data)
+        written += len(data)
+    return written
+
+
+def read_ticks(path, capacity=None):
+    """读取 tick 文件，返回装有全部（或最近 capacity 条）tick 的 TickRing，比例与折溢价重新计算"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(TICK_MAGIC):
+        raise ValueError(f"不是 tick 文件: {path}")
+    body = data[len(TICK_MAGIC):]
+    # 进程中途被杀可能留下半条记录，忽略末尾不完整的部分
+    body = body[:len(body) - len(body) % TICK_RECORD.size]
+    count = len(body) // TICK_RECORD.size
+    ring = TickRing(capacity or max(count, 1))
+    for ts, gold, egg, etf in TICK_RECORD.iter_unpack(body):
+        ring.append(ts, _value(gold), _value(egg), _value(etf))
+    ring.flushed = ring.seq
+    return ring
+
+
+# ── 交易时段 ──
+
+def parse_sessions(text):
+    """"09:00-11:30,13:00-15:30" → [(time, time), ...]"""
+    sessions = []
+    for item in (s.strip() for s in text.split(",")):
+        if not item:
+            continue
+        try:
+            start, end = (datetime.time.fromisoformat(t.strip()) for t in item.split("-"))
+        except ValueError:
+            raise ValueError(f"交易时段格式应为 HH:MM-HH:MM: {item}") from None
+        sessions.append((start, end))
+    if not sessions:
+        raise ValueError("至少需要一个交易时段")
+    return sessions
+
+
+def in_session(now, sessions):
+    """now（北京时间）是否处于某个交易时段；跨夜时段零点后的部分归属前一个交易日"""
+    t = now.time()
+    for start, end in sessions:
+        if start <= end:
+            if start <= t < end and now.weekday() < 5:
+                return True
+        elif t >= start and now.weekday() < 5:
+            return True
+        elif t < end and (now - datetime.timedelta(days=1)).weekday() < 5:
+            return True
+    return False
+
+
+def seconds_until_session(now, sessions):
+    """距下一个交易时段开始的秒数（只看周一至周五）"""
+    candidates = []
+    for offset in range(8):
+        day = now.date() + datetime.timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for start, _ in sessions:
+            begin = datetime.datetime.combine(day, start, BEIJING)
+            if begin > now:
+                candidates.append((begin - now).total_seconds())
+    return min(candidates)
+
+
+# ── 采集 ──
+
+def poll(pool):
+    """并发请求两个上游，返回 (金价, 期货蛋价 元/斤, ETF 价, 失败的上游列表)"""
+    import native_sources
+
+    gold_future = pool.submit(native_sources.sge_quote, SGE_SYMBOL, QUOTE_TIMEOUT)
+    sina_future = pool.submit(native_sources.sina_quotes, (EGG_FUTURES_QUOTE, GOLD_ETF_QUOTE), QUOTE_TIMEOUT)
+    failed = []
+    gold, quotes = None, {}
+    try:
+        gold = gold_future.result()
+    except Exception as e:
+        failed.append("sge")
+        print(f"[调试] SGE 分时行情获取失败: {e}", file=sys.stderr)
+    try:
+        quotes = sina_future.result()
+    except Exception as e:
+        failed.append("sina")
+        print(f"[调试] 新浪实时行情获取失败: {e}", file=sys.stderr)
+    egg = quotes.get(EGG_FUTURES_QUOTE)
+    if egg is not None:
+        egg /= gold_egg_price.EGG_FUTURES_UNIT_PER_JIN
+    return gold, egg, quotes.get(GOLD_ETF_QUOTE), failed
+
+
+def _fmt(value, spec, suffix=""):
+    return "N/A" if value is None else f"{value:{spec}}{suffix}"
+
+
+def format_tick(tick):
+    when = datetime.datetime.fromtimestamp(tick["ts"], BEIJING).strftime("%H:%M:%S")
+    return (f"{when}  金 {_fmt(tick['gold'], '.2f')}  蛋(期) {_fmt(tick['egg'], '.3f')}  "
+            f"金/蛋 {_fmt(tick['ratio'], '.1f')}  ETF {_fmt(tick['etf'], '.3f')}  "
+            f"折溢价 {_fmt(tick['premium'], '+.2f', '%')}")
+
+
+class Collector:
+    """轮询循环：时段内采集、定期落盘，时段结束时汇总一条 metrics 阶段 intraday.session"""
+
+    def __init__(self, interval=POLL_INTERVAL, sessions=None, capacity=RING_CAPACITY,
+                 flush_interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self.sessions = sessions or parse_sessions(TRADING_SESSIONS)
+        self.flush_interval = flush_interval
+        self.ring = TickRing(capacity)
+        self.stop_event = threading.Event()
+        self._session = None            # 进行中时段的统计
+        self._last_flush = time.monotonic()
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+    def flush(self):
+        rows, dropped = self.ring.take_unflushed()
+        if dropped:
+            print(f"[警告] 环形缓冲已满，{dropped} 个 tick 在落盘前被覆盖（调大 --capacity 或调小 --flush-every）",
+                  file=sys.stderr)
+        if self._session is not None:
+            self._session["dropped"] += dropped
+        self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+        try:
+            written = append_ticks(rows)
+        except OSError as e:
+            print(f"[错误] tick 落盘失败: {e}", file=sys.stderr)
+            return 0
+        ratio = self.ring.range("ratio")
+        detail = f"，缓冲内金/蛋 {ratio[0]:.1f}–{ratio[1]:.1f}" if ratio else ""
+        print(f"[信息] 已落盘 {len(rows)} 个 tick（{written} 字节）: {tick_dir()}{detail}", file=sys.stderr)
+        return len(rows)
+
+    def _end_session(self):
+        """落盘并把本时段的统计记为一个 metrics 阶段"""
+        self.flush()
+        s = self._session
+        if s is None:
+            return
+        self._session = None
+        ms = round((time.monotonic() - s.pop("started")) * 1000, 1)
+        metrics.record("intraday.session", s["failed"] < s["polls"], ms=ms, **s)
+        metrics.flush("intraday")
+        print(f"[信息] 时段结束：轮询 {s['polls']} 次，tick {s['ticks']} 个，失败 {s['failed']} 次",
+              file=sys.stderr)
+
+    def tick(self, pool):
+        """采集一次，写入缓冲；全部上游都失败时不写入"""
+        if self._session is None:
+            self._session = {"started": time.monotonic(), "polls": 0, "ticks": 0, "failed": 0, "dropped": 0}
+        gold, egg, etf, failed = poll(pool)
+        self._session["polls"] += 1
+        if failed:
+            self._session["failed"] += 1
+        if gold is None and egg is None and etf is None:
+            return None
+        self.ring.append(time.time(), gold, egg, etf)
+        self._session["ticks"] += 1
+        tick = self.ring.latest()
+        print(format_tick(tick), flush=True)
+        return tick
+
+    def run(self, once=False):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="intraday") as pool:
+            try:
+                while not self.stop_event.is_set():
+                    now = datetime.datetime.now(BEIJING)
+                    if not once and not in_session(now, self.sessions):
+                        if self._session is not None:
+                            self._end_session()
+                        wait = seconds_until_session(now, self.sessions)
+                        if wait > self.interval:
+                            print(f"[信息] 非交易时段，{wait / 60:.0f} 分钟后开始下一时段", file=sys.stderr)
+                        self.stop_event.wait(min(wait, IDLE_SLEEP_MAX))
+                        continue
+
+                    started = time.monotonic()
+                    self.tick(pool)
+                    if once:
+                        break
+                    if time.monotonic() - self._last_flush >= self.flush_interval:
+                        self.flush()
+                    self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+            finally:
+                self._end_session()
+
+
+def main(argv=None):
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(description="交易时段内轮询实时行情，计算盘中金蛋比与 ETF 折溢价")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help=f"轮询间隔秒数（默认 {POLL_INTERVAL}）")
+    parser.add_argument("--sessions", type=parse_sessions, default=TRADING_SESSIONS,
+                        help=f"北京时间交易时段，逗号分隔（默认 {TRADING_SESSIONS}）")
+    parser.add_argument("--capacity", type=int, default=RING_CAPACITY, help=f"环形缓冲容量（默认 {RING_CAPACITY}）")
+    parser.add_argument("--flush-every", type=float, default=FLUSH_INTERVAL,
+                        help=f"落盘间隔秒数（默认 {FLUSH_INTERVAL}）")
+    parser.add_argument("--once", action="store_true", help="忽略交易时段，只采集一次并落盘")
+    parser.add_argument("--data-dir", help="存储目录（默认 data/，tick 文件写在其下的 ticks/）")
+    args = parser.parse_args(argv)
+    if args.data_dir:
+        history_store.configure(args.data_dir)
+    sessions = parse_sessions(args.sessions) if isinstance(args.sessions, str) else args.sessions
+
+    collector = Collector(args.interval, sessions, args.capacity, args.flush_every)
+    signal.signal(signal.SIGTERM, collector.stop)
+    try:
+        collector.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
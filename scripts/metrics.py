@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metrics.py
+==========
+每次运行的阶段耗时与数据源健康指标。
+
+  - stage(名称) / @timed(名称)：记录墙钟耗时、成功与否、错误信息，以及附加字段（如胜出的兜底源）
+  - count(键, 数值)：累加到当前线程正在进行的所有阶段上；
+    http_client 据此记录 请求数 / 重试次数 / 下载字节 / 解析耗时 / 缓存命中
+  - flush(脚本名)：把本次运行的全部阶段作为一行紧凑 JSON 追加到 .cache/metrics.jsonl
+    （随 CI 的 actions/cache 保留，不入库）
+
+汇总各阶段的延迟趋势：
+  python scripts/metrics.py [--days 30] [--stage source.]
+"""
+
+import contextlib
+import datetime
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS_FILE = os.path.join(PROJECT_DIR, ".cache", "metrics.jsonl")
+
+MAX_METRICS_BYTES = 4 * 1024 * 1024  # 文件超过该大小时只保留后一半的运行记录
+ERROR_CHARS = 200                    # 错误信息截断长度
+
+_stages = []
+_tags = {}
+_lock = threading.Lock()
+_local = threading.local()
+_run_started = time.time()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def tag(**fields):
+    """给本次运行附加字段（如 cassette="replay"）"""
+    _tags.update({k: v for k, v in fields.items() if v is not None})
+
+
+def count(key, value=1):
+    """累加到当前线程所有进行中的阶段"""
+    for rec in _stack():
+        rec[key] = round(rec.get(key, 0) + value, 3)
+
+
+def current():
+    """当前线程最内层进行中的阶段记录，没有返回 None"""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    """记录一个阶段；with 块内可直接往 yield 出的 dict 写附加字段，rec["ok"] = False 标记软失败"""
+    rec = {"stage": name, **fields}
+    stack = _stack()
+    stack.append(rec)
+    started = time.perf_counter()
+    try:
+        yield rec
+        rec.setdefault("ok", True)
+    except BaseException as e:
+        rec["ok"] = False
+        rec["error"] = f"{type(e).__name__}: {e}"[:ERROR_CHARS]
+        raise
+    finally:
+        rec["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        stack.remove(rec)
+        with _lock:
+            _stages.append(rec)
+
+
+def timed(name, ok=None):
+    """装饰器版 stage；ok(返回值) 为 False 时记为失败（用于失败时返回 None 的数据源函数）"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as rec:
+                result = fn(*args, **kwargs)
+                if ok is not None and not ok(result):
+                    rec["ok"] = False
+                return result
+        return wrapper
+    return decorator
+
+
+def record(name, ok, **fields):
+    """直接记录一个不经过 with 的阶段（如并发抓取中超时未返回的源）"""
+    with _lock:
+        _stages.append({"stage": name, "ok": ok, **fields})
+
+
+def flush(script, path=METRICS_FILE):
+    """把本次运行追加到指标文件（没有任何阶段时不写）；写失败只告警"""
+    with _lock:
+        stages = list(_stages)
+        _stages.clear()
+    if not stages:
+        return
+    run = {
+        "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+        "script": script,
+        "ms": round((time.time() - _run_started) * 1000, 1),
+        "ok": all(s.get("ok", True) for s in stages),
+        **_tags,
+        "stages": stages,
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False, separators=(",", ":")) + "\n")
+        _trim(path)
+    except OSError as e:
+        print(f"[警告] 写入运行指标失败: {e}", file=sys.stderr)
+
+
+def _trim(path):
+    if os.path.getsize(path) <= MAX_METRICS_BYTES:
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(lines[len(lines) // 2:])
+    os.replace(tmp, path)
+
+
+# ── 汇总 ──
+
+def load_runs(path=METRICS_FILE, since=None):
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue  # 中断写入的半行
+            if since is None or run.get("ts", "") >= since:
+                runs.append(run)
+    return runs
+
+
+def _pct(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))]
+
+
+def summarize(runs, prefix=""):
+    """按阶段汇总：次数、成功率、p50/p95 耗时、平均重试 / 字节 / 解析耗时、胜出来源分布、前后半段 p50 对比"""
+    import statistics  # 只有汇总命令用到，不拖慢各脚本启动
+
+    by_stage = {}
+    for run in runs:
+        for s in run.get("stages", []):
+            if s["stage"].startswith(prefix):
+                by_stage.setdefault(s["stage"], []).append(s)
+
+    rows = []
+    for name, items in sorted(by_stage.items()):
+        times = [s["ms"] for s in items if "ms" in s]
+        sorted_times = sorted(times)
+        half = len(times) // 2
+        winners = {}
+        for s in items:
+            if s.get("winner"):
+                winners[s["winner"]] = winners.get(s["winner"], 0) + 1
+        rows.append({
+            "stage": name,
+            "runs": len(items),
+            "ok_rate": sum(1 for s in items if s.get("ok")) / len(items),
+            "p50_ms": _pct(sorted_times, 50) if times else None,
+            "p95_ms": _pct(sorted_times, 95) if times else None,
+            "retries": statistics.fmean(s.get("retries", 0) for s in items),
+            "bytes": statistics.fmean(s.get("bytes", 0) for s in items),
+            "parse_ms": statistics.fmean(s.get("parse_ms", 0) for s in items),
+            "winners": winners,
+            # 趋势：较新一半运行的 p50 相对较早一半
+            "trend": (statistics.median(times[half:]) / statistics.median(times[:half])
+                      if half and statistics.median(times[:half]) else None),
+        })
+    return rows
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="汇总运行指标：各阶段 / 数据源的延迟与健康趋势")
+    parser.add_argument("--file", default=METRICS_FILE)
+    parser.add_argument("--days", type=int, default=30, help="只看最近 N 天的运行")
+    parser.add_argument("--stage", default="", help="只看名称以此开头的阶段，如 source.")
+    args = parser.parse_args(argv)
+
+    since = (datetime.datetime.now() - datetime.timedelta(days=args.days)).isoformat(timespec="seconds")
+    runs = load_runs(args.file, since)
+    if not runs:
+        print(f"最近 {args.days} 天没有运行记录: {args.file}")
+        return
+
+    print(f"最近 {args.days} 天 {len(runs)} 次运行（{runs[0]['ts']} ~ {runs[-1]['ts']}）")
+    print(f"{'阶段':<28} {'次数':>5} {'成功率':>7} {'p50(ms)':>9} {'p95(ms)':>9} {'重试':>5} {'KB':>8} {'解析ms':>7} {'趋势':>7}  胜出来源")
+    for row in summarize(runs, args.stage):
+        trend = f"{row['trend']:.2f}x" if row["trend"] else "-"
+        winners = ", ".join(f"{k}:{v}" for k, v in sorted(row["winners"].items(), key=lambda kv: -kv[1]))
+        print(
+            f"{row['stage']:<28} {row['runs']:>5} {row['ok_rate']:>6.0%} "
+            f"{row['p50_ms'] or 0:>9.1f} {row['p95_ms'] or 0:>9.1f} {row['retries']:>5.1f} "
+            f"{row['bytes'] / 1024:>8.1f} {row['parse_ms']:>7.1f} {trend:>7}  {winners}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+native_sources.py
+=================
+不依赖 akshare / pandas 的日线抓取，直接请求 akshare 背后的同一批上游接口，
+用标准库解析 JSON / JS 负载，结果存成紧凑数组（array）。
+
+  - SGE Au99.99 日线：POST https://www.sge.com.cn/graph/Dailyhq       （ak.spot_hist_sge）
+  - 新浪期货日线 JD0：GET  stock2.finance.sina.com.cn ... getDailyKLine  （ak.futures_zh_daily_sina）
+  - 东方财富 ETF 日 K：GET push2his.eastmoney.com/api/qt/stock/kline/get （ak.fund_etf_hist_em）
+
+盘中实时行情（intraday.py 轮询用）：
+  - SGE 现货分时：POST https://www.sge.com.cn/graph/quotations           （ak.spot_quotations_sge）
+  - 新浪实时行情：GET  hq.sinajs.cn/list=nf_JD0,sh518880                 （期货 / 沪深证券）
+
+请求走 http_client（共享 Session、重试、磁带录制 / 回放、指标）。
+上游格式变化时抛出 ValueError，由调用方回退到 akshare。
+"""
+
+import datetime
+import json
+import re
+from array import array
+
+import http_client
+
+SGE_DAILY_URL = "https://www.sge.com.cn/graph/Dailyhq"
+SINA_FUTURES_URL = (
+    "https://stock2.finance.sina.com.cn/futures/api/jsonp.php/"
+    "var%20_{symbol}{stamp}=/InnerFuturesNewService.getDailyKLine"
+)
+EASTMONEY_KLINE_URL = "https://push2his.eastmoney.com/api/qt/stock/kline/get"
+EASTMONEY_UT = "7eea3edcaed734bea9cbfc24409ed989"
+EASTMONEY_FIELDS = "f51,f52,f53,f54,f55,f56,f57"  # 日期,开,收,高,低,量,额
+SGE_QUOTE_URL = "https://www.sge.com.cn/graph/quotations"
+SINA_HQ_URL = "https://hq.sinajs.cn/list={symbols}"
+# 新浪行情代码前缀 → 逗号分隔字段中现价的下标（nf_ 商品期货，sh / sz 沪深证券）
+SINA_PRICE_FIELD = {"nf_": 8, "sh": 3, "sz": 3}
+
+_BARE_KEY_RE = re.compile(r'([{,]\s*)([A-Za-z_]\w*)\s*:')
+_SINA_HQ_RE = re.compile(r'hq_str_(\w+)="([^"]*)"')
+
+
+class DailySeries:
+    """按日期升序的日线：dates 为 YYYYMMDD 整数，close 为收盘价，均为 array，内存约 12 字节 / 行"""
+
+    __slots__ = ("symbol", "dates", "close")
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.dates = array("L")
+        self.close = array("d")
+
+    def append(self, date_text, close):
+        self.dates.append(int(date_text[:10].replace("-", "")))
+        self.close.append(float(close))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def sort(self):
+        """上游偶有乱序，按日期重排（已有序时不做任何事）"""
+        if any(a > b for a, b in zip(self.dates, self.dates[1:])):
+            pairs = sorted(zip(self.dates, self.close))
+            self.dates = array("L", (d for d, _ in pairs))
+            self.close = array("d", (c for _, c in pairs))
+        return self
+
+    def latest(self):
+        """返回 (YYYY-MM-DD, 收盘价)"""
+        if not self.dates:
+            raise ValueError(f"{self.symbol} 日线为空")
+        d = str(self.dates[-1])
+        return f"{d[:4]}-{d[4:6]}-{d[6:]}", self.close[-1]
+
+
+def _loads_js(text):
+    """解析 JSON，或键名未加引号的 JS 对象字面量"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return json.loads(_BARE_KEY_RE.sub(r'\1"\2":', text))
+
+
+def sge_daily(symbol="Au99.99", timeout=20):
+    """上海黄金交易所日线；负载 {"time": [[日期, 开, 收, 低, 高], ...]}"""
+    resp = http_client.post(SGE_DAILY_URL, data={"instid": symbol}, timeout=timeout)
+    resp.raise_for_status()
+    try:
+        rows = resp.json()["time"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"SGE Dailyhq 返回格式异常: {e}") from e
+    series = DailySeries(symbol)
+    for row in rows:
+        series.append(row[0], row[2])
+    return series.sort()
+
+
+def sina_futures_daily(symbol="JD0", today=None, timeout=20):
+    """新浪期货连续合约日线；负载为 JSONP：var _JD02026_10_17=([{d:"2026-10-16",o:..,c:..}, ...]);"""
+    # URL 与 type 参数里的日期只是防缓存戳；回放时由调用方传入录制当天
+    stamp = (today or datetime.date.today()).strftime("%Y_%m_%d")
+    url = SINA_FUTURES_URL.format(symbol=symbol, stamp=stamp)
+    resp = http_client.get(url, params={"symbol": symbol, "type": stamp}, timeout=timeout)
+    resp.raise_for_status()
+    text = resp.text
+    # 负载前可能带一段 /*<script>...</script>*/ 注释，从赋值处的 "=(" 开始截取
+    start, end = text.find("=("), text.rfind(")")
+    if start < 0 or end <= start:
+        raise ValueError(f"新浪期货日线返回格式异常: {text[:200]}")
+    rows = _loads_js(text[start + 2:end])
+    series = DailySeries(symbol)
+    for row in rows or ():
+        series.append(row["d"], row["c"])
+    return series.sort()
+
+
+def eastmoney_secid(code):
+    """6 位证券代码 → 东方财富 secid（沪市 1.，深市 0.）"""
+    return f"{1 if code[0] in '569' else 0}.{code}"
+
+
+def eastmoney_kline(code, start_date="19900101", end_date="20500101", timeout=20):
+    """东方财富日 K（不复权）；负载 {"data": {"klines": ["日期,开,收,高,低,量,额", ...]}}"""
+    params = {
+        "secid": eastmoney_secid(code),
+        "ut": EASTMONEY_UT,
+        "fields1": "f1,f2,f3,f4,f5,f6",
+        "fields2": EASTMONEY_FIELDS,
+        "klt": "101",
+        "fqt": "0",
+        "beg": start_date,
+        "end": end_date,
+    }
+    resp = http_client.get(EASTMONEY_KLINE_URL, params=params, timeout=timeout)
+    resp.raise_for_status()
+    try:
+        klines = (resp.json().get("data") or {}).get("klines") or []
+    except (ValueError, AttributeError) as e:
+        raise ValueError(f"东方财富日 K 返回格式异常: {e}") from e
+    series = DailySeries(code)
+    for line in klines:
+        fields = line.split(",")
+        series.append(fields[0], fields[2])
+    return series.sort()
+
+
+def _positive(value):
+    """行情里的数字字段；空串、0（无成交 / 停牌）返回 None"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def sge_quote(symbol="Au99.99", timeout=10):
+    """SGE 现货当日分时的最新价（元/克，交易所延时行情）；
+    负载 {"heyue": ..., "times": ["09:00", ...], "data": [价格, ...], "delaystr": ...}"""
+    resp = http_client.post(SGE_QUOTE_URL, data={"instid": symbol}, timeout=timeout)
+    resp.raise_for_status()
+    try:
+        prices = resp.json()["data"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"SGE 分时行情返回格式异常: {e}") from e
+    # 未开盘的时段为空值，取最后一个有效价
+    for value in reversed(prices or ()):
+        price = _positive(value)
+        if price is not None:
+            return price
+    return None
+
+
+def sina_quotes(symbols, timeout=10):
+    """新浪实时行情现价：{代码: 价格}，无成交 / 停牌 / 未返回的代码为 None；
+    负载为 GBK 编码的 var hq_str_nf_JD0="鸡蛋连续,150000,...";（每个代码一行）"""
+    resp = http_client.get(SINA_HQ_URL.format(symbols=",".join(symbols)), timeout=timeout)
+    resp.raise_for_status()
+    text = resp.content.decode("gbk", errors="replace")
+    matches = _SINA_HQ_RE.findall(text)
+    if not matches:
+        raise ValueError(f"新浪行情返回格式异常: {text[:200]}")
+    quotes = dict.fromkeys(symbols)
+    for symbol, payload in matches:
+        index = next((i for prefix, i in SINA_PRICE_FIELD.items() if symbol.startswith(prefix)), None)
+        fields = payload.split(",")
+        if symbol in quotes and index is not None and index < len(fields):
+            quotes[symbol] = _positive(fields[index])
+    return quotes
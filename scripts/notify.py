@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+notify.py
+=========
+通知分发：各通道的消息体由同一份历史构建，所有已配置的通道并发发送。
+
+  通道            消息体                               截止(s)  尝试次数
+  feishu_webhook  飞书 post（send_feishu）               20        3
+  feishu_app      同上，与 webhook 共用一份              30        3
+  email           邮件（send_email.build_message）        60        2
+
+  - 每个通道有独立的截止时间与尝试次数预算：单次请求超时截到剩余时间以内，退避重试不越过截止时间；
+    到截止时间仍未返回的通道记为 timeout，不拖住其他通道
+  - 未配置的通道记为 skipped；每个通道汇总一条结果（状态、目标成功数、尝试次数、耗时、错误），
+    并作为 metrics 阶段 notify.<通道> 记录
+
+用法：
+  python scripts/notify.py                      # 全部通道，读取已存储的历史
+  python scripts/notify.py --channels feishu    # 分组名 feishu = feishu_webhook + feishu_app
+"""
+
+import functools
+import sys
+import time
+
+import history_store
+import metrics
+import send_email
+import send_feishu
+
+DEADLINE_GRACE = 2.0                # 通道自身按截止时间收尾的宽限，超过后才判为 timeout
+
+
+def _prepare_feishu(kind):
+    config = send_feishu.load_config()
+    targets = send_feishu.build_targets(config, kinds=(kind,))
+    return {"config": config, "targets": targets} if targets else None
+
+
+def _prepare_email():
+    config = send_email.load_config()
+    recipients = send_email.resolve_recipients(config)
+    return {"config": config, "recipients": recipients} if recipients else None
+
+
+def _build_feishu(history, prepared):
+    return send_feishu.build_feishu_message(history[:send_feishu.HISTORY_DAYS])
+
+
+def _build_email(history, prepared):
+    return send_email.build_message(history, prepared["config"], prepared["recipients"])
+
+
+def _send_feishu(prepared, payload, attempts, deadline):
+    results = send_feishu.send_all(payload, prepared["config"], prepared["targets"], attempts, deadline)
+    return [(target["label"], n, error) for target, n, error in results]
+
+
+def _send_email(prepared, payload, attempts, deadline):
+    n, error = send_email.deliver(payload, prepared["config"], prepared["recipients"], attempts, deadline)
+    return [(f"email({len(prepared['recipients'])} 个收件人)", n, error)]
+
+
+# 通道名 → (读取配置（未配置返回 None）, 消息体名, 发送函数)
+CHANNELS = {
+    "feishu_webhook": (functools.partial(_prepare_feishu, "webhook"), "feishu", _send_feishu),
+    "feishu_app": (functools.partial(_prepare_feishu, "app"), "feishu", _send_feishu),
+    "email": (_prepare_email, "email", _send_email),
+}
+# 消息体名 → (构建函数, metrics 阶段名)；同名消息体只构建一次，供多个通道共用
+PAYLOADS = {
+    "feishu": (_build_feishu, "render.feishu_message"),
+    "email": (_build_email, "render.email"),
+}
+# 通道名 → (截止秒数, 尝试次数)
+BUDGETS = {
+    "feishu_webhook": (20, 3),
+    "feishu_app": (30, 3),
+    "email": (60, 2),
+}
+GROUPS = {
+    "feishu": ("feishu_webhook", "feishu_app"),
+    "email": ("email",),
+    "all": tuple(CHANNELS),
+}
+
+
+def resolve_channels(value):
+    """逗号分隔的通道名 / 分组名 → 通道名列表（保持 CHANNELS 中的顺序）"""
+    names = set()
+    for item in (v.strip() for v in value.split(",")):
+        if not item:
+            continue
+        if item in GROUPS:
+            names.update(GROUPS[item])
+        elif item in CHANNELS:
+            names.add(item)
+        else:
+            raise ValueError(f"未知通知通道: {item}（可选 {', '.join(dict.fromkeys([*GROUPS, *CHANNELS]))}）")
+    return [name for name in CHANNELS if name in names]
+
+
+def _run_channel(name, prepared, payload, attempts, deadline):
+    send = CHANNELS[name][2]
+    started = time.monotonic()
+    with metrics.stage(f"notify.{name}") as rec:
+        results = send(prepared, payload, attempts, deadline)
+        failed = [(label, error) for label, _, error in results if error is not None]
+        rec.update(targets=len(results), failed=len(failed))
+        if failed:
+            rec["ok"] = False
+    return {
+        "status": "failed" if failed else "ok",
+        "targets": len(results),
+        "failed": len(failed),
+        "attempts": sum(n for _, n, _ in results),
+        "ms": round((time.monotonic() - started) * 1000, 1),
+        "error": "; ".join(f"{label}: {error}" for label, error in failed[:3]) or None,
+    }
+
+
+def dispatch(history, channels=None, budgets=None):
+    """向 channels（默认全部）并发发送，返回 {通道名: 汇总}。
+    汇总的 status 为 ok / failed / timeout / skipped；budgets 可按通道覆盖 (截止秒数, 尝试次数)。"""
+    from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+    budgets = {**BUDGETS, **(budgets or {})}
+    summary = {}
+    prepared = {}
+    for name in channels or CHANNELS:
+        prepared[name] = CHANNELS[name][0]()
+        if prepared[name] is None:
+            summary[name] = {"status": "skipped"}
+            del prepared[name]
+
+    # 每种消息体只构建一次；构建失败时用到它的通道记为失败
+    payloads = {}
+    for name, p in prepared.items():
+        key = CHANNELS[name][1]
+        if key in payloads:
+            continue
+        build, stage = PAYLOADS[key]
+        try:
+            with metrics.stage(stage):
+                payloads[key] = build(history, p)
+        except Exception as e:
+            payloads[key] = e
+
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, len(prepared)), thread_name_prefix="notify")
+    try:
+        futures = {}
+        for name, p in prepared.items():
+            payload = payloads[CHANNELS[name][1]]
+            if isinstance(payload, Exception):
+                summary[name] = {"status": "failed", "error": f"构建消息失败: {payload}"}
+                continue
+            seconds, attempts = budgets[name]
+            futures[name] = pool.submit(_run_channel, name, p, payload, attempts, started + seconds)
+        # 所有通道同时起跑，按各自的截止时刻等待
+        for name in sorted(futures, key=lambda n: budgets[n][0]):
+            seconds = budgets[name][0]
+            remaining = max(0.0, started + seconds + DEADLINE_GRACE - time.monotonic())
+            try:
+                summary[name] = futures[name].result(timeout=remaining)
+            except FuturesTimeout:
+                summary[name] = {"status": "timeout", "ms": seconds * 1000, "error": f"{seconds} 秒内未完成"}
+                metrics.record(f"notify.{name}", False, error="timeout", ms=seconds * 1000)
+            except Exception as e:
+                summary[name] = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    finally:
+        # 不等待超时的通道，它们会在各自的请求超时后自行结束
+        pool.shutdown(wait=False, cancel_futures=True)
+    return {name: summary[name] for name in (channels or CHANNELS)}
+
+
+def print_summary(summary):
+    for name, s in summary.items():
+        if s["status"] == "skipped":
+            detail = "未配置，跳过"
+        elif "targets" in s:
+            detail = (f"{s['status']}，目标 {s['targets'] - s['failed']}/{s['targets']} 成功，"
+                      f"尝试 {s['attempts']} 次，{s['ms']:.0f}ms")
+        else:
+            detail = s["status"]
+        if s.get("error"):
+            detail += f"，{s['error']}"
+        level = "[信息]" if s["status"] in ("ok", "skipped") else "[错误]"
+        print(f"{level} 通知 {name:<14} {detail}", file=sys.stderr)
+
+
+def add_channel_args(parser):
+    """--channels 参数（run_pipeline.py 共用）"""
+    import argparse
+
+    def channel_list(value):
+        try:
+            return resolve_channels(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    parser.add_argument("--channels", type=channel_list, default=list(CHANNELS),
+                        help=f"逗号分隔的通知通道或分组（{', '.join(dict.fromkeys([*GROUPS, *CHANNELS]))}），默认全部")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="并发发送全部已配置的通知通道")
+    add_channel_args(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        with metrics.stage("history.load"):
+            history = history_store.read_latest(max(send_feishu.HISTORY_DAYS, send_email.REPORT_DAYS))
+        summary = dispatch(history, args.channels)
+        print_summary(summary)
+    finally:
+        metrics.flush("notify")
+    if any(s["status"] in ("failed", "timeout") for s in summary.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
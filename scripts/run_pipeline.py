@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+run_pipeline.py
+===============
+在一个进程里跑完每日任务：抓取 → 存储 → 渲染 → 通知。
+
+各阶段组成依赖图（STAGES），依赖全部完成后立即开跑：
+  fetch   抓取全部数据源并写入历史（gold_egg_price.collect_and_save）
+  load    取最近历史：fetch 已返回时直接复用，否则（fetch 被禁用或失败）从存储读一次
+  render  生成 index.html           ┐ 互不依赖，并发执行，共用 load 的同一份历史
+  notify  发送通知（notify.dispatch）┘ 飞书 Webhook / 飞书 App API / 邮件各自并发，独立截止时间
+
+被禁用的阶段视为已完成；某阶段失败时，依赖它的阶段跳过（RUN_AFTER_FAILURE 中的阶段除外：
+load 在 fetch 失败时照常执行并回退到已存储的历史，抓取故障不会连带页面和通知）。任一阶段失败时退出码为 1。
+
+用法：
+  python scripts/run_pipeline.py                        # 全部阶段
+  python scripts/run_pipeline.py --channels feishu      # 只发飞书
+  python scripts/run_pipeline.py --only render,notify   # 只用已存储的历史渲染并发通知
+  python scripts/run_pipeline.py --replay cassettes/2026-10-17 --data-dir /tmp/gold-rice --skip notify
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import generate_html
+import gold_egg_price
+import history_store
+import metrics
+import notify
+
+
+def _fetch(ctx):
+    ctx["history"] = gold_egg_price.collect_and_save()
+
+
+def _load(ctx):
+    if "history" not in ctx:
+        if "fetch" in ctx["failed"]:
+            print("[警告] 抓取未完成，使用已存储的历史", file=sys.stderr)
+        ctx["history"] = history_store.read_latest(history_store.VIEW_LIMIT)
+    print(f"[信息] 共享历史 {len(ctx['history'])} 条", file=sys.stderr)
+
+
+def _render(ctx):
+    generate_html.write_page(ctx["history"])
+
+
+def _notify(ctx):
+    summary = notify.dispatch(ctx["history"], ctx.get("channels"))
+    notify.print_summary(summary)
+    bad = [name for name, s in summary.items() if s["status"] in ("failed", "timeout")]
+    if bad:
+        raise RuntimeError(f"通知通道未成功: {', '.join(bad)}")
+    return any(s["status"] == "ok" for s in summary.values())
+
+
+# 阶段名 → (依赖阶段, 函数)；函数返回 False 表示未配置而跳过
+STAGES = {
+    "fetch": ((), _fetch),
+    "load": (("fetch",), _load),
+    "render": (("load",), _render),
+    "notify": (("load",), _notify),
+}
+REQUIRED = ("load",)                # 不能禁用的阶段
+RUN_AFTER_FAILURE = ("load",)       # 依赖失败 / 跳过时仍执行的阶段（自行回退，依赖只决定先后）
+
+
+def _run_stage(name, fn, ctx):
+    """执行一个阶段，返回是否真正执行（False 表示未配置而跳过）"""
+    with metrics.stage(f"pipeline.{name}") as rec:
+        if fn(ctx) is False:
+            rec["skipped"] = True
+            return False
+        return True
+
+
+def run_pipeline(enabled, stages=STAGES, channels=None):
+    """按依赖图执行 enabled 中的阶段，返回 {阶段名: "ok" / "failed" / "skipped" / "disabled"}；
+    channels 为 notify 阶段启用的通知通道（默认全部）"""
+    ctx = {"channels": channels, "failed": set()}
+    status = {name: "disabled" for name in stages if name not in enabled}
+    pending = {name for name in stages if name in enabled}
+    running = {}
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage") as pool:
+        while pending or running:
+            for name in sorted(pending):
+                deps = stages[name][0]
+                if name in RUN_AFTER_FAILURE:
+                    if all(d in status for d in deps):
+                        running[pool.submit(_run_stage, name, stages[name][1], ctx)] = name
+                        pending.discard(name)
+                elif any(status.get(d) in ("failed", "skipped") for d in deps):
+                    status[name] = "skipped"
+                    print(f"[警告] 阶段 {name} 的依赖未完成，跳过", file=sys.stderr)
+                    pending.discard(name)
+                elif all(status.get(d) in ("ok", "disabled") for d in deps):
+                    running[pool.submit(_run_stage, name, stages[name][1], ctx)] = name
+                    pending.discard(name)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status[name] = "ok" if future.result() else "skipped"
+                except Exception as e:
+                    status[name] = "failed"
+                    ctx["failed"].add(name)
+                    print(f"[错误] 阶段 {name} 失败: {e}", file=sys.stderr)
+    print(f"[信息] 流水线完成，耗时 {time.monotonic() - started:.2f}s: "
+          + ", ".join(f"{k}={v}" for k, v in status.items()), file=sys.stderr)
+    return status
+
+
+def _stage_list(value):
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    unknown = [n for n in names if n not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知阶段: {', '.join(unknown)}（可选 {', '.join(STAGES)}）")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在一个进程里执行 抓取 → 存储 → 渲染 → 通知")
+    select = parser.add_mutually_exclusive_group()
+    select.add_argument("--only", type=_stage_list, help=f"只执行这些阶段（逗号分隔：{', '.join(STAGES)}）")
+    select.add_argument("--skip", type=_stage_list, default=[], help="跳过这些阶段（逗号分隔）")
+    gold_egg_price.add_source_args(parser)
+    notify.add_channel_args(parser)
+    args = parser.parse_args(argv)
+    gold_egg_price.configure(args)
+
+    enabled = set(args.only) if args.only else set(STAGES) - set(args.skip)
+    enabled.update(REQUIRED)
+    try:
+        status = run_pipeline(enabled, channels=args.channels)
+    finally:
+        metrics.flush("run_pipeline")
+    if "failed" in status.values():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
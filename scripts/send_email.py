@@ -1,27 +1,53 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, smtplib, ssl, subprocess, sys, re
-from email.mime.text import MIMEText
-from email.header import Header
+"""
+send_email.py
+=============
+通过 Gmail SMTP 发送黄金鸡蛋价格比例报告。
+正文直接由历史存储中的最新记录生成（与 gold_egg_price.py 命令行输出同一格式），
+不再重复抓取数据源。
+"""
+
+import os, sys, re, time
+
+import cassette
+import gold_egg_price
+import history_store
+import metrics
+
+# smtplib / ssl / email.mime 只在真正发送时导入
 
-SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))  # 587(TLS) / 465(SSL)
-USERNAME  = os.getenv("GMAIL_USERNAME")         # demo@gmail.com
-APP_PASS  = os.getenv("GMAIL_APP_PASSWORD")     # 16 位 App Password
-EMAIL_TO  = os.getenv("EMAIL_TO")               # 收件人（可逗号分隔多个地址）
+def load_config():
+    """调用时才读取环境变量，导入本模块没有副作用"""
+    return {
+        "smtp_host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        "smtp_port": int(os.getenv("SMTP_PORT", "587")),  # 587(TLS) / 465(SSL)
+        "username": os.getenv("GMAIL_USERNAME"),          # demo@gmail.com
+        "app_pass": os.getenv("GMAIL_APP_PASSWORD"),      # 16 位 App Password
+        "email_to": os.getenv("EMAIL_TO"),                # 收件人（可逗号分隔多个地址）
+    }
 
 # 黄金价格预警阈值
 GOLD_PRICE_ALERT_THRESHOLD = 960.0
-
-def extract_gold_price(output_text):
-    """从输出中提取黄金价格"""
-    match = re.search(r"黄金价格:\s*([\d]+\.?\d*)\s*元／克", output_text)
-    if match:
-        try:
-            return float(match.group(1))
-        except ValueError:
-            return None
-    return None
+REPORT_DAYS = 30                    # 正文统计表用到的历史条数
+SMTP_TIMEOUT = 30                   # 单次 SMTP 连接 / 读写超时（秒）
+SEND_ATTEMPTS = 2                   # 最多发送次数（含首次），只重试交出邮件前的连接类 / 4xx 临时错误
+SMTP_RETRY_DELAY = 2.0              # 第 n 次重试前等待 n * SMTP_RETRY_DELAY 秒
+
+def load_history():
+    """只读取报告所需的最新 REPORT_DAYS 条记录（最新在前）"""
+    return history_store.read_latest(REPORT_DAYS)
+
+def build_email_body(history):
+    """由历史记录生成邮件正文，返回 (正文, 最新黄金价格)"""
+    if not history:
+        return "暂无历史数据，请检查数据抓取任务是否正常运行。", None
+    body = gold_egg_price.build_report(history)
+    latest_date = history[0]["date"]
+    today = cassette.today().isoformat()
+    if latest_date != today:
+        body = f"注意：今天（{today}）尚无新数据，以下为 {latest_date} 的最新记录。\n\n" + body
+    return body, history[0].get("gold_price")
 
 def parse_recipients(raw):
     """将逗号或分号分隔的地址解析为列表"""
@@ -31,47 +57,36 @@ def parse_recipients(raw):
     return [p.strip() for p in parts if p and p.strip()]
 
 def main():
+    try:
+        send_report()
+    finally:
+        metrics.flush("send_email")
+
+def resolve_recipients(config):
+    """检查必需配置并解析收件人；未配置时打印原因并返回 None"""
     missing = [k for k,v in {
-        "GMAIL_USERNAME": USERNAME,
-        "GMAIL_APP_PASSWORD": APP_PASS,
-        "EMAIL_TO": EMAIL_TO
+        "GMAIL_USERNAME": config["username"],
+        "GMAIL_APP_PASSWORD": config["app_pass"],
+        "EMAIL_TO": config["email_to"]
     }.items() if not v]
     if missing:
         print(f"[send_email] 缺少必需的环境变量：{', '.join(missing)}，跳过发送。")
-        return
+        return None
 
-    recipients = parse_recipients(EMAIL_TO)
+    recipients = parse_recipients(config["email_to"])
     if not recipients:
         print("[send_email] 未解析出有效的收件人地址，跳过发送。")
-        return
+        return None
+    return recipients
 
-    # 执行 gold_egg_price.py 并获取输出
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    gold_egg_script = os.path.join(script_dir, "gold_egg_price.py")
+def build_message(history, config, recipients):
+    """由历史记录（最新在前）生成完整邮件（主题、高价预警、正文）"""
+    from email.header import Header
+    from email.mime.text import MIMEText
 
-    try:
-        result = subprocess.run(
-            [sys.executable, gold_egg_script],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-
-        if result.returncode == 0:
-            body = result.stdout
-            if result.stderr:
-                body += "\n\n--- 警告信息 ---\n" + result.stderr
-        else:
-            body = f"执行 gold_egg_price.py 时出错（返回码: {result.returncode}）\n\n"
-            body += "--- 标准输出 ---\n" + result.stdout
-            body += "\n--- 错误输出 ---\n" + result.stderr
-    except subprocess.TimeoutExpired:
-        body = "执行 gold_egg_price.py 超时（60秒）"
-    except Exception as e:
-        body = f"执行 gold_egg_price.py 时发生异常: {str(e)}"
+    body, gold_price = build_email_body(history[:REPORT_DAYS])
 
     # 检查黄金价格是否超过阈值
-    gold_price = extract_gold_price(body)
     is_high_price = gold_price is not None and gold_price > GOLD_PRICE_ALERT_THRESHOLD
 
     # 根据价格设置邮件主题
@@ -98,22 +113,111 @@ def main():
 
     msg = MIMEText(body, "plain", "utf-8")
     msg["Subject"] = Header(subject, "utf-8")
-    msg["From"] = USERNAME
+    msg["From"] = config["username"]
     msg["To"] = ", ".join(recipients)
+    return msg
+
+def _open_session(config, timeout):
+    """连接 SMTP 服务器并完成 EHLO / STARTTLS / 登录，返回已登录的连接；失败时关闭连接再抛出"""
+    import smtplib
+    import ssl
 
-    if SMTP_PORT == 465:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context) as server:
-            server.login(USERNAME, APP_PASS)
-            server.sendmail(USERNAME, recipients, msg.as_string())
+    smtp_host, smtp_port = config["smtp_host"], config["smtp_port"]
+    if smtp_port == 465:
+        server = smtplib.SMTP_SSL(smtp_host, smtp_port, context=ssl.create_default_context(), timeout=timeout)
     else:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+        server = smtplib.SMTP(smtp_host, smtp_port, timeout=timeout)
+    try:
+        if smtp_port != 465:
             server.ehlo()
             server.starttls(context=ssl.create_default_context())
-            server.login(USERNAME, APP_PASS)
-            server.sendmail(USERNAME, recipients, msg.as_string())
+        server.login(config["username"], config["app_pass"])
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+def send_message(msg, config, recipients, timeout=SMTP_TIMEOUT):
+    """建立一次 SMTP 连接并发送。
+    连接、握手、登录阶段的错误原样抛出（邮件尚未交出，可以重试）；
+    sendmail 开始后（DATA 可能已发出）的错误包装成 RuntimeError，结果未知，重试可能重复发送"""
+    server = _open_session(config, timeout)
+    try:
+        server.sendmail(config["username"], recipients, msg.as_string())
+    except Exception as e:
+        raise RuntimeError(f"发送结果未知（可能已送达），不重试: {type(e).__name__}: {e}") from e
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            server.close()          # 邮件已交出，QUIT 失败不影响结果
+
+def _retryable(error):
+    """邮件交出之前的失败：连接失败、断线、超时与 4xx 临时错误可重试；认证失败等不重试。
+    sendmail 开始后的错误已由 send_message 包装成 RuntimeError，不会重试"""
+    import smtplib
+
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+def deliver(msg, config, recipients, attempts=SEND_ATTEMPTS, deadline=None):
+    """发送邮件，失败按退避重试（最多 attempts 次；deadline 为 time.monotonic 截止时刻，
+    单次超时截到剩余时间以内，退避不越过它）。返回 (尝试次数, 最后一次的错误或 None)"""
+    with metrics.stage("send.smtp") as rec:
+        rec["bytes"] = len(msg.as_bytes())
+        rec["attempts"] = 0
+        error = None
+        for attempt in range(1, attempts + 1):
+            timeout = SMTP_TIMEOUT if deadline is None else min(SMTP_TIMEOUT, deadline - time.monotonic())
+            if timeout <= 0:
+                error = TimeoutError("截止时间前未能发送")
+                break
+            rec["attempts"] = attempt
+            try:
+                send_message(msg, config, recipients, timeout=timeout)
+                return attempt, None
+            except Exception as e:
+                error = e
+            delay = SMTP_RETRY_DELAY * attempt
+            if (attempt == attempts or not _retryable(error)
+                    or (deadline is not None and time.monotonic() + delay >= deadline)):
+                break
+            print(f"[警告] 邮件第 {attempt} 次发送失败（{error}），{delay:.1f}s 后重试", file=sys.stderr)
+            time.sleep(delay)
+        rec["ok"] = False
+        rec["error"] = f"{type(error).__name__}: {error}"[:metrics.ERROR_CHARS]
+        return rec["attempts"], error
+
+def send_report(history=None):
+    """生成并发送报告邮件；未配置时返回 False，最终发送失败抛出异常。
+    history 为已加载的历史（最新在前）时直接复用，不再读取存储。"""
+    config = load_config()
+    recipients = resolve_recipients(config)
+    if recipients is None:
+        return False
+
+    # 直接从历史存储生成正文
+    if history is None:
+        try:
+            with metrics.stage("history.load") as rec:
+                history = load_history()
+                rec["records"] = len(history)
+        except Exception as e:
+            print(f"[send_email] 读取历史数据失败: {e}", file=sys.stderr)
+            history = []
+
+    with metrics.stage("render.email"):
+        msg = build_message(history, config, recipients)
+
+    _, error = deliver(msg, config, recipients)
+    if error is not None:
+        raise error
 
     print("[send_email] 发送成功。")
+    return True
 
 if __name__ == "__main__":
     main()
@@ -4,11 +4,17 @@
 send_feishu.py
 ==============
 通过飞书发送黄金鸡蛋价格比例报告。
-直接读取 price_history.json 构建结构化消息，排版适配飞书客户端。
+直接从历史存储读取最近几十条记录构建结构化消息，排版适配飞书客户端。
 
-支持两种模式（优先使用 Webhook）：
-  1. Webhook 模式：只需 FEISHU_WEBHOOK_URL
-  2. App API 模式：需要 FEISHU_APP_ID + FEISHU_APP_SECRET + FEISHU_RECEIVE_ID
+支持两种方式，可同时配置，消息发送到全部目标：
+  1. Webhook：FEISHU_WEBHOOK_URL，多个机器人用逗号分隔；
+     FEISHU_WEBHOOK_SECRET 与之一一对应（只配一个时所有机器人共用）
+  2. App API：FEISHU_APP_ID + FEISHU_APP_SECRET + FEISHU_RECEIVE_ID，
+     多个接收者用逗号分隔，单个接收者可写成 open_id:ou_xxx 覆盖 FEISHU_RECEIVE_ID_TYPE
+
+各目标经同一连接池并发发送，每个目标独立重试（连接未建立、限流错误码退避后重试）并按机器人 / 应用限速；
+读超时、连接中途断开等请求可能已送达的错误不重试，避免重复消息。
+tenant_access_token 按 app_id 缓存在 .cache/feishu/，到期前 TOKEN_REFRESH_MARGIN 秒才重新获取。
 """
 
 import os
@@ -18,15 +24,13 @@ import time
 import hmac
 import hashlib
 import base64
-import requests
+import threading
 
-FEISHU_WEBHOOK_URL = os.getenv("FEISHU_WEBHOOK_URL")
-FEISHU_WEBHOOK_SECRET = os.getenv("FEISHU_WEBHOOK_SECRET")
+import history_store
+import metrics
+import stats
 
-FEISHU_APP_ID = os.getenv("FEISHU_APP_ID")
-FEISHU_APP_SECRET = os.getenv("FEISHU_APP_SECRET")
-FEISHU_RECEIVE_ID = os.getenv("FEISHU_RECEIVE_ID")
-FEISHU_RECEIVE_ID_TYPE = os.getenv("FEISHU_RECEIVE_ID_TYPE", "chat_id")
+# http_client（requests）只在真正发送时导入，构建消息的路径保持轻量
 
 GOLD_PRICE_ALERT_THRESHOLD = 960.0
 RATIO_LOW = 80.0
@@ -37,15 +41,58 @@ MA_PERIOD = 20
 TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
 SEND_MSG_URL = "https://open.feishu.cn/open-apis/im/v1/messages"
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
-HISTORY_FILE = os.path.join(DATA_DIR, "price_history.json")
+HISTORY_DAYS = max(MA_PERIOD, TREND_DAYS)   # 消息最多用到的历史条数
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_CACHE_DIR = os.path.join(PROJECT_DIR, ".cache", "feishu")
+TOKEN_REFRESH_MARGIN = 300          # token 剩余有效期不足该秒数时提前刷新
+
+SEND_TIMEOUT = 15
+SEND_ATTEMPTS = 3                   # 每个目标最多发送次数（含首次）
+MAX_PARALLEL_SENDS = 10             # 并发发送线程数，与 http_client.POOL_SIZE 一致，连接全部复用
+WEBHOOK_MIN_INTERVAL = 0.2          # 同一机器人相邻两次请求的最小间隔（飞书限制 5 次/秒）
+APP_API_MIN_INTERVAL = 0.02         # 同一应用相邻两次请求的最小间隔（50 次/秒）
+RATE_LIMIT_CODES = (9499, 99991400)                   # 限流：退避后重试
+TOKEN_INVALID_CODES = (99991661, 99991663, 99991668)  # token 失效：刷新后重试
+RECEIVE_ID_TYPES = ("chat_id", "open_id", "user_id", "union_id", "email")
+
+
+def _split_list(value):
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def load_config():
+    """调用时才读取环境变量，导入本模块没有副作用"""
+    return {
+        "webhook_urls": _split_list(os.getenv("FEISHU_WEBHOOK_URL")),
+        "webhook_secrets": _split_list(os.getenv("FEISHU_WEBHOOK_SECRET")),
+        "app_id": os.getenv("FEISHU_APP_ID"),
+        "app_secret": os.getenv("FEISHU_APP_SECRET"),
+        "receive_ids": _split_list(os.getenv("FEISHU_RECEIVE_ID")),
+        "receive_id_type": os.getenv("FEISHU_RECEIVE_ID_TYPE", "chat_id"),
+    }
+
+
+def build_targets(config, kinds=("webhook", "app")):
+    """展开为发送目标：每个 webhook、每个接收者各一个。label 不含 URL / ID，可直接打日志"""
+    targets = []
+    secrets = config["webhook_secrets"] if "webhook" in kinds else []
+    for i, url in enumerate(config["webhook_urls"] if "webhook" in kinds else ()):
+        secret = secrets[i] if i < len(secrets) else (secrets[0] if len(secrets) == 1 else None)
+        targets.append({"kind": "webhook", "label": f"webhook#{i + 1}", "url": url, "secret": secret})
+    if "app" in kinds and config["app_id"] and config["app_secret"]:
+        for i, entry in enumerate(config["receive_ids"]):
+            id_type, sep, receive_id = entry.partition(":")
+            if not sep or id_type not in RECEIVE_ID_TYPES:
+                id_type, receive_id = config["receive_id_type"], entry
+            targets.append({"kind": "app", "label": f"app#{i + 1}({id_type})",
+                            "receive_id": receive_id, "receive_id_type": id_type})
+    return targets
 
 
 def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """只读取最新 HISTORY_DAYS 条记录（最新在前），不随历史总长度变慢"""
+    return history_store.read_latest(HISTORY_DAYS)
 
 
 def fmt_price(val, suffix=""):
@@ -81,23 +128,14 @@ def delta_str(cur, prev):
 
 def calc_ma(history, field, period):
     """从历史数据中取最近 period 个有效值计算移动平均线"""
-    values = []
-    for rec in history:
-        v = rec.get(field)
-        if v is not None:
-            values.append(v)
-        if len(values) == period:
-            break
-    if not values:
-        return None, 0
-    return sum(values) / len(values), len(values)
+    return stats.recent_mean(stats.iter_series(history, field), period)
 
 
 def ma_signal(price, ma_val):
     """根据当前价格与 MA 的偏离度给出做 T 信号"""
-    if price is None or ma_val is None:
+    pct = stats.pct_deviation(price, ma_val)
+    if pct is None:
         return "", ""
-    pct = (price - ma_val) / ma_val * 100
     if pct > 1.5:
         return f"📈 高于 MA{MA_PERIOD}　{pct:+.2f}%", "💡 偏高，可考虑适当卖出"
     if pct < -1.5:
@@ -220,6 +258,25 @@ def _simple_post(title, text):
     }
 
 
+# ── 限速 ──
+
+class _Throttle:
+    """相邻两次放行至少间隔 interval 秒（线程安全）；各线程预约时间片后在锁外等待"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 # ── Webhook 发送 ──
 
 def gen_webhook_sign(secret):
@@ -232,87 +289,273 @@ def gen_webhook_sign(secret):
     return timestamp, sign
 
 
-def send_via_webhook(post_content):
+def send_via_webhook(post_content, url, secret=None, timeout=SEND_TIMEOUT):
+    """发送一次，返回飞书响应 JSON（不判断错误码）"""
+    import http_client
+
     payload = {
         "msg_type": "post",
         "content": {"post": post_content},
     }
-    if FEISHU_WEBHOOK_SECRET:
-        timestamp, sign = gen_webhook_sign(FEISHU_WEBHOOK_SECRET)
+    if secret:
+        # 签名带时间戳，每次尝试重新生成
+        timestamp, sign = gen_webhook_sign(secret)
         payload["timestamp"] = timestamp
         payload["sign"] = sign
 
-    resp = requests.post(FEISHU_WEBHOOK_URL, json=payload, timeout=15)
-    data = resp.json()
-    if data.get("code") != 0 and data.get("StatusCode") != 0:
-        raise RuntimeError(f"Webhook 发送失败: {data}")
-    return data
+    resp = http_client.post(url, json=payload, timeout=timeout)
+    return resp.json()
 
 
 # ── App API 发送 ──
 
-def get_tenant_access_token():
-    resp = requests.post(TOKEN_URL, json={
-        "app_id": FEISHU_APP_ID,
-        "app_secret": FEISHU_APP_SECRET,
-    }, timeout=15)
-    data = resp.json()
-    if data.get("code") != 0:
-        raise RuntimeError(f"获取飞书 token 失败: {data.get('msg', resp.text)}")
-    return data["tenant_access_token"]
+_token_lock = threading.Lock()
 
 
-def send_via_app_api(token, post_content):
+def _token_path(app_id):
+    return os.path.join(TOKEN_CACHE_DIR, "token-" + hashlib.sha1(app_id.encode("utf-8")).hexdigest() + ".json")
+
+
+def _load_cached_token(app_id):
+    """返回仍在有效期内（留出 TOKEN_REFRESH_MARGIN）的缓存 token，没有返回 None"""
+    try:
+        with open(_token_path(app_id), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("app_id") != app_id or time.time() >= entry.get("expires_at", 0) - TOKEN_REFRESH_MARGIN:
+        return None
+    return entry.get("tenant_access_token")
+
+
+def _save_token(app_id, token, expire):
+    """原子写入，文件权限 0600；写失败只告警，下次运行重新获取"""
+    path = _token_path(app_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    entry = {"app_id": app_id, "tenant_access_token": token, "expires_at": int(time.time()) + int(expire)}
+    try:
+        os.makedirs(TOKEN_CACHE_DIR, exist_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[警告] 写入飞书 token 缓存失败: {e}", file=sys.stderr)
+
+
+def get_tenant_access_token(config, stale=None, timeout=SEND_TIMEOUT):
+    """优先用磁盘缓存；stale 为刚被服务端拒绝的 token 时强制刷新
+    （并发线程里别的线程已刷新过，则直接返回新的）。磁带录制 / 回放时不读写缓存。"""
+    import cassette
+    import http_client
+
+    app_id = config["app_id"]
+    use_cache = not cassette.active()
+    with _token_lock:
+        cached = _load_cached_token(app_id) if use_cache else None
+        if cached and cached != stale:
+            metrics.count("token_cache_hits")
+            return cached
+
+        resp = http_client.post(TOKEN_URL, json={
+            "app_id": app_id,
+            "app_secret": config["app_secret"],
+        }, timeout=timeout)
+        data = resp.json()
+        if data.get("code") != 0:
+            raise RuntimeError(f"获取飞书 token 失败: {data.get('msg', resp.text)}")
+        token = data["tenant_access_token"]
+        if use_cache:
+            _save_token(app_id, token, data.get("expire", 0))
+        return token
+
+
+def send_via_app_api(token, post_content, receive_id, receive_id_type="chat_id", timeout=SEND_TIMEOUT):
+    """发送一次，返回飞书响应 JSON（不判断错误码）"""
+    import http_client
+
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json; charset=utf-8",
     }
     payload = {
-        "receive_id": FEISHU_RECEIVE_ID,
+        "receive_id": receive_id,
         "msg_type": "post",
         "content": json.dumps(post_content),
     }
-    resp = requests.post(
-        f"{SEND_MSG_URL}?receive_id_type={FEISHU_RECEIVE_ID_TYPE}",
-        headers=headers, json=payload, timeout=15,
+    resp = http_client.post(
+        f"{SEND_MSG_URL}?receive_id_type={receive_id_type}",
+        headers=headers, json=payload, timeout=timeout,
     )
-    data = resp.json()
-    if data.get("code") != 0:
-        raise RuntimeError(f"App API 发送失败: {data.get('msg', resp.text)}")
-    return data
+    return resp.json()
+
+
+# ── 并发投递 ──
+
+def _remaining(deadline):
+    """距截止时刻（time.monotonic）的秒数；单次请求超时不超过它，也不超过 SEND_TIMEOUT"""
+    if deadline is None:
+        return SEND_TIMEOUT
+    return min(SEND_TIMEOUT, deadline - time.monotonic())
+
+
+def _never_sent(exc):
+    """请求确定没有发出：连接超时，或建立连接阶段就失败（urllib3 NewConnectionError，含 DNS 解析失败）。
+    requests 也把连接中途断开（ProtocolError / RemoteDisconnected）包成 ConnectionError，
+    那时请求体可能已发出，不算在内"""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.exceptions.ConnectionError):
+        return False
+    # ConnectionError(MaxRetryError(reason=NewConnectionError)) 沿 reason / args / __cause__ 找原因
+    stack, seen = [exc], set()
+    while stack:
+        e = stack.pop()
+        if not isinstance(e, BaseException) or id(e) in seen:
+            continue
+        seen.add(id(e))
+        if isinstance(e, NewConnectionError):
+            return True
+        stack.extend((getattr(e, "reason", None), e.__cause__, e.__context__, *e.args))
+    return False
+
+
+def _deliver(target, post_content, config, auth, throttle, attempts, deadline):
+    """向一个目标发送，失败按退避重试（最多 attempts 次，退避不越过 deadline）；
+    返回 (尝试次数, 最后一次的错误或 None)"""
+    import http_client
+    import requests
+
+    with metrics.stage("send.feishu_target", target=target["label"]) as rec:
+        rec["attempts"] = 0
+        error = None
+        for attempt in range(1, attempts + 1):
+            throttle.wait()
+            token = auth.get("token")
+            timeout = _remaining(deadline)
+            if timeout <= 0:
+                error = TimeoutError("截止时间前未能发送")
+                break
+            rec["attempts"] = attempt
+            try:
+                if target["kind"] == "webhook":
+                    data = send_via_webhook(post_content, target["url"], target["secret"], timeout=timeout)
+                else:
+                    data = send_via_app_api(token, post_content, target["receive_id"], target["receive_id_type"],
+                                            timeout=timeout)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if _never_sent(e):
+                    # 连接没有建立，请求没有送达，重试不会重复发送
+                    error, retryable = e, True
+                else:
+                    # 读超时、连接中途断开、响应不完整等：飞书可能已经收下消息，重试会重复发送，按结果未知结束
+                    error = RuntimeError(f"发送结果未知（可能已送达），不重试: {type(e).__name__}: {e}")
+                    retryable = False
+            else:
+                code = data.get("code", data.get("StatusCode"))
+                if code == 0 or data.get("StatusCode") == 0:
+                    return attempt, None
+                error = RuntimeError(f"code={code} {data.get('msg', data)}")
+                retryable = code in RATE_LIMIT_CODES
+                if target["kind"] == "app" and code in TOKEN_INVALID_CODES:
+                    auth["token"] = get_tenant_access_token(config, stale=token, timeout=timeout)
+                    retryable = True
+            delay = http_client.backoff_seconds(attempt)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                retryable = False
+            if not retryable or attempt == attempts:
+                break
+            print(f"[警告] 飞书 {target['label']} 第 {attempt} 次发送失败（{error}），{delay:.1f}s 后重试",
+                  file=sys.stderr)
+            time.sleep(delay)
+        rec["ok"] = False
+        rec["error"] = f"{type(error).__name__}: {error}"[:metrics.ERROR_CHARS]
+        return rec["attempts"], error
+
+
+def send_all(post_content, config, targets, attempts=SEND_ATTEMPTS, deadline=None):
+    """并发发送到全部目标，返回 [(目标, 尝试次数, 错误或 None)]，顺序与 targets 一致。
+    attempts 为每个目标的尝试次数上限；deadline（time.monotonic 时刻）之后不再发起新的尝试。"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    auth, auth_error = {}, None
+    if any(t["kind"] == "app" for t in targets):
+        try:
+            auth["token"] = get_tenant_access_token(config, timeout=_remaining(deadline))
+        except Exception as e:
+            auth_error = e  # App 目标全部失败，webhook 照常发送
+
+    app_throttle = _Throttle(APP_API_MIN_INTERVAL)   # 同一应用的全部接收者共用配额
+    throttles = {t["url"]: _Throttle(WEBHOOK_MIN_INTERVAL) for t in targets if t["kind"] == "webhook"}
+
+    results = [None] * len(targets)
+    futures = {}
+    with ThreadPoolExecutor(max_workers=min(len(targets), MAX_PARALLEL_SENDS),
+                            thread_name_prefix="feishu") as pool:
+        for i, target in enumerate(targets):
+            if target["kind"] == "app" and auth_error is not None:
+                results[i] = (target, 0, auth_error)
+                continue
+            throttle = throttles[target["url"]] if target["kind"] == "webhook" else app_throttle
+            futures[i] = pool.submit(_deliver, target, post_content, config, auth, throttle, attempts, deadline)
+        for i, future in futures.items():
+            try:
+                results[i] = (targets[i], *future.result())
+            except Exception as e:
+                results[i] = (targets[i], 0, e)  # 如刷新 token 失败
+    return results
 
 
 # ── 主流程 ──
 
 def main():
-    use_webhook = bool(FEISHU_WEBHOOK_URL)
-    use_app_api = all([FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_RECEIVE_ID])
-
-    if not use_webhook and not use_app_api:
-        print("[send_feishu] 未配置飞书通知方式。")
-        print("  方式一（推荐）: 设置 FEISHU_WEBHOOK_URL")
-        print("  方式二: 设置 FEISHU_APP_ID + FEISHU_APP_SECRET + FEISHU_RECEIVE_ID")
-        return
-
     try:
-        history = load_history()
-    except Exception as e:
-        print(f"[send_feishu] 读取历史数据失败: {e}", file=sys.stderr)
-        history = []
-
-    post_content = build_feishu_message(history)
-
-    try:
-        if use_webhook:
-            send_via_webhook(post_content)
-            print("[send_feishu] 通过 Webhook 发送成功。")
-        else:
-            token = get_tenant_access_token()
-            send_via_app_api(token, post_content)
-            print("[send_feishu] 通过 App API 发送成功。")
+        notify()
     except Exception as e:
         print(f"[send_feishu] 发送失败: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        metrics.flush("send_feishu")
+
+
+def notify(history=None):
+    """构建并发送消息；未配置时返回 False，任一目标最终发送失败时抛出异常。
+    history 为已加载的历史（最新在前）时直接复用，不再读取存储。"""
+    config = load_config()
+    targets = build_targets(config)
+
+    if not targets:
+        print("[send_feishu] 未配置飞书通知方式。")
+        print("  方式一（推荐）: 设置 FEISHU_WEBHOOK_URL（多个用逗号分隔）")
+        print("  方式二: 设置 FEISHU_APP_ID + FEISHU_APP_SECRET + FEISHU_RECEIVE_ID（多个用逗号分隔）")
+        return False
+
+    if history is None:
+        try:
+            with metrics.stage("history.load"):
+                history = load_history()
+        except Exception as e:
+            print(f"[send_feishu] 读取历史数据失败: {e}", file=sys.stderr)
+            history = []
+
+    with metrics.stage("render.feishu_message"):
+        post_content = build_feishu_message(history[:HISTORY_DAYS])
+
+    with metrics.stage("send.feishu", targets=len(targets)) as rec:
+        results = send_all(post_content, config, targets)
+        failed = [(target, error) for target, _, error in results if error is not None]
+        rec["failed"] = len(failed)
+        rec["retried"] = sum(1 for _, attempts, error in results if error is None and attempts > 1)
+        for target, error in failed:
+            print(f"[send_feishu] {target['label']} 发送失败: {error}", file=sys.stderr)
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(targets)} 个飞书目标发送失败: "
+                               + ", ".join(t["label"] for t, _ in failed))
+    print(f"[send_feishu] 已发送到全部 {len(targets)} 个目标。")
+    return True
 
 
 if __name__ == "__main__":
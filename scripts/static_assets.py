@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+static_assets.py
+================
+页面静态资源的构建工具（generate_html.py 使用）：
+
+  - 压缩：minify_css / minify_js 去掉注释与多余空白，内联进外壳前调用。
+    JS 只做不改变语义的删减（保留必要的换行供自动分号插入），不重命名变量
+  - 预压缩：compressors() 返回可用的压缩方式，gzip 总是可用，
+    安装了 brotli 包时再加 .br；输出写成同名 .gz / .br 兄弟文件，
+    nginx gzip_static / brotli_static 等静态服务可直接返回
+  - 本地 Chart.js：固定版本 CHART_JS_VERSION 存放在 assets/vendor/，
+    页面引用带内容哈希的副本 static/chart-<版本>.<哈希>.js，可设置长期缓存；
+    vendor 文件缺失时回退到 CDN。vendor 文件由维护者本地下载、核对 SHA-256 后提交入库，
+    入库的文件本身就是版本锁定；CI 不下载，避免把未经核对的 CDN 内容发布出去
+
+用法：
+  python scripts/static_assets.py --vendor    # 下载固定版本的 Chart.js 到 assets/vendor/（已存在则跳过），打印 SHA-256
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+VENDOR_DIR = os.path.join(PROJECT_DIR, "assets", "vendor")
+STATIC_DIR = os.path.join(PROJECT_DIR, "static")  # 带内容哈希的发布文件，相对 index.html 引用
+
+CHART_JS_VERSION = "4.4.0"
+CHART_JS_URL = f"https://cdn.jsdelivr.net/npm/chart.js@{CHART_JS_VERSION}/dist/chart.umd.min.js"
+CHART_JS_FILE = os.path.join(VENDOR_DIR, f"chart-{CHART_JS_VERSION}.umd.min.js")
+CHART_JS_BANNER = f"Chart.js v{CHART_JS_VERSION}".encode()  # 官方构建文件头部的版本标记
+HASH_LENGTH = 10                    # 文件名里内容哈希的长度
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+_WORD_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$")
+# 这些字符之后的 / 是正则字面量而不是除号
+_REGEX_AFTER = frozenset("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "void", "delete", "throw", "new")
+# 换行前后是这些字符时，语句不会被自动分号插入切开，可以删掉换行
+_JOIN_AFTER = frozenset("{[(,;=:&|?")
+_JOIN_BEFORE = frozenset("}]),;.:?")
+_CSS_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+# ── 压缩 ──
+
+def minify_css(text):
+    """去掉注释与多余空白；字符串内容原样保留"""
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    parts = _CSS_STRING_RE.split(text)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[i])
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        parts[i] = re.sub(r":\s+", ":", part).replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def _scan_literal(text, i):
+    """从 i 处的引号 / 反引号 / 正则起始 / 开始扫描，返回字面量结束后的位置。
+    模板字符串不处理 ${} 里再嵌套反引号的情况（页面脚本没有这种写法）。"""
+    quote, j, n = text[i], i + 1, len(text)
+    in_class = False
+    while j < n:
+        c = text[j]
+        if c == "\\":
+            j += 2
+            continue
+        if quote == "/":
+            if c == "[":
+                in_class = True
+            elif c == "]":
+                in_class = False
+            elif c == "/" and not in_class:
+                j += 1
+                while j < n and text[j].isalpha():  # 正则标志
+                    j += 1
+                return j
+            elif c == "\n":
+                break
+        elif c == quote:
+            return j + 1
+        j += 1
+    raise ValueError(f"未闭合的字面量: {text[i:i + 40]!r}")
+
+
+def _regex_allowed(out):
+    """根据已输出内容判断下一个 / 是否开始正则字面量"""
+    tail = "".join(out[-12:]).rstrip()
+    if not tail or tail[-1] in _REGEX_AFTER:
+        return True
+    word = re.search(r"[A-Za-z_$][\w$]*$", tail)
+    return word is not None and word.group() in _REGEX_KEYWORDS
+
+
+def _separator(pending, prev, nxt):
+    """两个记号之间原本的空白（pending 为 " " 或 "\\n"）压缩后应保留的内容"""
+    if pending == "\n" and prev not in _JOIN_AFTER and nxt not in _JOIN_BEFORE:
+        return "\n"
+    if (prev in _WORD_CHARS and nxt in _WORD_CHARS) or (prev in "+-" and nxt in "+-"):
+        return " "
+    return ""
+
+
+def minify_js(text):
+    """去掉注释、缩进与多余空白；字符串、模板字符串、正则字面量原样保留"""
+    out = []
+    pending = None
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in " \t\r\n":
+            j = i
+            while j < n and text[j] in " \t\r\n":
+                j += 1
+            pending = "\n" if pending == "\n" or "\n" in text[i:j] else " "
+            i = j
+            continue
+        if text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j           # 行尾的换行留给上面的空白处理
+            continue
+        if text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            pending = pending or " "
+            continue
+        if c in "'\"`" or (c == "/" and _regex_allowed(out)):
+            j = _scan_literal(text, i)
+        else:
+            j = i + 1
+        if pending and out:
+            sep = _separator(pending, out[-1][-1], c)
+            if sep:
+                out.append(sep)
+        pending = None
+        out.append(text[i:j])
+        i = j
+    return "".join(out)
+
+
+# ── 预压缩 ──
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compressors():
+    """可用的 (后缀, 压缩函数) 列表；gzip 的 mtime 固定为 0，相同输入得到相同字节"""
+    result = [(".gz", lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0))]
+    brotli = _brotli()
+    if brotli is not None:
+        result.append((".br", lambda data: brotli.compress(data, quality=BROTLI_QUALITY)))
+    return result
+
+
+# ── 带内容哈希的文件名 ──
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(stem, data, ext):
+    """stem.<内容哈希>.ext，内容不变文件名不变"""
+    return f"{stem}.{content_hash(data)}{ext}"
+
+
+def remove_stale(directory, prefix, keep):
+    """删除 directory 下以 prefix 开头、但不属于 keep（含其压缩副本）的旧文件，返回删除数"""
+    keep = {name + suffix for name in keep for suffix in ("", *COMPRESSED_SUFFIXES)}
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        if name.startswith(prefix) and name not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+# ── Chart.js ──
+
+def read_chart_js():
+    """读取本地固定版本的 Chart.js，不存在返回 None"""
+    try:
+        with open(CHART_JS_FILE, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def fetch_chart_js(timeout=30):
+    """下载固定版本的 Chart.js 到 assets/vendor/，已存在时不重复下载；返回文件路径。
+    这里只确认下载到的是该版本的构建文件（头部版本标记），内容是否可信由提交前核对 SHA-256 保证"""
+    if os.path.exists(CHART_JS_FILE):
+        print(f"[信息] Chart.js {CHART_JS_VERSION} 已存在: {CHART_JS_FILE}", file=sys.stderr)
+        return CHART_JS_FILE
+    import http_client
+
+    resp = http_client.get(CHART_JS_URL, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.content
+    if CHART_JS_BANNER not in data[:200]:
+        raise ValueError(f"下载内容不是 Chart.js {CHART_JS_VERSION} 的构建文件（{len(data)} 字节）")
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    tmp = f"{CHART_JS_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, CHART_JS_FILE)
+    print(f"[信息] 已下载 Chart.js {CHART_JS_VERSION}（{len(data)} 字节）: {CHART_JS_FILE}", file=sys.stderr)
+    return CHART_JS_FILE
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="页面静态资源工具")
+    parser.add_argument("--vendor", action="store_true", help=f"下载 Chart.js {CHART_JS_VERSION} 到 assets/vendor/")
+    args = parser.parse_args(argv)
+    if not args.vendor:
+        parser.print_help()
+        return
+    try:
+        path = fetch_chart_js()
+    except Exception as e:
+        print(f"[错误] 下载 Chart.js 失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    # 与 npm 上 chart.js@<版本> 包内 dist/chart.umd.min.js 的 SHA-256 核对一致后再提交 assets/vendor/
+    print(f"{digest}  {os.path.relpath(path, PROJECT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stats.py
+========
+时间序列统计：均线、标准差、布林带、z-score、偏离百分比，以及图表用的 LTTB 降采样。
+
+  - 输入是普通 list，None / NaN 视为缺失值，不参与计算
+  - 滚动窗口按位置划分（与日期序列对齐）；均值用前缀和，O(n)。
+    标准差用精确的滑动和，O(n)：浮点数按二进制精确换成整数，窗口滑动时整数加减，
+    离差平方和 c·Σx² - (Σx)² 没有舍入，最后只做一次除法。
+    浮点前缀平方和相减在小方差 / 常数窗口上有抵消误差（常数窗口会算出非零标准差），
+    Welford 增减更新在移出旧值时也会累积误差
+  - 有 NumPy 时均值向量化计算，没有时退回纯 Python（结果一致）；标准差两种情况走同一段整数运算
+  - 输出是普通 list，缺失位置为 None，可直接 json.dumps
+"""
+
+import math
+import sys
+from itertools import accumulate
+
+_np = None
+
+
+def _numpy():
+    """惰性导入 numpy，未安装时返回 None 走纯 Python 实现"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except Exception as e:
+            print(f"[调试] numpy 不可用，统计使用纯 Python 实现: {e}", file=sys.stderr)
+            _np = False
+    return _np or None
+
+
+def _missing(v):
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+def series(records, field):
+    """从记录列表中取出某个字段，保持原顺序"""
+    return [rec.get(field) for rec in records]
+
+
+def iter_series(records, field):
+    """series 的惰性版本，配合 recent_mean 取够 window 个有效值即停止，不遍历全部记录"""
+    return (rec.get(field) for rec in records)
+
+
+def recent_mean(values, window):
+    """取前 window 个有效值的均值，返回 (均值, 样本数)；无有效值返回 (None, 0)。
+    values 按最新在前排列时即为"最近 window 个有效值的均值"。"""
+    picked = []
+    for v in values:
+        if not _missing(v):
+            picked.append(v)
+            if len(picked) >= window:
+                break
+    if not picked:
+        return None, 0
+    return sum(picked) / len(picked), len(picked)
+
+
+def pct_deviation(value, base):
+    """(value - base) / base * 100；任一缺失或 base 为 0 时返回 None"""
+    if _missing(value) or _missing(base) or base == 0:
+        return None
+    return (value - base) / base * 100
+
+
+def _window_sums(values, window):
+    """每个位置向前 window 个位置内有效值的 (和, 个数)，均为 list。
+    先减去全序列均值 shift 再做前缀和，减小长序列前缀和的舍入误差；
+    返回 (shift, [和, 个数])，和相对 shift。"""
+    n = len(values)
+    valid_values = [v for v in values if not _missing(v)]
+    shift = sum(valid_values) / len(valid_values) if valid_values else 0.0
+    np = _numpy()
+    if np is not None:
+        arr = np.array([np.nan if v is None else v for v in values], dtype=float)
+        valid = ~np.isnan(arr)
+        centered = np.where(valid, arr - shift, 0.0)
+        hi = np.arange(1, n + 1)
+        lo = np.maximum(hi - window, 0)
+        out = []
+        for col in (centered, valid.astype(np.int64)):
+            prefix = np.concatenate(([0], np.cumsum(col)))
+            out.append((prefix[hi] - prefix[lo]).tolist())
+        return shift, out
+
+    centered = [0.0 if _missing(v) else v - shift for v in values]
+    out = []
+    for col in (centered, [0 if _missing(v) else 1 for v in values]):
+        prefix = [0] + list(accumulate(col))
+        out.append([prefix[i + 1] - prefix[max(0, i + 1 - window)] for i in range(n)])
+    return shift, out
+
+
+def rolling_mean(values, window, min_periods=None):
+    """滚动均值：每个位置取向前 window 个位置内的有效值求均值，有效值不足 min_periods 时为 None"""
+    min_periods = window if min_periods is None else max(min_periods, 1)
+    shift, (sums, counts) = _window_sums(values, window)
+    return [shift + s / c if c >= min_periods else None for s, c in zip(sums, counts)]
+
+
+def _scaled_ints(values):
+    """把有限浮点数精确换成整数 x·2^k（所有值共用同一个 k），返回 (整数 list, 2^k)；缺失为 None"""
+    ratios = [None if v is None else float(v).as_integer_ratio() for v in values]
+    scale = max((r[1] for r in ratios if r is not None), default=1)
+    return [None if r is None else r[0] * (scale // r[1]) for r in ratios], scale
+
+
+def _window_squares(values, window):
+    """各位置窗口内有效值的 (离差平方和, 个数)，均为 list。
+    整数滑动和：值进入窗口时加上、离开时减去，每个位置 O(1) 且没有舍入"""
+    ints, scale = _scaled_ints(values)
+    count, s1, s2 = 0, 0, 0
+    squares, counts = [], []
+    for i, x in enumerate(ints):
+        if x is not None:
+            count, s1, s2 = count + 1, s1 + x, s2 + x * x
+        old = ints[i - window] if i >= window else None
+        if old is not None:
+            count, s1, s2 = count - 1, s1 - old, s2 - old * old
+        # Σ(x - mean)² = (c·Σx² - (Σx)²) / c，换回原单位再除以 scale²；整数相除结果正确舍入
+        try:
+            squares.append((count * s2 - s1 * s1) / (count * scale * scale) if count else 0.0)
+        except OverflowError:                   # 超出浮点范围，与浮点计算一样记为 inf
+            squares.append(math.inf)
+        counts.append(count)
+    return squares, counts
+
+
+def rolling_std(values, window, min_periods=None, ddof=0):
+    """滚动标准差（默认总体标准差 ddof=0），有效值不足 min_periods 时为 None"""
+    min_periods = window if min_periods is None else max(min_periods, 1)
+    squares, counts = _window_squares([None if _missing(v) else v for v in values], window)
+    return [
+        None if c < min_periods or c - ddof <= 0 else math.sqrt(sq / (c - ddof))
+        for sq, c in zip(squares, counts)
+    ]
+
+
+def bollinger(values, window, k=2.0, min_periods=None):
+    """布林带，返回 (中轨, 上轨, 下轨) 三个 list"""
+    mid = rolling_mean(values, window, min_periods)
+    std = rolling_std(values, window, min_periods)
+    upper = [None if m is None else m + k * s for m, s in zip(mid, std)]
+    lower = [None if m is None else m - k * s for m, s in zip(mid, std)]
+    return mid, upper, lower
+
+
+def rolling_zscore(values, window, min_periods=None):
+    """当前值相对滚动均值的标准分 (v - mean) / std；std 为 0 或缺失时为 None"""
+    mid = rolling_mean(values, window, min_periods)
+    std = rolling_std(values, window, min_periods)
+    return [
+        None if _missing(v) or m is None or not s else (v - m) / s
+        for v, m, s in zip(values, mid, std)
+    ]
+
+
+def rolling_deviation_pct(values, window, min_periods=None):
+    """当前值相对滚动均值的偏离百分比"""
+    mid = rolling_mean(values, window, min_periods)
+    return [pct_deviation(v, m) for v, m in zip(values, mid)]
+
+
+def lttb_indices(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets：从 (xs, ys) 中挑出 threshold 个保留形状的点，返回下标（升序）。
+    首尾点必选；其余点等分成 threshold - 2 个桶，每桶选出与上一选中点、下一桶均值点
+    构成三角形面积最大的点。xs 须递增且不含缺失值。"""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的均值点
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        count = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / count
+        avg_y = sum(ys[avg_start:avg_end]) / count
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def lttb(xs, ys, threshold):
+    """去掉 ys 缺失的点后做 LTTB 降采样，返回 (xs, ys) 两个 list；点数不超过 threshold 时原样返回"""
+    pairs = [(x, y) for x, y in zip(xs, ys) if not _missing(y)]
+    xs = [x for x, _ in pairs]
+    ys = [y for _, y in pairs]
+    idx = lttb_indices(xs, ys, threshold)
+    if len(idx) == len(xs):
+        return xs, ys
+    return [xs[i] for i in idx], [ys[i] for i in idx]